@@ -0,0 +1,148 @@
+# chatbot/benchmarks/bench_rules.py
+# Synthetic-scale benchmark for rule loading and matching.
+#
+# Usage (from the project root):
+#   python -m chatbot.benchmarks.bench_rules --sizes 1000,10000,100000 --output bench.json
+#   python -m chatbot.benchmarks.bench_rules --output new.json --compare bench.json --threshold 0.2
+#
+# The Gemini fallback is replaced by a stub, the engines are isolated (no miss log, no answer or
+# semantic caches, no shard processes), and the chatbot's diagnostic prints are sent to /dev/null,
+# so the numbers measure rule loading and matching only (print formatting included).
+import argparse
+import contextlib
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+PROJECT_ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if PROJECT_ROOT_DIR not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT_DIR)
+
+from chatbot.benchmarks.stats import summarize_latencies
+from chatbot.benchmarks.synthetic import generate_rule_rows, generate_inputs, write_rules_csv
+from chatbot.chatbot.core.rules_based_chatbot import RulesBasedChatbot
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+# Metrics where a higher value in the new run is a regression (all are times or bytes).
+COMPARED_METRICS = ['load_seconds', 'peak_load_memory_bytes', 'reload_seconds', 'turn_p50_ms', 'turn_p95_ms', 'turn_p99_ms']
+
+def _stub_llm(user_input):
+    return "LLM_FALLBACK"
+
+@contextlib.contextmanager
+def _quiet():
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+def benchmark_size(rule_count, turn_count, seed):
+    rows = generate_rule_rows(rule_count, seed=seed)
+    inputs = generate_inputs(rows, turn_count, seed=seed)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        rules_path = os.path.join(tmp_dir, 'rules.csv')
+        write_rules_csv(rules_path, rows)
+
+        with _quiet():
+            # Peak memory is measured in a separate load: tracemalloc slows allocation down.
+            tracemalloc.start()
+            RulesBasedChatbot(rules_csv_path=rules_path, llm_fallback=_stub_llm, isolated=True)
+            _, peak_memory = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            start = time.perf_counter()
+            chatbot = RulesBasedChatbot(rules_csv_path=rules_path, llm_fallback=_stub_llm, isolated=True)
+            load_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            chatbot._load_rules_from_csv()
+            reload_seconds = time.perf_counter() - start
+
+            # One session for the whole run, so contexts set by earlier turns gate later matches.
+            conversation = {}
+            latencies = []
+            fallbacks = 0
+            for text in inputs:
+                start = time.perf_counter()
+                response = chatbot.get_response(text, conversation)
+                latencies.append(time.perf_counter() - start)
+                if response == "LLM_FALLBACK":
+                    fallbacks += 1
+
+    result = {
+        'rules_loaded': chatbot.rule_count,
+        'load_seconds': load_seconds,
+        'peak_load_memory_bytes': peak_memory,
+        'reload_seconds': reload_seconds,
+        'turns': len(inputs),
+        'fallback_ratio': fallbacks / len(inputs) if inputs else 0.0,
+    }
+    for name, value in summarize_latencies(latencies).items():
+        result[f"turn_{name}_ms"] = value * 1000.0
+    return result
+
+def compare_results(baseline, current, threshold):
+    """Returns a list of human-readable regressions where current exceeds baseline by more than threshold."""
+    regressions = []
+    for size, current_metrics in current['results'].items():
+        baseline_metrics = baseline.get('results', {}).get(size)
+        if not baseline_metrics:
+            continue
+        for metric in COMPARED_METRICS:
+            old, new = baseline_metrics.get(metric), current_metrics.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if change > threshold:
+                regressions.append(f"{size} rules: {metric} {old:.6g} -> {new:.6g} (+{change:.0%})")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark RulesBasedChatbot on synthetic rule sets.")
+    parser.add_argument('--sizes', default=','.join(str(s) for s in DEFAULT_SIZES), help="Comma-separated rule counts, e.g. 1000,10000,1000000")
+    parser.add_argument('--turns', type=int, default=2000, help="Conversation turns measured per size")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Write results JSON to this path")
+    parser.add_argument('--compare', help="Baseline results JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Allowed relative slowdown before a metric counts as a regression")
+    args = parser.parse_args(argv)
+
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'turns': args.turns,
+            'seed': args.seed,
+        },
+        'results': {},
+    }
+    for size in [int(s) for s in args.sizes.split(',') if s.strip()]:
+        print(f"Benchmarking {size} rules...")
+        result = benchmark_size(size, args.turns, args.seed)
+        report['results'][str(size)] = result
+        print(f"  load {result['load_seconds']:.3f}s, peak {result['peak_load_memory_bytes'] / 2**20:.1f} MiB, "
+              f"reload {result['reload_seconds']:.3f}s, turn p50 {result['turn_p50_ms']:.3f}ms "
+              f"p95 {result['turn_p95_ms']:.3f}ms p99 {result['turn_p99_ms']:.3f}ms")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_results(baseline, report, args.threshold)
+        if regressions:
+            print("Regressions against baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("No regressions against baseline.")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,81 @@
+# chatbot/benchmarks/bench_sharded.py
+# Match throughput of the in-process FlatRuleTable versus the sharded multi-process matcher.
+#
+# Usage (from the project root):
+#   python -m chatbot.benchmarks.bench_sharded --rules 1000000 --shards 1,2,4,8 --threads 8
+#
+# Builds one synthetic rule set, then for each configuration runs --threads request threads that
+# match --queries inputs between them and reports queries per second. Sharded results are checked
+# against the in-process table, so a speedup never comes from answering differently.
+import argparse
+import os
+import sys
+import threading
+import time
+
+PROJECT_ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if PROJECT_ROOT_DIR not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT_DIR)
+
+from chatbot.benchmarks.synthetic import generate_rule_rows, generate_inputs
+from chatbot.chatbot.core.flat_rules import FlatRuleTable, RULE_FIELDS
+from chatbot.chatbot.core.sharded_matcher import ShardedRuleMatcher
+from chatbot.chatbot.core.text_normalize import normalize_input
+
+def build_rules(rule_count, seed):
+    rows = generate_rule_rows(rule_count, seed=seed)
+    rules = []
+    for row in rows:
+        rule = dict(zip(RULE_FIELDS, row))
+        rule['Pattern'] = normalize_input(rule['Pattern'])
+        for field in ('Context_Required', 'Set_Context_On_Response', 'GoTo_Rule_ID'):
+            rule[field] = rule[field] or None
+        if rule['Pattern'] or rule['Context_Required']:
+            rules.append(rule)
+    return rows, rules
+
+def measure(matcher, queries, thread_count):
+    """Queries per second with thread_count threads sharing the query list; returns (qps, results)."""
+    results = [None] * len(queries)
+    def worker(offset):
+        for i in range(offset, len(queries), thread_count):
+            text, context = queries[i]
+            results[i] = matcher.find_index(text, context)
+    threads = [threading.Thread(target=worker, args=(offset,)) for offset in range(thread_count)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return len(queries) / (time.perf_counter() - started), results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare in-process and sharded rule matching throughput.")
+    parser.add_argument('--rules', type=int, default=200000)
+    parser.add_argument('--shards', default='2,4', help="Comma-separated shard counts to try")
+    parser.add_argument('--threads', type=int, default=8, help="Concurrent request threads (and query channels)")
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rows, rules = build_rules(args.rules, args.seed)
+    contexts = [None] + sorted({rule['Context_Required'] for rule in rules if rule['Context_Required']})[:10]
+    queries = [(normalize_input(text), contexts[i % len(contexts)])
+               for i, text in enumerate(generate_inputs(rows, args.queries, seed=args.seed))]
+    print(f"{len(rules)} rules, {len(queries)} queries, {args.threads} threads, {os.cpu_count()} CPUs")
+
+    baseline_qps, expected = measure(FlatRuleTable(rules), queries, args.threads)
+    print(f"{'in-process':>12} {baseline_qps:>10.1f} q/s")
+    for shard_count in [int(s) for s in args.shards.split(',') if s.strip()]:
+        matcher = ShardedRuleMatcher(rules, shards=shard_count, channels=args.threads)
+        try:
+            qps, results = measure(matcher, queries, args.threads)
+        finally:
+            matcher.close()
+        mismatches = sum(1 for a, b in zip(results, expected) if a != b)
+        print(f"{f'{shard_count} shards':>12} {qps:>10.1f} q/s  x{qps / baseline_qps:.2f}"
+              f"{f'  {mismatches} MISMATCHES' if mismatches else ''}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
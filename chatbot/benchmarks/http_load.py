@@ -0,0 +1,228 @@
+# chatbot/benchmarks/http_load.py
+# End-to-end HTTP load generator for the chat endpoint in web/app.py.
+#
+# Usage (from the project root):
+#   python -m chatbot.benchmarks.http_load --rules 5000 --levels 1,4,16,32 --step-seconds 10 --llm-latency-ms 800
+#   python -m chatbot.benchmarks.http_load --rules-csv path/to/rules.csv --output load.json
+#
+# The app runs in a child process (so client threads do not compete with it for the GIL), served by
+# Werkzeug's threaded server on 127.0.0.1, with the Gemini fallback replaced by a fake that sleeps
+# for --llm-latency-ms. Virtual users keep their own session cookie and walk scripted conversations
+# that follow the contexts the rules set, so context-gated rules are exercised as in real traffic.
+# Everything runs offline on one machine.
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlencode
+
+PROJECT_ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if PROJECT_ROOT_DIR not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT_DIR)
+
+from chatbot.benchmarks.stats import summarize_latencies
+from chatbot.benchmarks.synthetic import generate_rule_rows, write_rules_csv
+
+FAKE_LLM_RESPONSE = "FAKE LLM ANSWER"
+
+def build_conversation_scripts(rows, script_count, seed=0, max_turns=5, miss_ratio=0.1):
+    """
+    Returns scripts (lists of user inputs). Each starts from a context-free rule and, where that rule
+    sets a context, continues with inputs for rules gated on that context, mimicking a user who
+    follows the bot's lead. Some turns are deliberate misses that fall through to the LLM.
+    """
+    rng = random.Random(seed)
+    entry_rows = [row for row in rows if not row[1] and row[2] and row[2] != '*']
+    rows_by_context = {}
+    for row in rows:
+        if row[1] and row[2]:
+            rows_by_context.setdefault(row[1], []).append(row)
+
+    def input_for(row):
+        return "anything else?" if row[2] == '*' else f"so {row[2]} please"
+
+    scripts = []
+    for _ in range(script_count):
+        script = []
+        context = None
+        for turn in range(rng.randint(1, max_turns)):
+            if rng.random() < miss_ratio or not entry_rows:
+                script.append(f"unscripted question {rng.randint(0, 10**6)}")
+                context = None # A fallback clears the context
+                continue
+            candidates = rows_by_context.get(context) if context else None
+            row = rng.choice(candidates) if candidates else rng.choice(entry_rows)
+            script.append(input_for(row))
+            if row[4] == 'clear':
+                context = None
+            elif row[4]:
+                context = row[4]
+        scripts.append(script)
+    return scripts
+
+def _serve(rules_csv_path, llm_latency_ms, port_queue):
+    """Child-process entry point: builds the app with a fake LLM and serves it until terminated."""
+    import collections
+    import contextlib
+    from werkzeug.serving import make_server, WSGIRequestHandler
+
+    class QuietRequestHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass # Per-request access logging would dominate the measurement
+
+    def fake_llm(user_input):
+        time.sleep(llm_latency_ms / 1000.0)
+        return FAKE_LLM_RESPONSE
+
+    # Every virtual user comes from 127.0.0.1: per-client rate limits would measure the limiter, not the app.
+    os.environ['CHATBOT_RATE_LIMIT_TURNS'] = '0'
+    os.environ['CHATBOT_RATE_LIMIT_LLM_CALLS'] = '0'
+    # Turns are still journaled (that is part of the request path), just not into the project's data directory.
+    os.environ['CHATBOT_TRANSCRIPT_DIR'] = tempfile.mkdtemp(prefix='http_load_transcripts_')
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        import chatbot.chatbot.core.rules_based_chatbot as core_chatbot
+        import chatbot.chatbot.web.app as app_module
+        from chatbot.chatbot.web.app import app
+        # The demo page renders the global transcript for everyone; cap it so page size stays constant across steps.
+        app_module.conversation_history = collections.deque(maxlen=50)
+        core_chatbot._chatbot_instance = core_chatbot.RulesBasedChatbot(rules_csv_path=rules_csv_path, llm_fallback=fake_llm)
+        server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietRequestHandler)
+        port_queue.put(server.server_port)
+        server.serve_forever()
+
+class VirtualUser(threading.Thread):
+    """Replays conversation scripts over one keep-alive connection until the deadline, recording every request."""
+
+    def __init__(self, port, scripts, deadline, seed):
+        super().__init__(daemon=True)
+        self.port = port
+        self.scripts = scripts
+        self.deadline = deadline
+        self.rng = random.Random(seed)
+        self.latencies = []
+        self.errors = 0
+
+    def _post(self, connection, message, cookie):
+        headers = {'Content-Type': 'application/x-www-form-urlencoded'}
+        if cookie:
+            headers['Cookie'] = cookie
+        connection.request('POST', '/', body=urlencode({'message': message}), headers=headers)
+        response = connection.getresponse()
+        body = response.read()
+        set_cookie = response.getheader('Set-Cookie')
+        if set_cookie:
+            cookie = set_cookie.split(';', 1)[0]
+        return response.status, body, cookie
+
+    def run(self):
+        connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+        while time.perf_counter() < self.deadline:
+            cookie = None # Every script is a fresh conversation
+            for message in self.rng.choice(self.scripts):
+                if time.perf_counter() >= self.deadline:
+                    break
+                start = time.perf_counter()
+                try:
+                    status, _, cookie = self._post(connection, message, cookie)
+                    ok = status == 200
+                except (OSError, http.client.HTTPException):
+                    ok = False
+                    connection.close()
+                    connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+                elapsed = time.perf_counter() - start
+                if ok:
+                    self.latencies.append(elapsed)
+                else:
+                    self.errors += 1
+        connection.close()
+
+def run_step(port, scripts, concurrency, step_seconds, seed):
+    deadline = time.perf_counter() + step_seconds
+    users = [VirtualUser(port, scripts, deadline, seed + i) for i in range(concurrency)]
+    start = time.perf_counter()
+    for user in users:
+        user.start()
+    for user in users:
+        user.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = [latency for user in users for latency in user.latencies]
+    errors = sum(user.errors for user in users)
+    total = len(latencies) + errors
+    summary = summarize_latencies(latencies)
+    return {
+        'concurrency': concurrency,
+        'requests': total,
+        'throughput_rps': len(latencies) / elapsed if elapsed else 0.0,
+        'error_rate': errors / total if total else 0.0,
+        'p50_ms': summary['p50'] * 1000.0,
+        'p95_ms': summary['p95'] * 1000.0,
+        'p99_ms': summary['p99'] * 1000.0,
+        'max_ms': summary['max'] * 1000.0,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Drive the chat endpoint with session-aware conversations at stepped concurrency.")
+    parser.add_argument('--rules', type=int, default=1000, help="Size of the synthetic rule set (ignored with --rules-csv)")
+    parser.add_argument('--rules-csv', help="Use this rules CSV instead of a synthetic one")
+    parser.add_argument('--levels', default='1,2,4,8,16', help="Comma-separated concurrency levels (virtual users)")
+    parser.add_argument('--step-seconds', type=float, default=10.0)
+    parser.add_argument('--llm-latency-ms', type=float, default=500.0, help="Latency of the fake LLM fallback")
+    parser.add_argument('--scripts', type=int, default=500, help="Number of distinct conversation scripts")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Write results JSON to this path")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        rules_csv_path = args.rules_csv
+        if rules_csv_path:
+            import csv
+            with open(rules_csv_path, 'r', newline='', encoding='utf-8') as f:
+                reader = csv.reader(f)
+                next(reader, None)
+                rows = [[(cell or '').strip().lower() if i in (1, 2, 4) else cell for i, cell in enumerate(row)] for row in reader]
+        else:
+            rows = generate_rule_rows(args.rules, seed=args.seed)
+            rules_csv_path = os.path.join(tmp_dir, 'rules.csv')
+            write_rules_csv(rules_csv_path, rows)
+        scripts = build_conversation_scripts(rows, args.scripts, seed=args.seed)
+
+        # The server must not share this process's threads or GIL, and needs a clean fork of no client state.
+        context = multiprocessing.get_context('fork')
+        port_queue = context.Queue()
+        server_process = context.Process(target=_serve, args=(rules_csv_path, args.llm_latency_ms, port_queue), daemon=True)
+        server_process.start()
+        try:
+            port = port_queue.get(timeout=60)
+            print(f"Serving app on 127.0.0.1:{port} (fake LLM latency {args.llm_latency_ms:.0f} ms)")
+            results = []
+            print(f"{'users':>6} {'requests':>9} {'req/s':>9} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+            for level in [int(l) for l in args.levels.split(',') if l.strip()]:
+                step = run_step(port, scripts, level, args.step_seconds, args.seed)
+                results.append(step)
+                print(f"{step['concurrency']:>6} {step['requests']:>9} {step['throughput_rps']:>9.1f} {step['error_rate']:>7.1%} "
+                      f"{step['p50_ms']:>9.1f} {step['p95_ms']:>9.1f} {step['p99_ms']:>9.1f}")
+        finally:
+            server_process.terminate()
+            server_process.join(timeout=10)
+
+    if args.output:
+        report = {
+            'meta': {'rules_csv': args.rules_csv, 'synthetic_rules': None if args.rules_csv else args.rules,
+                     'llm_latency_ms': args.llm_latency_ms, 'step_seconds': args.step_seconds,
+                     'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')},
+            'steps': results,
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,137 @@
+# chatbot/benchmarks/replay_traffic.py
+# Deterministic replay of captured production traffic (see core/traffic_capture.py) through a
+# RulesBasedChatbot loaded with any rule set.
+#
+# Usage (from the project root):
+#   python -m chatbot.benchmarks.replay_traffic --rules-csv candidate.csv
+#   python -m chatbot.benchmarks.replay_traffic --capture path/to/capture --speed 10 --output replay.json
+#
+# Turns are replayed one at a time in captured order, each conversation in its own session that
+# starts in the context captured for its first turn, with the Gemini fallback stubbed out. --speed 1
+# keeps the original pacing, --speed 10 compresses it tenfold, and --speed 0 (default) replays back
+# to back. The report gives the replay latency distribution next to the captured one, and every
+# turn that diverges from production: a different context before the turn, a different matched
+# rule, or the same rule producing a different response (e.g. a GoTo chain that changed).
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+
+PROJECT_ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if PROJECT_ROOT_DIR not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT_DIR)
+
+from chatbot.benchmarks.stats import summarize_latencies
+from chatbot.chatbot.core.rules_based_chatbot import RulesBasedChatbot, RULES_CSV_FILE_PATH
+from chatbot.chatbot.core.tenants import DEFAULT_TENANT_ID
+from chatbot.chatbot.core.traffic_capture import CAPTURE_DIR, short_hash
+from chatbot.chatbot.core.transcript_journal import read_transcripts
+
+STUB_LLM_RESPONSE = "STUB LLM ANSWER"
+MAX_LISTED_DIVERGENCES = 200
+
+def load_capture(capture_dir, tenant_id=DEFAULT_TENANT_ID):
+    """Captured turns of one tenant, in the order they happened."""
+    turns = [turn for turn in read_transcripts(capture_dir) if turn.get('tn', DEFAULT_TENANT_ID) == tenant_id]
+    turns.sort(key=lambda turn: turn['ts']) # Stable: turns with the same timestamp keep segment order
+    return turns
+
+def replay(turns, rules_csv_path, speed=0.0, clock=time.perf_counter, sleep=time.sleep):
+    """Replays turns through a fresh engine for rules_csv_path and returns the report dict."""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        chatbot = RulesBasedChatbot(rules_csv_path, llm_fallback=lambda prompt: STUB_LLM_RESPONSE, isolated=True)
+
+    sessions = {}
+    latencies_ms = []
+    divergences = []
+    diverged_turns = 0
+    divergence_counts = {'context': 0, 'rule': 0, 'response': 0}
+    max_lag_ms = 0.0
+    started_at = clock()
+    first_ts = turns[0]['ts'] if turns else 0.0
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for index, turn in enumerate(turns):
+            if speed > 0:
+                due = started_at + (turn['ts'] - first_ts) / speed
+                now = clock()
+                if due > now:
+                    sleep(due - now)
+                else:
+                    max_lag_ms = max(max_lag_ms, (now - due) * 1000)
+
+            session = sessions.get(turn['c'])
+            if session is None:
+                session = sessions[turn['c']] = {'chatbot_context': turn['ctx']} if turn.get('ctx') else {}
+            context_before = session.get('chatbot_context')
+            rule_id = chatbot.matched_rule_id(turn['in'], context_before)
+            turn_started = clock()
+            response = chatbot.get_response(turn['in'], session)
+            latencies_ms.append((clock() - turn_started) * 1000)
+
+            kinds = []
+            if context_before != turn.get('ctx'):
+                kinds.append('context')
+            if rule_id != turn.get('rule'):
+                kinds.append('rule')
+            elif rule_id is not None and short_hash(response) != turn.get('out'):
+                kinds.append('response')
+            for kind in kinds:
+                divergence_counts[kind] += 1
+            diverged_turns += bool(kinds)
+            if kinds and len(divergences) < MAX_LISTED_DIVERGENCES:
+                divergences.append({'turn': index, 'conversation': turn['c'], 'input': turn['in'], 'kinds': kinds,
+                                    'captured_context': turn.get('ctx'), 'replay_context': context_before,
+                                    'captured_rule': turn.get('rule'), 'replay_rule': rule_id,
+                                    'replay_response': response[:200]})
+
+    captured_ms = [turn['ms'] for turn in turns if 'ms' in turn]
+    return {
+        'rules_csv': rules_csv_path,
+        'turns': len(turns),
+        'conversations': len(sessions),
+        'speed': speed,
+        'elapsed_s': round(clock() - started_at, 3),
+        'max_pacing_lag_ms': round(max_lag_ms, 3),
+        'replay_latency_ms': summarize_latencies(latencies_ms),
+        'captured_latency_ms': summarize_latencies(captured_ms),
+        'diverged_turns': diverged_turns,
+        'divergence_counts': divergence_counts,
+        'divergences': divergences,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay captured chat traffic against a rule set and report latency and divergences.")
+    parser.add_argument('--capture', default=CAPTURE_DIR, help="Capture directory (segments written by traffic capture)")
+    parser.add_argument('--tenant', default=DEFAULT_TENANT_ID)
+    parser.add_argument('--rules-csv', default=RULES_CSV_FILE_PATH, help="Rule set to replay against (default: the live rules.csv)")
+    parser.add_argument('--speed', type=float, default=0.0, help="Pacing: 1 = original, 10 = ten times faster, 0 = back to back")
+    parser.add_argument('--output', help="Write the full report as JSON to this path")
+    args = parser.parse_args(argv)
+
+    turns = load_capture(args.capture, args.tenant)
+    if not turns:
+        print(f"No captured turns for tenant '{args.tenant}' in {args.capture}.")
+        return 1
+    report = replay(turns, args.rules_csv, speed=args.speed)
+    replay_ms, captured_ms = report['replay_latency_ms'], report['captured_latency_ms']
+    print(f"Replayed {report['turns']} turns of {report['conversations']} conversations against {args.rules_csv} "
+          f"in {report['elapsed_s']} s (max pacing lag {report['max_pacing_lag_ms']:.1f} ms).")
+    print(f"{'latency ms':>12} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}")
+    for label, summary in (('replay', replay_ms), ('captured', captured_ms)):
+        print(f"{label:>12} {summary['p50']:>9.3f} {summary['p95']:>9.3f} {summary['p99']:>9.3f} {summary['max']:>9.3f}")
+    counts = report['divergence_counts']
+    print(f"{report['diverged_turns']} diverged turns: {counts['context']} context, {counts['rule']} rule, {counts['response']} response.")
+    for divergence in report['divergences'][:20]:
+        print(f"  turn {divergence['turn']} '{divergence['input']}': {', '.join(divergence['kinds'])} "
+              f"(rule {divergence['captured_rule']} -> {divergence['replay_rule']}, "
+              f"context {divergence['captured_context']} -> {divergence['replay_context']})")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,21 @@
+# chatbot/benchmarks/stats.py
+# Small latency statistics helpers shared by the benchmark and load tools.
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list (fraction in [0, 1])."""
+    if not sorted_values:
+        return 0.0
+    rank = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+def summarize_latencies(latencies):
+    """Returns p50/p90/p95/p99/max/mean of a list of latencies, in the same unit as the input."""
+    ordered = sorted(latencies)
+    return {
+        'p50': percentile(ordered, 0.50),
+        'p90': percentile(ordered, 0.90),
+        'p95': percentile(ordered, 0.95),
+        'p99': percentile(ordered, 0.99),
+        'max': ordered[-1] if ordered else 0.0,
+        'mean': sum(ordered) / len(ordered) if ordered else 0.0,
+    }
@@ -0,0 +1,73 @@
+# chatbot/benchmarks/synthetic.py
+# Deterministic synthetic rule sets and user inputs for benchmarking RulesBasedChatbot at scale.
+import csv
+import random
+import string
+
+EXPECTED_CSV_HEADERS = ['Rule_ID', 'Context_Required', 'Pattern', 'Response', 'Set_Context_On_Response', 'GoTo_Rule_ID']
+
+def _make_vocabulary(rng, size):
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 9))))
+    return sorted(words)
+
+def generate_rule_rows(rule_count, seed=0, context_ratio=0.2, wildcard_ratio=0.02, goto_ratio=0.1, set_context_ratio=0.3):
+    """
+    Returns CSV rows (lists in EXPECTED_CSV_HEADERS order) for roughly rule_count rules:
+    general rules with 2-3 word patterns, context-gated rules (some with the '*' wildcard),
+    rules that set or clear a context, and GoTo chains of 1-3 pattern-less follow-up rules.
+    """
+    rng = random.Random(seed)
+    vocabulary = _make_vocabulary(rng, max(200, min(rule_count // 2, 50000)))
+    contexts = [f"ctx_{i}" for i in range(max(5, rule_count // 200))]
+    rows = []
+    rule_number = 0
+    while len(rows) < rule_count:
+        rule_number += 1
+        rule_id = f"R{rule_number}"
+        context = rng.choice(contexts) if rng.random() < context_ratio else ''
+        if context and rng.random() < wildcard_ratio:
+            pattern = '*'
+        else:
+            pattern = ' '.join(rng.sample(vocabulary, rng.randint(2, 3)))
+        set_context = ''
+        roll = rng.random()
+        if roll < set_context_ratio:
+            set_context = rng.choice(contexts)
+        elif roll < set_context_ratio + 0.05:
+            set_context = 'clear'
+        goto = ''
+        chain_rows = []
+        if rng.random() < goto_ratio:
+            chain_context = set_context if set_context and set_context != 'clear' else rng.choice(contexts)
+            chain_length = rng.randint(1, 3)
+            goto = f"{rule_id}_C1"
+            for step in range(1, chain_length + 1):
+                next_id = f"{rule_id}_C{step + 1}" if step < chain_length else ''
+                # Chain targets need a Context_Required, or the loader skips pattern-less rows.
+                chain_rows.append([f"{rule_id}_C{step}", chain_context, '', f"Follow-up {step} for {rule_id}.", '', next_id])
+        rows.append([rule_id, context, pattern, f"Synthetic response for {rule_id}.", set_context, goto])
+        rows.extend(chain_rows)
+    return rows[:rule_count]
+
+def write_rules_csv(path, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(EXPECTED_CSV_HEADERS)
+        writer.writerows(rows)
+
+def generate_inputs(rows, turn_count, seed=0, miss_ratio=0.2):
+    """
+    Returns turn_count user inputs: most embed a rule's pattern in a short sentence (so contexts set
+    by earlier turns are followed when the same session is reused), the rest match no pattern at all.
+    """
+    rng = random.Random(seed + 1)
+    patterns = [row[2] for row in rows if row[2] and row[2] != '*']
+    inputs = []
+    for _ in range(turn_count):
+        if not patterns or rng.random() < miss_ratio:
+            inputs.append('zz ' + ''.join(rng.choice(string.digits) for _ in range(8)) + ' qq')
+        else:
+            inputs.append(f"please {rng.choice(patterns)} thanks")
+    return inputs
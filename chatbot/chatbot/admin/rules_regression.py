@@ -0,0 +1,192 @@
+# chatbot/admin/rules_regression.py
+# Regression run for a candidate rule set: replays recorded conversations against the candidate
+# and the live rules.csv and reports which cases the candidate breaks, before it is published.
+#
+# Usage (from the project root):
+#   python -m chatbot.chatbot.admin.rules_regression candidate_rules.csv --workers 4
+#   python -m chatbot.chatbot.admin.rules_regression candidate_rules.csv --publish
+#
+# Cases are JSON lines, one recorded conversation each:
+#   {"name": "joke flow", "context": null, "turns": [{"input": "hello", "expect": "Hi there!"}, ...]}
+# "context" (optional) is the context the conversation starts in; a turn without "expect" is only
+# replayed to move the conversation along. Turns that reach the Gemini fallback answer
+# LLM_FALLBACK_MARKER instead, so no API calls are made; use it as "expect" for turns that should
+# fall back. Both engines are loaded isolated (no miss log, no answer cache), once per worker
+# process, and cases are sharded across the pool in chunks.
+#
+# --publish copies the candidate over the live rules.csv and bumps the rule-set version only if
+# no case regressed; the exit status is 1 when there are regressions.
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+PROJECT_ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+if PROJECT_ROOT_DIR not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT_DIR)
+
+DATA_DIR = os.path.join(PROJECT_ROOT_DIR, 'chatbot', 'chatbot', 'data')
+REGRESSION_CASES_FILENAME = 'regression_cases.jsonl'
+LLM_FALLBACK_MARKER = '<<LLM_FALLBACK>>'
+CHUNKS_PER_WORKER = 4 # Smaller chunks balance uneven conversations; larger ones cut pickling overhead
+
+_worker_engines = None # {'candidate': RulesBasedChatbot, 'live': RulesBasedChatbot}, built once per worker
+
+def load_cases(cases_path):
+    """Reads regression cases from a JSONL file. Raises ValueError on a malformed line."""
+    cases = []
+    with open(cases_path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                case = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{cases_path}:{line_number}: invalid JSON ({e})")
+            turns = case.get('turns') if isinstance(case, dict) else None
+            if not turns or not all(isinstance(turn, dict) and 'input' in turn for turn in turns):
+                raise ValueError(f"{cases_path}:{line_number}: a case needs a non-empty 'turns' list of {{'input', 'expect'}} objects")
+            case.setdefault('name', f"line {line_number}")
+            cases.append(case)
+    return cases
+
+def _llm_marker(prompt):
+    return LLM_FALLBACK_MARKER
+
+def _build_engines(candidate_csv_path, live_csv_path):
+    from chatbot.chatbot.core.rules_based_chatbot import RulesBasedChatbot
+    # The engine logs every turn; thousands of replayed turns would drown the report.
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        return {'candidate': RulesBasedChatbot(candidate_csv_path, llm_fallback=_llm_marker, isolated=True),
+                'live': RulesBasedChatbot(live_csv_path, llm_fallback=_llm_marker, isolated=True)}
+
+def _init_worker(candidate_csv_path, live_csv_path):
+    global _worker_engines
+    _worker_engines = _build_engines(candidate_csv_path, live_csv_path)
+
+def replay_case(chatbot, case):
+    """Runs one recorded conversation in a fresh session; returns the response to each turn."""
+    session = {'chatbot_context': case['context']} if case.get('context') else {}
+    return [chatbot.get_response(turn['input'], session) for turn in case['turns']]
+
+def _first_failure(case, responses):
+    for turn_index, (turn, response) in enumerate(zip(case['turns'], responses)):
+        if 'expect' in turn and response != turn['expect']:
+            return turn_index
+    return None
+
+def _run_chunk(cases, engines=None):
+    engines = engines or _worker_engines
+    results = []
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for case in cases:
+            result = {'name': case['name']}
+            for engine_name, chatbot in engines.items():
+                responses = replay_case(chatbot, case)
+                result[engine_name] = {'responses': responses, 'failed_turn': _first_failure(case, responses)}
+            results.append(result)
+    return results
+
+def _chunks(items, chunk_size):
+    return [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+
+def _diff_entry(case, result, turn_index):
+    turn = case['turns'][turn_index]
+    return {'name': case['name'], 'turn': turn_index, 'input': turn['input'], 'expected': turn.get('expect'),
+            'live': result['live']['responses'][turn_index],
+            'candidate': result['candidate']['responses'][turn_index]}
+
+def run_regression(candidate_csv_path, cases, live_csv_path=None, workers=None):
+    """
+    Replays cases against the candidate and the live rule set and classifies each case:
+      regressions - passes on the live rules, fails on the candidate (these block publishing)
+      fixed       - fails on the live rules, passes on the candidate
+      still_failing - fails on both
+      changed     - passes on both, but some unchecked turn answers differently
+    workers=1 runs in this process; otherwise a spawn-based process pool (safe to start from a
+    threaded web worker) with os.cpu_count() workers by default.
+    """
+    from chatbot.chatbot.core.rules_based_chatbot import RULES_CSV_FILE_PATH
+    live_csv_path = live_csv_path or RULES_CSV_FILE_PATH
+    workers = max(1, min(workers or os.cpu_count() or 1, len(cases) or 1))
+    started = time.perf_counter()
+
+    if workers == 1:
+        results = _run_chunk(cases, engines=_build_engines(candidate_csv_path, live_csv_path))
+    else:
+        chunk_size = max(1, -(-len(cases) // (workers * CHUNKS_PER_WORKER)))
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_worker, initargs=(candidate_csv_path, live_csv_path)) as pool:
+            results = [result for chunk_results in pool.map(_run_chunk, _chunks(cases, chunk_size))
+                       for result in chunk_results]
+
+    report = {'cases': len(cases), 'workers': workers, 'candidate_passed': 0, 'live_passed': 0,
+              'regressions': [], 'fixed': [], 'still_failing': [], 'changed': []}
+    for case, result in zip(cases, results):
+        candidate_failed = result['candidate']['failed_turn']
+        live_failed = result['live']['failed_turn']
+        report['candidate_passed'] += candidate_failed is None
+        report['live_passed'] += live_failed is None
+        if candidate_failed is not None and live_failed is None:
+            report['regressions'].append(_diff_entry(case, result, candidate_failed))
+        elif candidate_failed is None and live_failed is not None:
+            report['fixed'].append(_diff_entry(case, result, live_failed))
+        elif candidate_failed is not None:
+            report['still_failing'].append(_diff_entry(case, result, candidate_failed))
+        elif result['candidate']['responses'] != result['live']['responses']:
+            turn_index = next(i for i, (a, b) in enumerate(zip(result['candidate']['responses'], result['live']['responses'])) if a != b)
+            report['changed'].append(_diff_entry(case, result, turn_index))
+    report['elapsed_s'] = round(time.perf_counter() - started, 3)
+    return report
+
+def format_report(report, max_listed=20):
+    lines = [f"{report['cases']} cases in {report['elapsed_s']} s on {report['workers']} worker(s): "
+             f"candidate passes {report['candidate_passed']}, live passes {report['live_passed']}."]
+    for section in ('regressions', 'fixed', 'still_failing', 'changed'):
+        entries = report[section]
+        if not entries:
+            continue
+        lines.append(f"{section.replace('_', ' ').capitalize()} ({len(entries)}):")
+        for entry in entries[:max_listed]:
+            lines.append(f"  {entry['name']} turn {entry['turn']} '{entry['input']}': expected {entry['expected']!r}, "
+                         f"live {entry['live']!r}, candidate {entry['candidate']!r}")
+        if len(entries) > max_listed:
+            lines.append(f"  ... {len(entries) - max_listed} more")
+    return "\n".join(lines)
+
+def publish_candidate(candidate_csv_path, live_csv_path):
+    """Swaps the candidate in as the live rules.csv and bumps the version stamp so every worker reloads."""
+    from chatbot.chatbot.core.rule_version import RuleVersionStamp
+    tmp_path = f"{live_csv_path}.{os.getpid()}.tmp"
+    shutil.copyfile(candidate_csv_path, tmp_path)
+    os.replace(tmp_path, live_csv_path)
+    return RuleVersionStamp(live_csv_path).bump()
+
+if __name__ == '__main__':
+    from chatbot.chatbot.core.rules_based_chatbot import RULES_CSV_FILE_PATH
+    parser = argparse.ArgumentParser(description="Replay recorded conversations against a candidate rule set before publishing it.")
+    parser.add_argument('candidate', help="Candidate rules CSV")
+    parser.add_argument('--cases', default=os.path.join(DATA_DIR, REGRESSION_CASES_FILENAME))
+    parser.add_argument('--live', default=RULES_CSV_FILE_PATH, help="Rule set to compare against (default: the live rules.csv)")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--json', dest='json_path', help="Also write the full report as JSON to this path")
+    parser.add_argument('--publish', action='store_true', help="Publish the candidate if nothing regressed")
+    args = parser.parse_args()
+
+    report = run_regression(args.candidate, load_cases(args.cases), live_csv_path=args.live, workers=args.workers)
+    print(format_report(report))
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    if report['regressions']:
+        print(f"Not published: {len(report['regressions'])} regression(s).")
+        sys.exit(1)
+    if args.publish:
+        version = publish_candidate(args.candidate, args.live)
+        print(f"Published {args.candidate} as rule-set version {version}.")
@@ -0,0 +1,72 @@
+# chatbot/admin/warm_answer_cache.py
+# Offline batch job: precompute LLM answers for the most frequent fallback misses.
+#
+# Usage (from the project root, e.g. nightly from cron, off-peak):
+#   python -m chatbot.chatbot.admin.warm_answer_cache --top 50 --min-count 3 --delay 2
+#
+# Reads the miss log segments written by RulesBasedChatbot, asks Gemini once per recurring
+# question that is not cached yet, and atomically rewrites the answer cache file. Running workers
+# pick up the new file on their next fallback, so those questions are then answered without a
+# live LLM call. The job lowers its own CPU priority and paces its requests to spare the API quota.
+import argparse
+import os
+import sys
+import time
+
+PROJECT_ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+if PROJECT_ROOT_DIR not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT_DIR)
+
+from chatbot.chatbot.core.miss_log import top_misses, MISS_LOG_DIRNAME
+from chatbot.chatbot.integrations.answer_cache import load_cache_entries, write_cache_entries, ANSWER_CACHE_FILENAME
+
+DATA_DIR = os.path.join(PROJECT_ROOT_DIR, 'chatbot', 'chatbot', 'data')
+
+def warm_answer_cache(miss_log_path, cache_path, top_n, min_count, delay_seconds, refresh=False, answer_fn=None):
+    """
+    Fills cache_path with answers for the top_n most frequent misses seen at least min_count times.
+    answer_fn(prompt) -> str defaults to get_gemini_response. Returns (added, skipped_errors).
+    """
+    from chatbot.chatbot.integrations.gemini_client import is_gemini_error_response
+    from chatbot.chatbot.integrations.prompt_builder import build_prompt
+    if answer_fn is None:
+        from chatbot.chatbot.integrations.gemini_client import get_gemini_response as answer_fn
+
+    entries = load_cache_entries(cache_path)
+    added = 0
+    skipped_errors = 0
+    for miss in top_misses(miss_log_path, top_n, min_count=min_count):
+        if miss['q'] in entries and not refresh:
+            entries[miss['q']]['count'] = miss['count']
+            continue
+        # No conversation history: cached answers must stand on their own for any session.
+        answer = answer_fn(build_prompt(miss['input']))
+        if is_gemini_error_response(answer):
+            print(f"WARNING (warm_answer_cache): Skipping '{miss['q']}': {answer[:80]}")
+            skipped_errors += 1
+        else:
+            entries[miss['q']] = {'answer': answer, 'input': miss['input'], 'count': miss['count'],
+                                  'generated_at': time.strftime('%Y-%m-%dT%H:%M:%S')}
+            added += 1
+            print(f"INFO (warm_answer_cache): Cached answer for '{miss['q']}' (seen {miss['count']} times).")
+        if delay_seconds:
+            time.sleep(delay_seconds)
+    write_cache_entries(cache_path, entries)
+    return added, skipped_errors
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Precompute answers for the most frequent fallback misses.")
+    parser.add_argument('--miss-log', default=os.path.join(DATA_DIR, MISS_LOG_DIRNAME))
+    parser.add_argument('--cache', default=os.path.join(DATA_DIR, ANSWER_CACHE_FILENAME))
+    parser.add_argument('--top', type=int, default=50, help="Number of most frequent misses to consider")
+    parser.add_argument('--min-count', type=int, default=3, help="Ignore questions seen fewer times than this")
+    parser.add_argument('--delay', type=float, default=1.0, help="Seconds to wait between LLM calls")
+    parser.add_argument('--refresh', action='store_true', help="Regenerate answers that are already cached")
+    args = parser.parse_args()
+
+    try:
+        os.nice(10) # Low priority: never compete with the web workers for CPU
+    except (AttributeError, OSError):
+        pass
+    added, skipped = warm_answer_cache(args.miss_log, args.cache, args.top, args.min_count, args.delay, refresh=args.refresh)
+    print(f"Done: {added} answers added, {skipped} skipped due to Gemini errors. Cache: {args.cache}")
@@ -0,0 +1,115 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from chatbot.chatbot.core.config import get_config
+from chatbot.chatbot.core.memory_report import register_memory_reporter
+
+class LaneFull(Exception):
+    """The LLM lane already has as many turns running and queued as it admits."""
+
+class LaneTimeout(Exception):
+    """An LLM-lane turn did not finish within the lane's timeout."""
+
+class ChatLanes:
+    """
+    Two execution lanes for chat turns. Turns a rule (or a cached answer) can answer run inline on
+    the request thread: the fast lane, which only counts them. Turns that go to Gemini run in the
+    LLM lane, a bounded pool of `llm_workers` threads with at most `llm_queue_max` turns waiting
+    behind them. The request thread waits for its turn's result for up to `llm_timeout` seconds.
+
+    The bound is what keeps rule-answered latency flat: once the LLM lane is full, further fallbacks
+    are turned away at once (LaneFull) instead of each holding a server thread for seconds, so the
+    server's threads stay free for the fast lane. A timed-out turn is not cancelled (a Gemini call
+    cannot be); it finishes in the background and still counts against the lane until then.
+    The isolation needs a threaded server (gunicorn_conf.py runs gthread workers): a sync worker
+    serves one request at a time, so a "hello" would still queue behind the Gemini turn it holds.
+    """
+
+    def __init__(self, llm_workers=4, llm_queue_max=4, llm_timeout=30.0):
+        self.llm_workers = llm_workers
+        self.llm_queue_max = llm_queue_max
+        self.llm_timeout = llm_timeout
+        self._executor = ThreadPoolExecutor(max_workers=llm_workers, thread_name_prefix='llm-lane')
+        self._lock = threading.Lock()
+        self._fast_in_flight = 0
+        self._llm_running = 0
+        self._llm_queued = 0
+        self._counters = {'fast_turns': 0, 'llm_turns': 0, 'llm_rejected': 0, 'llm_timed_out': 0}
+        self._llm_wait_ms_max = 0.0
+
+    def run_fast(self, fn, *args):
+        with self._lock:
+            self._fast_in_flight += 1
+            self._counters['fast_turns'] += 1
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self._fast_in_flight -= 1
+
+    def run_llm(self, fn, *args):
+        """Runs fn(*args) in the LLM lane and returns its result; raises LaneFull or LaneTimeout."""
+        with self._lock:
+            if self._llm_running + self._llm_queued >= self.llm_workers + self.llm_queue_max:
+                self._counters['llm_rejected'] += 1
+                raise LaneFull()
+            self._llm_queued += 1
+            self._counters['llm_turns'] += 1
+        future = self._executor.submit(self._run_admitted, time.perf_counter(), fn, args)
+        try:
+            return future.result(timeout=self.llm_timeout)
+        except FutureTimeoutError:
+            with self._lock:
+                self._counters['llm_timed_out'] += 1
+            raise LaneTimeout() from None
+
+    def _run_admitted(self, submitted_at, fn, args):
+        wait_ms = (time.perf_counter() - submitted_at) * 1000
+        with self._lock:
+            self._llm_queued -= 1
+            self._llm_running += 1
+            self._llm_wait_ms_max = max(self._llm_wait_ms_max, wait_ms)
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self._llm_running -= 1
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters, fast_in_flight=self._fast_in_flight, llm_running=self._llm_running,
+                        llm_queued=self._llm_queued, llm_capacity=self.llm_workers + self.llm_queue_max,
+                        llm_wait_ms_max=round(self._llm_wait_ms_max, 3))
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+_chat_lanes = None
+_chat_lanes_config = None
+_chat_lanes_lock = threading.Lock()
+
+def get_chat_lanes():
+    """Process-wide lanes built from the current config (rebuilt if a new config was installed); None if disabled."""
+    global _chat_lanes, _chat_lanes_config
+    config = get_config()
+    if _chat_lanes_config is not config:
+        with _chat_lanes_lock:
+            if _chat_lanes_config is not config:
+                if _chat_lanes is not None:
+                    _chat_lanes.close()
+                _chat_lanes = None
+                if config.llm_lane_workers > 0:
+                    print(f"INFO (chat_lanes): LLM lane: {config.llm_lane_workers} workers, {config.llm_lane_queue_max} queued, "
+                          f"{config.llm_lane_timeout_seconds:g}s timeout.")
+                    _chat_lanes = ChatLanes(llm_workers=config.llm_lane_workers, llm_queue_max=config.llm_lane_queue_max,
+                                            llm_timeout=config.llm_lane_timeout_seconds)
+                _chat_lanes_config = config
+    return _chat_lanes
+
+def _chat_lanes_memory_report():
+    # Nothing of note is retained; reported for the lanes' queue depths and counters.
+    lanes = _chat_lanes
+    return dict(lanes.stats(), bytes=0) if lanes is not None else {'bytes': 0, 'enabled': False}
+
+register_memory_reporter('chat_lanes', _chat_lanes_memory_report)
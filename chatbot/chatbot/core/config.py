@@ -0,0 +1,153 @@
+import os
+import threading
+import time
+
+PROJECT_ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+DOTENV_PATH = os.path.join(PROJECT_ROOT_DIR, '.env')
+
+_env_lock = threading.Lock()
+_env_loaded_from = None # Path (or 'default search') the .env was loaded from; None until load_environment() ran
+_config = None
+
+def load_environment(dotenv_path=DOTENV_PATH):
+    """
+    Loads the .env file into os.environ, once per process (later calls are free).
+    Variables already set in the real environment win over the file.
+    """
+    global _env_loaded_from
+    if _env_loaded_from is not None:
+        return _env_loaded_from
+    with _env_lock:
+        if _env_loaded_from is None:
+            from dotenv import load_dotenv
+            if os.path.exists(dotenv_path):
+                load_dotenv(dotenv_path=dotenv_path)
+                _env_loaded_from = dotenv_path
+            elif load_dotenv(): # Fallback to the default search (CWD and parents)
+                _env_loaded_from = 'default search'
+            else:
+                print("WARNING (config): .env file not found. Required environment variables may be missing.")
+                _env_loaded_from = ''
+    return _env_loaded_from
+
+class AppConfig:
+    """
+    Settings read once from the environment (after load_environment()), shared by the web app,
+    the admin panel and the Gemini client instead of each module reading .env on import.
+    """
+
+    def __init__(self, environ=None):
+        env = os.environ if environ is None else environ
+        self.flask_secret_key = env.get('FLASK_SECRET_KEY')
+        self.admin_username = env.get('ADMIN_USERNAME')
+        self.admin_password = env.get('ADMIN_PASSWORD')
+        self.gemini_api_key = env.get('GEMINI_API_KEY')
+        self.gemini_model_name = env.get('GEMINI_MODEL_NAME', 'models/gemini-1.5-flash-latest')
+        # Import the Gemini SDK and build the client in the background once a server process starts,
+        # instead of on the first fallback. Off by default: tests and CLIs never pay for it.
+        self.gemini_warmup = env.get('GEMINI_WARMUP', '0') == '1'
+        self.prompt_token_budget = int(env.get('GEMINI_PROMPT_TOKEN_BUDGET', '1024')) # Estimated tokens per fallback prompt
+        self.startup_report = env.get('CHATBOT_STARTUP_REPORT', '1') == '1'
+        # Server-side sessions (see core/session_store.py); the SQLite path enables the persistent tier.
+        self.session_ttl_seconds = int(env.get('CHATBOT_SESSION_TTL_SECONDS', str(30 * 60)))
+        self.session_max = int(env.get('CHATBOT_SESSION_MAX', '10000'))
+        self.session_db = env.get('CHATBOT_SESSION_DB')
+        # Multi-tenant routing: 'off' (single tenant), 'host' or 'path' (see core/tenants.py), and the
+        # bounds of the LRU of loaded non-default tenants.
+        tenant_mode = env.get('CHATBOT_TENANT_MODE', 'off').strip().lower()
+        self.tenant_mode = tenant_mode if tenant_mode in ('off', 'host', 'path') else 'off'
+        self.tenant_cache_max = int(env.get('CHATBOT_TENANT_CACHE_MAX', '100'))
+        self.tenant_cache_mb = float(env.get('CHATBOT_TENANT_CACHE_MB', '256'))
+        # Processes the admin regression gate may use: 1 (default) replays in the web worker's own process,
+        # more starts a spawn pool of that many for the request (capped, see web/admin_views.py).
+        self.regression_workers = int(env.get('CHATBOT_REGRESSION_WORKERS', '1'))
+        # Per-client chat limits, shared by all workers on the host (see core/rate_limit.py). 0 disables a budget.
+        self.rate_limit_turns_per_minute = float(env.get('CHATBOT_RATE_LIMIT_TURNS', '30'))
+        self.rate_limit_turn_burst = float(env.get('CHATBOT_RATE_LIMIT_TURN_BURST', '10'))
+        self.rate_limit_llm_calls_per_minute = float(env.get('CHATBOT_RATE_LIMIT_LLM_CALLS', '5'))
+        self.rate_limit_llm_burst = float(env.get('CHATBOT_RATE_LIMIT_LLM_BURST', '3'))
+        self.rate_limit_key = env.get('CHATBOT_RATE_LIMIT_KEY', 'ip') # 'ip' or 'session'
+        # Reverse proxies in front of the app whose X-Forwarded-* headers are trusted. Behind a proxy this
+        # must be set, or every client has the proxy's address (and so one shared 'ip' budget).
+        self.trusted_proxies = int(env.get('CHATBOT_TRUSTED_PROXIES', '0'))
+        self.rate_limit_dir = env.get('CHATBOT_RATE_LIMIT_DIR') # Default: data/ratelimit
+        # Opt-in write-behind transcript journal (see core/transcript_journal.py). Turns are stored after
+        # the traffic_capture redaction hooks, but are still users' words: enable only where that is allowed.
+        self.transcripts_enabled = env.get('CHATBOT_TRANSCRIPTS', '0') == '1'
+        self.transcript_dir = env.get('CHATBOT_TRANSCRIPT_DIR') # Default: data/transcripts
+        self.transcript_flush_seconds = float(env.get('CHATBOT_TRANSCRIPT_FLUSH_SECONDS', '1.0'))
+        self.transcript_queue_max = int(env.get('CHATBOT_TRANSCRIPT_QUEUE_MAX', '10000'))
+        self.transcript_segment_mb = float(env.get('CHATBOT_TRANSCRIPT_SEGMENT_MB', '64'))
+        # Fallback miss log read by admin/warm_answer_cache.py (see core/miss_log.py): redacted, write-behind,
+        # kept to at most CHATBOT_MISS_LOG_SEGMENTS rotated segments per data directory.
+        self.miss_log_segment_mb = float(env.get('CHATBOT_MISS_LOG_SEGMENT_MB', '8'))
+        self.miss_log_segments = int(env.get('CHATBOT_MISS_LOG_SEGMENTS', '8'))
+        # Opt-in traffic capture for replay (see core/traffic_capture.py): fraction of conversations, 0 = off.
+        self.capture_sample_rate = float(env.get('CHATBOT_CAPTURE_SAMPLE', '0'))
+        self.capture_dir = env.get('CHATBOT_CAPTURE_DIR') # Default: data/capture
+        # Sharded multi-process matching for very large rule sets (see core/sharded_matcher.py); <= 1 = off.
+        self.match_shards = int(env.get('CHATBOT_MATCH_SHARDS', '0'))
+        self.match_shard_min_rules = int(env.get('CHATBOT_MATCH_SHARD_MIN_RULES', '200000'))
+        self.match_shard_channels = int(env.get('CHATBOT_MATCH_SHARD_CHANNELS', '8')) # Queries in flight per web worker
+        # Near-duplicate answer lookup in front of Gemini (see integrations/semantic_cache.py); needs NumPy.
+        self.semantic_cache_enabled = env.get('CHATBOT_SEMANTIC_CACHE', '1') == '1'
+        self.semantic_cache_threshold = float(env.get('CHATBOT_SEMANTIC_THRESHOLD', '0.7')) # Cosine similarity
+        self.semantic_cache_capacity = int(env.get('CHATBOT_SEMANTIC_CAPACITY', '2000'))
+        # Bounded executor for turns that fall back to Gemini (see core/chat_lanes.py); 0 workers = run inline.
+        # Workers + queue is how many server threads Gemini turns may hold; keep it below GUNICORN_THREADS.
+        self.llm_lane_workers = int(env.get('CHATBOT_LLM_LANE_WORKERS', '4'))
+        self.llm_lane_queue_max = int(env.get('CHATBOT_LLM_LANE_QUEUE', '4'))
+        self.llm_lane_timeout_seconds = float(env.get('CHATBOT_LLM_LANE_TIMEOUT', '30'))
+
+    @classmethod
+    def from_env(cls, dotenv_path=DOTENV_PATH):
+        load_environment(dotenv_path)
+        return cls()
+
+def get_config():
+    """Process-wide config, built (and .env loaded) on first use."""
+    global _config
+    if _config is None:
+        _config = AppConfig.from_env()
+    return _config
+
+def set_config(config):
+    """Installs config as the process-wide one (create_app(config) does this)."""
+    global _config
+    _config = config
+
+class StartupTimer:
+    """Wall-clock breakdown of boot phases, printed as one report line once the app is ready."""
+
+    def __init__(self, started_at=None):
+        self.started_at = time.perf_counter() if started_at is None else started_at
+        self.phases = [] # (name, milliseconds) in completion order
+        self._lock = threading.Lock()
+
+    def phase(self, name):
+        return _TimedPhase(self, name)
+
+    def record(self, name, milliseconds):
+        with self._lock:
+            self.phases.append((name, milliseconds))
+
+    def total_ms(self):
+        return (time.perf_counter() - self.started_at) * 1000
+
+    def report(self):
+        with self._lock:
+            parts = ', '.join(f"{name} {ms:.1f} ms" for name, ms in self.phases)
+        return f"ready in {self.total_ms():.1f} ms ({parts})"
+
+class _TimedPhase:
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.timer.record(self.name, (time.perf_counter() - self.start) * 1000)
+        return False
@@ -0,0 +1,223 @@
+from array import array
+from collections import Counter
+
+from chatbot.chatbot.core.text_normalize import parse_keyword_pattern, tokenize
+
+RULE_FIELDS = ('Rule_ID', 'Context_Required', 'Pattern', 'Response', 'Set_Context_On_Response', 'GoTo_Rule_ID')
+_FIELD_COUNT = len(RULE_FIELDS)
+_PATTERN_FIELD = RULE_FIELDS.index('Pattern')
+# Fields the loader stores as None when empty; everything else round-trips as ''.
+_OPTIONAL_FIELDS = frozenset(('Context_Required', 'Set_Context_On_Response', 'GoTo_Rule_ID'))
+
+class FlatRuleTable:
+    """
+    Compiled, fork-friendly layout of a loaded rule set; this is the structure the hot match path runs on.
+
+    Every text field of every rule lives in one UTF-8 bytes blob, addressed through a single
+    array('Q') of offsets, and each context bucket is an array('I') of rule positions in CSV order.
+    A match scans a bucket and tests blob slices against the input, so it never touches the
+    per-rule dicts/strings. When the table is built in a pre-fork master and frozen from GC,
+    CPython refcount writes only hit a handful of container objects instead of every rule's
+    strings, and the pages holding the rule text stay shared between workers.
+
+    Keyword-set rules ("refund + order") are not scanned at all. Each one is posted in an inverted
+    index under its rarest token; a lookup walks only the posting lists of the input's tokens and
+    checks each candidate's token set, so its cost follows the input length, not the rule count.
+    """
+
+    def __init__(self, rules_list, excluded_indices=()):
+        chunks = []
+        offsets = array('Q', [0])
+        position = 0
+        wildcard = array('B')
+        substring_lists = {}
+        keyword_rules = [] # (context, rule_index, token set)
+        self._index_by_id = {}
+
+        for rule_index, rule in enumerate(rules_list):
+            for field in RULE_FIELDS:
+                data = (rule.get(field) or '').encode('utf-8')
+                chunks.append(data)
+                position += len(data)
+                offsets.append(position)
+            pattern = rule.get('Pattern') or ''
+            wildcard.append(1 if pattern == '*' else 0)
+            # Rules with no pattern can only be reached through GoTo, so they never enter a match bucket;
+            # neither do rules the loader's analysis found can never be the first match (excluded_indices).
+            if pattern and rule_index not in excluded_indices:
+                keyword_tokens = parse_keyword_pattern(pattern)
+                if keyword_tokens is not None:
+                    keyword_rules.append((rule.get('Context_Required'), rule_index, keyword_tokens))
+                else:
+                    substring_lists.setdefault(rule.get('Context_Required'), []).append(rule_index)
+            self._index_by_id[rule['Rule_ID']] = rule_index
+
+        self._blob = b''.join(chunks)
+        self._offsets = offsets
+        self._wildcard = wildcard
+        self._buckets = {context: array('I', indices) for context, indices in substring_lists.items()}
+        self._keyword_postings, self._keyword_sets = self._build_keyword_index(keyword_rules)
+        self._rule_count = len(rules_list)
+        self.matchable_count = sum(len(bucket) for bucket in self._buckets.values()) + len(self._keyword_sets)
+
+    @staticmethod
+    def _build_keyword_index(keyword_rules):
+        token_frequency = Counter(token for _, _, tokens in keyword_rules for token in tokens)
+        posting_lists = {} # context -> {anchor token -> [rule_index, ...]} (CSV order)
+        keyword_sets = {}
+        for context, rule_index, tokens in keyword_rules:
+            # One posting per rule, under its rarest token (ties broken alphabetically for determinism).
+            anchor = min(tokens, key=lambda token: (token_frequency[token], token))
+            posting_lists.setdefault(context, {}).setdefault(anchor, []).append(rule_index)
+            keyword_sets[rule_index] = tokens
+        postings = {
+            context: {token: array('I', indices) for token, indices in by_token.items()}
+            for context, by_token in posting_lists.items()
+        }
+        return postings, keyword_sets
+
+    def __len__(self):
+        return self._rule_count
+
+    def _field(self, rule_index, field_position):
+        base = rule_index * _FIELD_COUNT + field_position
+        return self._blob[self._offsets[base]:self._offsets[base + 1]].decode('utf-8')
+
+    def rule(self, rule_index):
+        """Materializes the rule at rule_index as a (private, per-call) dict in the loader's format."""
+        rule = {}
+        for field_position, field in enumerate(RULE_FIELDS):
+            value = self._field(rule_index, field_position)
+            rule[field] = (value or None) if field in _OPTIONAL_FIELDS else value
+        return rule
+
+    def get(self, rule_id):
+        """Returns the rule with rule_id as a dict, or None (used for GoTo lookups)."""
+        rule_index = self._index_by_id.get(rule_id)
+        return self.rule(rule_index) if rule_index is not None else None
+
+    def _first_keyword_match(self, postings, input_tokens):
+        best = None
+        keyword_sets = self._keyword_sets
+        for token in input_tokens:
+            for rule_index in postings.get(token, ()):
+                if best is not None and rule_index >= best:
+                    break # Posting lists are in CSV order; nothing further can come first
+                if keyword_sets[rule_index] <= input_tokens:
+                    best = rule_index
+                    break
+        return best
+
+    def _first_match_in_bucket(self, context, input_bytes, input_tokens):
+        keyword_match = None
+        postings = self._keyword_postings.get(context)
+        if postings and input_tokens:
+            keyword_match = self._first_keyword_match(postings, input_tokens)
+
+        bucket = self._buckets.get(context)
+        if not bucket:
+            return keyword_match
+        blob = self._blob
+        offsets = self._offsets
+        wildcard = self._wildcard
+        for rule_index in bucket:
+            if keyword_match is not None and rule_index > keyword_match:
+                break # An earlier keyword rule already wins first-match
+            if wildcard[rule_index]:
+                return rule_index
+            base = rule_index * _FIELD_COUNT + _PATTERN_FIELD
+            # UTF-8 is self-synchronizing, so byte containment is equivalent to str containment.
+            if blob[offsets[base]:offsets[base + 1]] in input_bytes:
+                return rule_index
+        return keyword_match
+
+    def find_index(self, processed_input, current_context):
+        """
+        Same first-match semantics as the original linear scan: rules requiring the current
+        context first, then rules with no context requirement, each in CSV order.
+        processed_input must already be normalized (normalize_input); it is encoded and
+        tokenized once for both passes. Returns the matching rule position, or None.
+        """
+        input_bytes = processed_input.encode('utf-8')
+        input_tokens = tokenize(processed_input) if self._keyword_postings else frozenset()
+        rule_index = self._first_match_in_bucket(current_context, input_bytes, input_tokens)
+        if rule_index is None and current_context is not None:
+            rule_index = self._first_match_in_bucket(None, input_bytes, input_tokens)
+        return rule_index
+
+    def first_matches(self, processed_input, current_context):
+        """
+        The two passes of find_index reported separately, for callers merging several tables (the
+        sharded matcher): (first match in the current context's bucket, first general match).
+        The general pass only runs when the context pass found nothing; with no current context the
+        first element is always None.
+        """
+        input_bytes = processed_input.encode('utf-8')
+        input_tokens = tokenize(processed_input) if self._keyword_postings else frozenset()
+        if current_context is not None:
+            context_match = self._first_match_in_bucket(current_context, input_bytes, input_tokens)
+            if context_match is not None:
+                return context_match, None
+        return None, self._first_match_in_bucket(None, input_bytes, input_tokens)
+
+    def find(self, processed_input, current_context):
+        rule_index = self.find_index(processed_input, current_context)
+        return self.rule(rule_index) if rule_index is not None else None
+
+    def trace_candidates(self, processed_input, current_context, limit=200):
+        """
+        Diagnostic replay of find_index for the explain report: the rules examined, in the order the
+        two bucket passes examine them, up to and including the first match. Returns (entries, total)
+        where each entry is {'rule_index', 'bucket', 'kind' ('wildcard'|'substring'|'keyword'), 'matched'}
+        and only the last `limit` entries are kept. Not used on the hot path; production timing comes
+        from find_index itself.
+        """
+        input_bytes = processed_input.encode('utf-8')
+        input_tokens = tokenize(processed_input)
+        examined = []
+        buckets = [current_context] if current_context is None else [current_context, None]
+        for context in buckets:
+            keyword_match = None
+            postings = self._keyword_postings.get(context)
+            if postings and input_tokens:
+                for token in sorted(input_tokens):
+                    for rule_index in postings.get(token, ()):
+                        matched = self._keyword_sets[rule_index] <= input_tokens
+                        examined.append({'rule_index': rule_index, 'bucket': context, 'kind': 'keyword', 'matched': matched})
+                        if matched:
+                            if keyword_match is None or rule_index < keyword_match:
+                                keyword_match = rule_index
+                            break
+            first_match = keyword_match
+            for rule_index in self._buckets.get(context, ()):
+                if keyword_match is not None and rule_index > keyword_match:
+                    break
+                if self._wildcard[rule_index]:
+                    examined.append({'rule_index': rule_index, 'bucket': context, 'kind': 'wildcard', 'matched': True})
+                    first_match = rule_index
+                    break
+                base = rule_index * _FIELD_COUNT + _PATTERN_FIELD
+                matched = self._blob[self._offsets[base]:self._offsets[base + 1]] in input_bytes
+                examined.append({'rule_index': rule_index, 'bucket': context, 'kind': 'substring', 'matched': matched})
+                if matched:
+                    first_match = rule_index
+                    break
+            if first_match is not None:
+                break
+        total = len(examined)
+        if total > limit:
+            # Keep the tail: the entries nearest the decision are the informative ones.
+            examined = examined[-limit:]
+        return examined, total
+
+    def memory_bytes(self):
+        """Approximate size of the flat buffers (text blob plus index arrays)."""
+        total = len(self._blob)
+        total += self._offsets.buffer_info()[1] * self._offsets.itemsize
+        total += self._wildcard.buffer_info()[1] * self._wildcard.itemsize
+        for bucket in self._buckets.values():
+            total += bucket.buffer_info()[1] * bucket.itemsize
+        for by_token in self._keyword_postings.values():
+            for posting in by_token.values():
+                total += posting.buffer_info()[1] * posting.itemsize
+        return total
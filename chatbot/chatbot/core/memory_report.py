@@ -0,0 +1,123 @@
+import sys
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+# name -> callable() -> dict with at least 'bytes'. Subsystems register themselves at import time,
+# so the report covers whatever is actually loaded in this worker.
+_reporters = {}
+
+_trace_lock = threading.Lock()
+_baseline = None # (tracemalloc.Snapshot, taken_at) for on-demand diffs
+
+# Allocation sites inside the tracing machinery itself are noise in every report.
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+)
+
+def register_memory_reporter(name, reporter):
+    """Adds (or replaces) a per-subsystem reporter used by subsystem_report()."""
+    _reporters[name] = reporter
+
+def deep_getsizeof(obj):
+    """
+    Approximate retained size of obj: sys.getsizeof summed over it and everything reachable through
+    dicts, lists, tuples, sets and deques, counting each object once. Other objects are counted shallowly.
+    """
+    seen = set()
+    total = 0
+    stack = [obj]
+    while stack:
+        current = stack.pop()
+        if id(current) in seen:
+            continue
+        seen.add(id(current))
+        total += sys.getsizeof(current)
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple, set, frozenset, deque)):
+            stack.extend(current)
+    return total
+
+def subsystem_report():
+    """Runs every registered reporter; a failing reporter is reported as an error instead of failing the page."""
+    report = {}
+    for name in sorted(_reporters):
+        try:
+            report[name] = _reporters[name]()
+        except Exception as e:
+            report[name] = {'bytes': 0, 'error': str(e)}
+    return report
+
+def process_memory():
+    """rss/pss/shared/uss of this worker in bytes (Linux), or None where /proc is unavailable."""
+    from chatbot.chatbot.core.preload import read_memory_usage
+    return read_memory_usage()
+
+# --- tracemalloc control ---
+# tracemalloc only costs anything between start_tracing() and stop_tracing(); while it is off
+# the interpreter's allocator hooks are not installed at all.
+
+def tracing_status():
+    status = {'tracing': tracemalloc.is_tracing(), 'baseline_taken_at': _baseline[1] if _baseline else None}
+    if status['tracing']:
+        current, peak = tracemalloc.get_traced_memory()
+        status.update(traced_bytes=current, traced_peak_bytes=peak,
+                      tracemalloc_overhead_bytes=tracemalloc.get_tracemalloc_memory(),
+                      frames=tracemalloc.get_traceback_limit())
+    return status
+
+def start_tracing(frames=1):
+    """Starts tracemalloc (frames = traceback depth kept per allocation); a no-op if already tracing."""
+    global _baseline
+    with _trace_lock:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            _baseline = None
+            print(f"INFO (memory_report): tracemalloc started ({frames} frame(s) per allocation).")
+
+def stop_tracing():
+    global _baseline
+    with _trace_lock:
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+            print("INFO (memory_report): tracemalloc stopped.")
+        _baseline = None
+
+def _take_snapshot():
+    return tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+
+def _site(traceback):
+    frame = traceback[0]
+    return f"{frame.filename}:{frame.lineno}"
+
+def top_allocations(limit=25):
+    """Largest live allocation sites since tracing started, or [] when tracing is off."""
+    if not tracemalloc.is_tracing():
+        return []
+    stats = _take_snapshot().statistics('lineno')[:limit]
+    return [{'site': _site(stat.traceback), 'bytes': stat.size, 'count': stat.count} for stat in stats]
+
+def mark_baseline():
+    """Takes the snapshot later diffs are compared against. Returns False when tracing is off."""
+    global _baseline
+    if not tracemalloc.is_tracing():
+        return False
+    snapshot = _take_snapshot()
+    with _trace_lock:
+        _baseline = (snapshot, time.strftime('%Y-%m-%dT%H:%M:%S'))
+    return True
+
+def diff_from_baseline(limit=25):
+    """Allocation sites that grew (or shrank) the most since mark_baseline(), largest change first."""
+    baseline = _baseline
+    if baseline is None or not tracemalloc.is_tracing():
+        return []
+    stats = _take_snapshot().compare_to(baseline[0], 'lineno')[:limit]
+    return [{'site': _site(stat.traceback), 'bytes': stat.size, 'bytes_diff': stat.size_diff,
+             'count': stat.count, 'count_diff': stat.count_diff} for stat in stats]
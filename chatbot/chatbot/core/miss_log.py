@@ -0,0 +1,95 @@
+import atexit
+import json
+import os
+import threading
+from collections import Counter
+
+from chatbot.chatbot.core.config import get_config
+from chatbot.chatbot.core.memory_report import register_memory_reporter
+from chatbot.chatbot.core.text_normalize import normalize_question
+from chatbot.chatbot.core.traffic_capture import redact
+from chatbot.chatbot.core.transcript_journal import TranscriptJournal, read_transcripts
+
+MISS_LOG_DIRNAME = 'fallback_misses' # A directory of rotated segments (it used to be one fallback_misses.jsonl)
+MAX_LOGGED_INPUT_CHARS = 500
+MISS_LOG_FLUSH_SECONDS = 2.0
+MISS_LOG_QUEUE_MAX = 10000
+
+_journals = {} # directory -> TranscriptJournal, shared by every MissLog of this process writing there
+_journals_lock = threading.Lock()
+
+def _journal_for(directory):
+    journal = _journals.get(directory)
+    if journal is None:
+        with _journals_lock:
+            journal = _journals.get(directory)
+            if journal is None:
+                config = get_config()
+                journal = TranscriptJournal(directory, flush_interval=MISS_LOG_FLUSH_SECONDS, max_queue=MISS_LOG_QUEUE_MAX,
+                                            segment_max_bytes=int(config.miss_log_segment_mb * 1024 * 1024),
+                                            max_segments=config.miss_log_segments)
+                atexit.register(journal.close)
+                _journals[directory] = journal
+    return journal
+
+class MissLog:
+    """
+    Log of inputs that matched no rule and fell through to the LLM, one JSON line each, read by
+    admin/warm_answer_cache.py. The chatbot records only first, context-free turns, the questions
+    a cached answer may serve. Inputs pass through the traffic_capture redaction hooks before they
+    are normalized or stored.
+
+    record() only queues the line: a write-behind TranscriptJournal (one per directory and process,
+    so tenants sharing a data directory share its writer thread) writes batches to size-rotated
+    segments, keeping at most CHATBOT_MISS_LOG_SEGMENTS of them. A full queue drops the miss.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def record(self, user_input: str):
+        text = redact(user_input[:MAX_LOGGED_INPUT_CHARS])
+        return _journal_for(self.directory).record({'q': normalize_question(text), 'input': text})
+
+    def flush(self):
+        """Writes everything queued so far (tools and tests that read the log right after recording)."""
+        journal = _journals.get(self.directory)
+        return journal.flush() if journal is not None else 0
+
+def _read_entries(path):
+    if os.path.isdir(path):
+        yield from read_transcripts(path)
+    elif os.path.exists(path): # A single-file log from before the segments
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue # A torn last line from a crash; skip it
+
+def top_misses(path: str, limit: int, min_count: int = 1):
+    """
+    Aggregates a miss log (a segment directory, or a legacy single file) by normalized input. Returns up
+    to `limit` entries of {'q', 'count', 'input'} (input is the most recent wording), most frequent first.
+    Misses an older log recorded inside a context are skipped: their answers depended on it.
+    """
+    counts = Counter()
+    latest_input = {}
+    for entry in _read_entries(path):
+        key = entry.get('q')
+        if not key or entry.get('ctx') is not None:
+            continue
+        counts[key] += 1
+        latest_input[key] = entry.get('input', key)
+    return [
+        {'q': key, 'count': count, 'input': latest_input[key]}
+        for key, count in counts.most_common(limit) if count >= min_count
+    ]
+
+def _miss_log_memory_report():
+    journals = list(_journals.values())
+    return {'bytes': sum(journal.queued_bytes() for journal in journals), 'directories': len(journals),
+            'queued': sum(journal.stats()['queued'] for journal in journals),
+            'dropped': sum(journal.dropped for journal in journals)}
+
+register_memory_reporter('miss_log', _miss_log_memory_report)
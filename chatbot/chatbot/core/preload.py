@@ -0,0 +1,90 @@
+import gc
+import os
+import sys
+
+# Ensure project root is in sys.path when run as a script for worker memory reports
+PROJECT_ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+if PROJECT_ROOT_DIR not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT_DIR)
+
+from chatbot.chatbot.core.rules_based_chatbot import get_chatbot_instance
+
+def preload_rules_engine():
+    """
+    Builds the chatbot singleton in the pre-fork master (e.g. gunicorn with preload_app = True).
+
+    After the rules are loaded and compiled into their flat layout, a full collection runs and
+    gc.freeze() moves every surviving object into the permanent generation. Workers forked
+    afterwards inherit those pages; the collector never traverses (and so never writes to) them,
+    and the hot match path only reads the flat buffers, so the rule data stays shared. The parsed
+    rule dicts are garbage by then (the engine keeps only the flat table), so they are not pinned.
+
+    Nothing that owns a thread or a process, or that workers write to, is built here: the semantic
+    answer cache, shard processes, lanes, journal writers and the session store are all created on
+    first use in each worker.
+    """
+    chatbot = get_chatbot_instance()
+    gc.collect()
+    gc.freeze()
+    print(f"INFO (preload): Rule engine preloaded in pid {os.getpid()}: {chatbot.rule_count} rules, "
+          f"{chatbot._compiled.memory_bytes()} bytes of flat rule data, {gc.get_freeze_count()} objects frozen.")
+    return chatbot
+
+def read_memory_usage(pid='self'):
+    """
+    Returns memory figures in bytes for a process from /proc/<pid>/smaps_rollup:
+    rss, pss, shared (clean + dirty) and uss (private clean + dirty, i.e. memory unique to the process).
+    Returns None where smaps_rollup is unavailable (non-Linux, or the process is gone).
+    """
+    fields = {}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup', 'r', encoding='utf-8') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 3 and parts[2] == 'kB':
+                    fields[parts[0].rstrip(':')] = int(parts[1]) * 1024
+    except (FileNotFoundError, PermissionError, ProcessLookupError):
+        return None
+    return {
+        'rss': fields.get('Rss', 0),
+        'pss': fields.get('Pss', 0),
+        'shared': fields.get('Shared_Clean', 0) + fields.get('Shared_Dirty', 0),
+        'uss': fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0),
+    }
+
+def _child_pids(parent_pid):
+    children = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'r', encoding='utf-8') as f:
+                stat = f.read()
+        except (FileNotFoundError, PermissionError, ProcessLookupError):
+            continue
+        # Field 4 (ppid) follows the parenthesised command name, which may itself contain spaces.
+        ppid = int(stat.rsplit(')', 1)[1].split()[1])
+        if ppid == parent_pid:
+            children.append(int(entry))
+    return sorted(children)
+
+def report_worker_memory(master_pid):
+    """Returns [(pid, usage_dict)] for the master and each of its worker processes."""
+    report = [(master_pid, read_memory_usage(master_pid))]
+    for pid in _child_pids(master_pid):
+        report.append((pid, read_memory_usage(pid)))
+    return report
+
+# --- Per-worker memory report (run against a live gunicorn master) ---
+if __name__ == '__main__':
+    if len(sys.argv) != 2 or not sys.argv[1].isdigit():
+        print("Usage: python -m chatbot.chatbot.core.preload <gunicorn_master_pid>")
+        sys.exit(1)
+    master_pid = int(sys.argv[1])
+    print(f"{'PID':>8} {'RSS MiB':>10} {'PSS MiB':>10} {'Shared MiB':>11} {'Unique MiB':>11}")
+    for pid, usage in report_worker_memory(master_pid):
+        if usage is None:
+            print(f"{pid:>8} {'n/a':>10}")
+            continue
+        print(f"{pid:>8} {usage['rss'] / 2**20:>10.1f} {usage['pss'] / 2**20:>10.1f} "
+              f"{usage['shared'] / 2**20:>11.1f} {usage['uss'] / 2**20:>11.1f}")
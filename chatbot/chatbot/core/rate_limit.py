@@ -0,0 +1,146 @@
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+
+from chatbot.chatbot.core.config import get_config
+
+PROJECT_ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+RATE_LIMIT_DIR = os.path.join(PROJECT_ROOT_DIR, 'chatbot', 'chatbot', 'data', 'ratelimit')
+
+# One bucket: (client key hash, tokens left, last update time). A key hash of 0 marks a free slot.
+_SLOT = struct.Struct('<Qdd')
+BUCKET_WAYS = 4 # Slots per set: a client's bucket lives in one of the 4 slots of the set its key hashes to
+DEFAULT_BUCKET_SETS = 16384 # 64k buckets, 1.5 MiB per budget file
+
+class SharedTokenBucket:
+    """
+    Token buckets for many clients in one memory-mapped file, so every worker process on the host
+    enforces the same budget. Each client may spend `burst` tokens at once, refilled at
+    `rate_per_second`.
+
+    The file is a set-associative table: a key hashes to a set of BUCKET_WAYS slots, and a check
+    touches only that set, under a POSIX record lock on its byte range (cross-process) plus a
+    threading lock (record locks are per process). That is two lock syscalls and a struct
+    unpack/pack, a few microseconds per check. When a set is full, the bucket idle the longest is
+    reused; a bucket idle long enough to have refilled completely carries no state, so that only
+    loses information under heavy collisions.
+    """
+
+    def __init__(self, path, rate_per_second, burst, sets=DEFAULT_BUCKET_SETS, clock=time.time):
+        self.path = path
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self.sets = sets
+        self.clock = clock # Wall clock: buckets written by other processes (or before a reboot) must stay comparable
+        self._set_bytes = _SLOT.size * BUCKET_WAYS
+        self._lock = threading.Lock()
+        size = self._set_bytes * sets
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(self._fd, fcntl.LOCK_EX) # Serializes sizing a new file between workers starting together
+        try:
+            if os.fstat(self._fd).st_size != size:
+                os.ftruncate(self._fd, 0) # Layout changed (or new file): start with empty buckets
+                os.ftruncate(self._fd, size)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._map = mmap.mmap(self._fd, size)
+
+    @staticmethod
+    def key_hash(key):
+        # Stable across processes (unlike hash(), which is salted per interpreter); never 0.
+        return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little') or 1
+
+    def allow(self, key, cost=1.0):
+        """Takes cost tokens from key's bucket if it has them. Returns False (and takes nothing) otherwise."""
+        key_hash = self.key_hash(key)
+        set_offset = (key_hash % self.sets) * self._set_bytes
+        mm = self._map
+        with self._lock:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, self._set_bytes, set_offset)
+            try:
+                now = self.clock()
+                slot_offset = None
+                free_offset = None
+                oldest_offset, oldest_updated = None, None
+                for way in range(BUCKET_WAYS):
+                    offset = set_offset + way * _SLOT.size
+                    slot_hash, tokens, updated = _SLOT.unpack_from(mm, offset)
+                    if slot_hash == key_hash:
+                        slot_offset = offset
+                        break
+                    if slot_hash == 0:
+                        if free_offset is None:
+                            free_offset = offset
+                    elif oldest_updated is None or updated < oldest_updated:
+                        oldest_offset, oldest_updated = offset, updated
+                if slot_offset is None:
+                    # New client: a full bucket in a free slot, else in place of the longest-idle one.
+                    slot_offset = free_offset if free_offset is not None else oldest_offset
+                    tokens = self.burst
+                else:
+                    elapsed = max(0.0, now - updated) # Clamped: another host clock or a clock step back
+                    tokens = min(self.burst, tokens + elapsed * self.rate_per_second)
+                allowed = tokens >= cost
+                if allowed:
+                    tokens -= cost
+                _SLOT.pack_into(mm, slot_offset, key_hash, tokens, now)
+                return allowed
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, self._set_bytes, set_offset)
+
+    def close(self):
+        self._map.close()
+        os.close(self._fd)
+
+
+class ChatRateLimiter:
+    """
+    Per-client limits for the chat endpoint, with separate budgets: every turn spends from the
+    turn budget, and a turn that would call Gemini also spends from the (smaller) LLM budget.
+    A per-minute rate of 0 disables that budget.
+    """
+
+    def __init__(self, directory=RATE_LIMIT_DIR, turns_per_minute=30, turn_burst=10,
+                 llm_calls_per_minute=5, llm_burst=3, sets=DEFAULT_BUCKET_SETS, clock=time.time):
+        self.turns = None
+        self.llm_calls = None
+        if turns_per_minute > 0:
+            self.turns = SharedTokenBucket(os.path.join(directory, 'turns.buckets'),
+                                           turns_per_minute / 60.0, turn_burst, sets=sets, clock=clock)
+        if llm_calls_per_minute > 0:
+            self.llm_calls = SharedTokenBucket(os.path.join(directory, 'llm_calls.buckets'),
+                                               llm_calls_per_minute / 60.0, llm_burst, sets=sets, clock=clock)
+
+    def allow_turn(self, client_key):
+        return self.turns is None or self.turns.allow(client_key)
+
+    def allow_llm_call(self, client_key):
+        return self.llm_calls is None or self.llm_calls.allow(client_key)
+
+_rate_limiter = None
+_rate_limiter_config = None
+_rate_limiter_lock = threading.Lock()
+
+def get_rate_limiter():
+    """Process-wide limiter built from the current config (rebuilt if a new config was installed)."""
+    global _rate_limiter, _rate_limiter_config
+    config = get_config()
+    if _rate_limiter is None or _rate_limiter_config is not config:
+        with _rate_limiter_lock:
+            if _rate_limiter is None or _rate_limiter_config is not config:
+                directory = config.rate_limit_dir or RATE_LIMIT_DIR
+                print(f"INFO (rate_limit): Chat limits per {config.rate_limit_key}: {config.rate_limit_turns_per_minute:g} turns/min "
+                      f"(burst {config.rate_limit_turn_burst:g}), {config.rate_limit_llm_calls_per_minute:g} LLM calls/min "
+                      f"(burst {config.rate_limit_llm_burst:g}); buckets in {directory}.")
+                _rate_limiter = ChatRateLimiter(directory,
+                                                turns_per_minute=config.rate_limit_turns_per_minute,
+                                                turn_burst=config.rate_limit_turn_burst,
+                                                llm_calls_per_minute=config.rate_limit_llm_calls_per_minute,
+                                                llm_burst=config.rate_limit_llm_burst)
+                _rate_limiter_config = config
+    return _rate_limiter
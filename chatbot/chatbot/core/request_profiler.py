@@ -0,0 +1,305 @@
+import contextlib
+import cProfile
+import glob
+import io
+import json
+import marshal
+import os
+import pstats
+import random
+import secrets
+import threading
+import time
+
+PROJECT_ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+DATA_DIR = os.path.join(PROJECT_ROOT_DIR, 'chatbot', 'chatbot', 'data')
+PROFILING_CONTROL_FILENAME = 'profiling.json'
+PROFILES_DIRNAME = 'profiles'
+
+MAX_PROFILING_WINDOW_SECONDS = 900 # Hard cap on how long a window may stay open
+CONTROL_CHECK_INTERVAL_SECONDS = 1.0 # How often a worker re-stats the control file
+
+class RequestProfiler:
+    """
+    Sampled cProfile capture of chat requests, switched on from the admin panel for a bounded window.
+
+    The window (deadline, sample rate, per-worker request cap) is published in a small control file
+    so every worker process sees it; each worker re-stats that file at most once per
+    CONTROL_CHECK_INTERVAL_SECONDS, which is the only per-request cost while profiling is off.
+    A sampled request runs under its own cProfile.Profile; its stats are merged into the worker's
+    aggregate, which a background writer thread dumps to profiles/<window>-<pid>.pstats (the request
+    thread never touches the disk) so collect() can merge all workers.
+    At most one request per worker is profiled at a time (others are simply not sampled), which keeps
+    the overhead bounded and also works where the interpreter allows only one active profiler.
+
+    cProfile only sees the thread it was enabled on. Work a sampled request hands to another thread
+    (the LLM lane's Gemini turn) is profiled only if it is wrapped with follow(); on interpreters
+    that allow a single active profiler (3.12+) that part is skipped and the request shows the wait.
+    """
+
+    def __init__(self, data_dir=DATA_DIR, check_interval=CONTROL_CHECK_INTERVAL_SECONDS):
+        self.control_path = os.path.join(data_dir, PROFILING_CONTROL_FILENAME)
+        self.profiles_dir = os.path.join(data_dir, PROFILES_DIRNAME)
+        self._check_interval = check_interval
+        self._next_check = 0.0
+        self._signature = None
+        self._window = None # Parsed control file: {'window_id', 'until', 'sample_rate', 'max_requests', ...}
+        self._stats = None # pstats.Stats aggregate for the current window in this worker
+        self._stats_window_id = None
+        self._profiled = 0
+        self._busy = threading.Lock() # Held while a request is being profiled
+        self._lock = threading.Lock()
+        self._rng = random.Random()
+        self._sampled = threading.local() # .window is set on the thread of the request being profiled
+        self._pending = False # The aggregate changed since the writer last dumped it
+        self._write_lock = threading.Lock() # One dump at a time, so an older aggregate never lands last
+        self._wake = threading.Event()
+        self._writer_pid = None
+        self._start_lock = threading.Lock()
+
+    # --- control (admin side) ---
+
+    def start(self, duration_seconds, sample_rate, max_requests):
+        """Opens a profiling window for all workers; returns the new window dict."""
+        duration_seconds = max(1, min(int(duration_seconds), MAX_PROFILING_WINDOW_SECONDS))
+        window = {
+            'window_id': time.strftime('%Y%m%d-%H%M%S-') + secrets.token_hex(3),
+            'started_at': time.time(),
+            'until': time.time() + duration_seconds,
+            'sample_rate': max(0.0, min(float(sample_rate), 1.0)),
+            'max_requests': max(1, int(max_requests)),
+        }
+        self._clear_profiles()
+        self._write_control(window)
+        print(f"INFO (RequestProfiler): Profiling window {window['window_id']} opened for {duration_seconds}s "
+              f"at {window['sample_rate']:.0%} sampling.")
+        return window
+
+    def stop(self):
+        """Closes the current window early; collected profiles stay available for download."""
+        window = self._read_control()
+        if window and window['until'] > time.time():
+            window['until'] = time.time()
+            self._write_control(window)
+            print(f"INFO (RequestProfiler): Profiling window {window['window_id']} stopped.")
+
+    def status(self):
+        self.flush()
+        window = self._read_control()
+        if window is None:
+            return {'active': False, 'window': None, 'worker_files': 0, 'profiled_requests': 0}
+        files = self._profile_files(window['window_id'])
+        return {
+            'active': window['until'] > time.time(),
+            'window': window,
+            'seconds_left': max(0, int(window['until'] - time.time())),
+            'worker_files': len(files),
+            'profiled_requests': sum(_read_request_count(path) for path in files),
+        }
+
+    def collect(self, window_id=None):
+        """Merges every worker's profile for the window (default: the latest) into one pstats.Stats, or None."""
+        self.flush()
+        if window_id is None:
+            window = self._read_control()
+            window_id = window['window_id'] if window else None
+        files = self._profile_files(window_id) if window_id else []
+        if not files:
+            return None
+        stats = None
+        for path in files:
+            try:
+                stats = pstats.Stats(path) if stats is None else stats.add(path)
+            except (OSError, EOFError, ValueError, TypeError) as e:
+                print(f"WARNING (RequestProfiler): Skipping unreadable profile {path}: {e}")
+        return stats
+
+    def collect_dump(self, window_id=None):
+        """The merged profile in pstats dump format (load with pstats.Stats(path), snakeviz, gprof2dot...)."""
+        stats = self.collect(window_id)
+        return marshal.dumps(stats.stats) if stats is not None else None
+
+    def collect_summary(self, window_id=None, sort='cumulative', limit=40):
+        stats = self.collect(window_id)
+        if stats is None:
+            return ''
+        stream = io.StringIO()
+        stats.stream = stream
+        stats.sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
+
+    # --- hot path (request side) ---
+
+    def _active_window(self):
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + self._check_interval
+            signature = _file_signature(self.control_path)
+            if signature != self._signature:
+                self._window = self._read_control()
+                self._signature = signature
+        window = self._window
+        if window is None or window['until'] <= time.time():
+            return None
+        return window
+
+    @contextlib.contextmanager
+    def profile_if_sampled(self):
+        """Wraps one request; profiles it if a window is open and the request is sampled."""
+        window = self._active_window()
+        if (window is None or self._rng.random() >= window['sample_rate']
+                or not self._busy.acquire(blocking=False)):
+            yield
+            return
+        try:
+            if self._stats_window_id == window['window_id'] and self._profiled >= window['max_requests']:
+                profile = None # This worker has collected its share for the window
+            else:
+                profile = cProfile.Profile()
+                try:
+                    profile.enable()
+                except ValueError: # Another profiler (e.g. a debugger) is active
+                    profile = None
+            self._sampled.window = window if profile is not None else None
+            try:
+                yield
+            finally:
+                self._sampled.window = None
+                if profile is not None:
+                    profile.disable()
+                    self._add(window, profile, request=True)
+        finally:
+            self._busy.release()
+
+    def follow(self, fn):
+        """
+        Returns fn wrapped so that, when called from a request being profiled, it is profiled (into
+        the same window) on whichever thread runs it, e.g. the LLM lane. Otherwise fn is returned as is.
+        """
+        window = getattr(self._sampled, 'window', None)
+        if window is None:
+            return fn
+        def profiled(*args):
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError: # Only one active profiler allowed (3.12+): the request's own profile wins
+                return fn(*args)
+            try:
+                return fn(*args)
+            finally:
+                profile.disable()
+                self._add(window, profile, request=False)
+        return profiled
+
+    def _add(self, window, profile, request):
+        profile.create_stats()
+        with self._lock:
+            if self._stats_window_id != window['window_id']:
+                self._stats = None
+                self._profiled = 0
+                self._stats_window_id = window['window_id']
+            if self._stats is None:
+                self._stats = pstats.Stats(profile)
+            else:
+                self._stats.add(profile)
+            if request:
+                self._profiled += 1
+            self._pending = True
+        # Written by the writer thread, so a sampled request does not also pay for the dump.
+        self._ensure_writer()
+        self._wake.set()
+
+    def flush(self):
+        """Dumps this worker's aggregate if it changed since the last dump. Run by the writer thread and before collect()."""
+        with self._write_lock:
+            with self._lock:
+                if not self._pending:
+                    return
+                self._pending = False
+                window_id = self._stats_window_id
+                data = marshal.dumps(self._stats.stats) # The pstats dump format (Stats.dump_stats)
+                count = self._profiled
+            path = os.path.join(self.profiles_dir, f"{window_id}-{os.getpid()}.pstats")
+            os.makedirs(self.profiles_dir, exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            _write_request_count(path, count)
+
+    def _ensure_writer(self):
+        # Started on first use in each process: a thread started before a fork does not exist in the child.
+        if self._writer_pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._writer_pid != os.getpid():
+                self._writer_pid = os.getpid()
+                threading.Thread(target=self._run_writer, name='profile-writer', daemon=True).start()
+
+    def _run_writer(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            try:
+                self.flush()
+            except OSError as e:
+                print(f"WARNING (RequestProfiler): Could not write the profile to {self.profiles_dir}: {e}")
+
+    # --- files ---
+
+    def _read_control(self):
+        try:
+            with open(self.control_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"WARNING (RequestProfiler): Could not read {self.control_path}: {e}. Profiling stays off.")
+            return None
+
+    def _write_control(self, window):
+        os.makedirs(os.path.dirname(self.control_path), exist_ok=True)
+        tmp_path = f"{self.control_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(window, f)
+        os.replace(tmp_path, self.control_path)
+        self._next_check = 0.0 # This worker applies the change immediately
+
+    def _profile_files(self, window_id):
+        return sorted(glob.glob(os.path.join(self.profiles_dir, f"{glob.escape(window_id)}-*.pstats")))
+
+    def _clear_profiles(self):
+        # Only the latest window is kept on disk.
+        for path in glob.glob(os.path.join(self.profiles_dir, '*.pstats*')):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+def _file_signature(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+def _write_request_count(profile_path, count):
+    with open(f"{profile_path}.count", 'w', encoding='utf-8') as f:
+        f.write(str(count))
+
+def _read_request_count(profile_path):
+    try:
+        with open(f"{profile_path}.count", 'r', encoding='utf-8') as f:
+            return int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+# --- Singleton Profiler Management ---
+_request_profiler = None
+
+def get_request_profiler():
+    global _request_profiler
+    if _request_profiler is None:
+        _request_profiler = RequestProfiler()
+    return _request_profiler
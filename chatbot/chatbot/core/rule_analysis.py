@@ -0,0 +1,163 @@
+from chatbot.chatbot.core.text_normalize import parse_keyword_pattern
+
+# Maximum GoTo hops followed after the initial match (shared with RulesBasedChatbot.get_response).
+MAX_GOTO_LOOPS = 5
+
+def find_shadowed_rules(rules_list):
+    """
+    Finds rules that can never be the first match because an earlier rule in the same context
+    bucket always matches whenever they would: an earlier '*' wildcard, or an earlier pattern that
+    is a substring of theirs (any input containing the later pattern also contains the earlier one).
+
+    Keyword-set rules ("refund + order") are shadowed by an earlier keyword set that is a subset of
+    theirs, or by an earlier substring pattern found inside one of their words. (A keyword rule is
+    never reported as shadowing a substring rule: word boundaries make that undecidable from the
+    patterns alone, and under-reporting is the safe direction.)
+
+    Returns {rule_index: shadowing_rule_index}. Each pattern is only checked against the distinct
+    lengths of earlier unshadowed patterns in its bucket, so the cost is roughly
+    O(rules x pattern_length^2) rather than O(rules^2); fine for 100k+ rule sets.
+    """
+    # context -> [wildcard_index, {pattern: rule_index}, set(pattern lengths), {anchor token: [(token set, rule_index)]}]
+    bucket_states = {}
+    shadowed = {}
+
+    def earlier_substring_in(text, earlier_patterns, earlier_lengths):
+        text_length = len(text)
+        for length in earlier_lengths:
+            if length > text_length:
+                continue
+            for start in range(text_length - length + 1):
+                shadowing_index = earlier_patterns.get(text[start:start + length])
+                if shadowing_index is not None:
+                    return shadowing_index
+        return None
+
+    for rule_index, rule in enumerate(rules_list):
+        pattern = rule.get('Pattern') or ''
+        if not pattern:
+            continue # GoTo-only rule, never matched from input
+        state = bucket_states.setdefault(rule.get('Context_Required'), [None, {}, set(), {}])
+        wildcard_index, earlier_patterns, earlier_lengths, earlier_keyword_sets = state
+        if wildcard_index is not None:
+            shadowed[rule_index] = wildcard_index
+            continue
+        if pattern == '*':
+            state[0] = rule_index
+            continue
+
+        keyword_tokens = parse_keyword_pattern(pattern)
+        if keyword_tokens is not None:
+            shadowing_index = None
+            for token in keyword_tokens:
+                for earlier_tokens, earlier_index in earlier_keyword_sets.get(token, ()):
+                    if earlier_tokens <= keyword_tokens:
+                        shadowing_index = earlier_index
+                        break
+                if shadowing_index is None:
+                    shadowing_index = earlier_substring_in(token, earlier_patterns, earlier_lengths)
+                if shadowing_index is not None:
+                    break
+            if shadowing_index is not None:
+                shadowed[rule_index] = shadowing_index
+            else:
+                # Any token works as the anchor: a subset check always visits every token of the later set.
+                earlier_keyword_sets.setdefault(min(keyword_tokens), []).append((keyword_tokens, rule_index))
+            continue
+
+        shadowing_index = earlier_patterns.get(pattern)
+        if shadowing_index is None:
+            shadowing_index = earlier_substring_in(pattern, earlier_patterns, earlier_lengths)
+        if shadowing_index is not None:
+            shadowed[rule_index] = shadowing_index
+        else:
+            # Shadowed patterns are never added: whatever they contain, their shadowing pattern already covers.
+            earlier_patterns[pattern] = rule_index
+            earlier_lengths.add(len(pattern))
+    return shadowed
+
+def _goto_chain(rules_list, index_by_id, start_index):
+    """Rule indices executed for a match on start_index, following GoTo exactly as get_response does."""
+    chain = [start_index]
+    visited_ids = {rules_list[start_index]['Rule_ID']}
+    next_rule_id = rules_list[start_index].get('GoTo_Rule_ID')
+    loops = 0
+    while next_rule_id and loops < MAX_GOTO_LOOPS:
+        loops += 1
+        if next_rule_id in visited_ids:
+            break
+        visited_ids.add(next_rule_id)
+        next_index = index_by_id.get(next_rule_id)
+        if next_index is None:
+            break
+        chain.append(next_index)
+        next_rule_id = rules_list[next_index].get('GoTo_Rule_ID')
+    return chain
+
+def analyze_rules(rules_list):
+    """
+    Rule-set reachability analysis, run by the loader before compiling the match structures.
+
+    Starting from the always-active no-context bucket, every unshadowed rule that can match is
+    "executed" (with its GoTo chain) and the contexts it sets become reachable, until a fixpoint.
+    Returns a dict:
+      excluded_from_matching: rule indices left out of the hot match buckets (shadowed, or gated
+                              on a context nothing can set); they stay addressable for GoTo.
+      dead_rule_ids:          rules that can never contribute a response (not matchable and not
+                              the GoTo target of any reachable rule).
+      shadowed / unreachable_contexts / orphaned_gotos / duplicate_ids: per-rule findings for the admin report.
+    """
+    shadowed = find_shadowed_rules(rules_list)
+
+    index_by_id = {}
+    duplicate_ids = []
+    for rule_index, rule in enumerate(rules_list):
+        if rule['Rule_ID'] in index_by_id:
+            duplicate_ids.append(rule['Rule_ID'])
+        index_by_id[rule['Rule_ID']] = rule_index # Later rows win, as in rules_by_id
+
+    matchable_by_context = {}
+    for rule_index, rule in enumerate(rules_list):
+        if rule.get('Pattern') and rule_index not in shadowed:
+            matchable_by_context.setdefault(rule.get('Context_Required'), []).append(rule_index)
+
+    reachable = set()
+    reachable_contexts = {None}
+    worklist = [None]
+    while worklist:
+        context = worklist.pop()
+        for rule_index in matchable_by_context.get(context, ()):
+            for executed_index in _goto_chain(rules_list, index_by_id, rule_index):
+                if executed_index in reachable:
+                    continue
+                reachable.add(executed_index)
+                new_context = rules_list[executed_index].get('Set_Context_On_Response')
+                if new_context and new_context != 'clear' and new_context not in reachable_contexts:
+                    reachable_contexts.add(new_context)
+                    worklist.append(new_context)
+
+    unreachable_context_indices = [
+        rule_index for context, indices in matchable_by_context.items()
+        if context not in reachable_contexts for rule_index in indices
+    ]
+    unreachable_context_indices.sort()
+
+    def describe(rule_index, **extra):
+        rule = rules_list[rule_index]
+        entry = {'Rule_ID': rule['Rule_ID'], 'Context_Required': rule.get('Context_Required'), 'Pattern': rule.get('Pattern')}
+        entry.update(extra)
+        return entry
+
+    return {
+        'rule_count': len(rules_list),
+        'excluded_from_matching': set(shadowed) | set(unreachable_context_indices),
+        'dead_rule_ids': [rules_list[i]['Rule_ID'] for i in range(len(rules_list)) if i not in reachable],
+        'shadowed': [describe(i, Shadowed_By=rules_list[by]['Rule_ID']) for i, by in sorted(shadowed.items())],
+        'unreachable_contexts': [describe(i) for i in unreachable_context_indices],
+        'orphaned_gotos': [
+            {'Rule_ID': rule['Rule_ID'], 'GoTo_Rule_ID': rule['GoTo_Rule_ID']}
+            for rule in rules_list if rule.get('GoTo_Rule_ID') and rule['GoTo_Rule_ID'] not in index_by_id
+        ],
+        'duplicate_ids': duplicate_ids,
+        'reachable_contexts': sorted(c for c in reachable_contexts if c is not None),
+    }
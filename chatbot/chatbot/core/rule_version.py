@@ -0,0 +1,48 @@
+import os
+
+# The stamp lives next to the rules CSV it versions, e.g. rules.csv -> rules.csv.version
+VERSION_FILE_SUFFIX = '.version'
+
+class RuleVersionStamp:
+    """
+    Shared rule-set version stamp for multi-worker deployments.
+
+    Each worker process keeps its own RulesBasedChatbot, so a rules edit handled by one
+    worker is invisible to the others. Whoever publishes new rules bumps this stamp; every
+    worker compares the stamp's stat signature on each request (a single os.stat call, no
+    file read) and reloads lazily when it differs from the one seen at its last load.
+
+    The stamp is replaced atomically (write temp file + os.replace), so the inode changes on
+    every bump. Two concurrent bumps may write the same counter value, but their signatures
+    still differ, so no worker misses an update.
+    """
+
+    def __init__(self, rules_csv_path: str):
+        self.path = rules_csv_path + VERSION_FILE_SUFFIX
+
+    def signature(self):
+        """Cheap change detector: (inode, mtime_ns, size) of the stamp file, or None if absent."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def read(self) -> int:
+        """Returns the published version counter (0 if never published)."""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return int(f.read().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def bump(self) -> int:
+        """Publishes a new rule-set version and returns its counter value."""
+        new_version = self.read() + 1
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(str(new_version))
+        os.replace(tmp_path, self.path)
+        print(f"INFO (RuleVersionStamp): Published rule-set version {new_version} at {self.path}.")
+        return new_version
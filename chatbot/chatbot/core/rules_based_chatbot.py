@@ -1,45 +1,135 @@
 import csv
+import functools
 import os
+import sys
+import threading
+import time
 from flask import session # For session management
 
 # Assuming gemini_client.py is in chatbot/chatbot/integrations/
-from chatbot.chatbot.integrations.gemini_client import get_gemini_response
+from chatbot.chatbot.integrations.gemini_client import get_gemini_response, is_gemini_error_response
+from chatbot.chatbot.integrations.prompt_builder import build_prompt, MAX_HISTORY_MESSAGES
+from chatbot.chatbot.integrations.answer_cache import AnswerCache, ANSWER_CACHE_FILENAME
+from chatbot.chatbot.integrations.semantic_cache import SemanticAnswerCache, semantic_cache_available, matrix_bytes
+from chatbot.chatbot.core.rule_version import RuleVersionStamp
+from chatbot.chatbot.core.flat_rules import FlatRuleTable
+from chatbot.chatbot.core.sharded_matcher import ShardedRuleMatcher
+from chatbot.chatbot.core.config import get_config
+from chatbot.chatbot.core.rule_analysis import analyze_rules, MAX_GOTO_LOOPS
+from chatbot.chatbot.core.session_store import get_session_store, SESSION_ID_COOKIE_KEY
+from chatbot.chatbot.core.miss_log import MissLog, MISS_LOG_DIRNAME
+from chatbot.chatbot.core.text_normalize import normalize_input, tokenize, parse_keyword_pattern
+from chatbot.chatbot.core.memory_report import register_memory_reporter
+from chatbot.chatbot.core.tenants import TenantRegistry, DEFAULT_TENANT_ID, tenant_rules_csv_path
+from chatbot.chatbot.core.rate_limit import get_rate_limiter
+from chatbot.chatbot.core.traffic_capture import get_traffic_capture
+from chatbot.chatbot.core.chat_lanes import get_chat_lanes, LaneFull, LaneTimeout
+from chatbot.chatbot.core.request_profiler import get_request_profiler
 
 # Determine Project Root for data file access
 PROJECT_ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
 RULES_CSV_FILE_PATH = os.path.join(PROJECT_ROOT_DIR, 'chatbot', 'chatbot', 'data', 'rules.csv')
 
 EXPECTED_CSV_HEADERS = ['Rule_ID', 'Context_Required', 'Pattern', 'Response', 'Set_Context_On_Response', 'GoTo_Rule_ID']
+HISTORY_SESSION_KEY = 'chatbot_history' # Recent messages kept in the (server-side) session for LLM prompts
+LLM_RATE_LIMITED_RESPONSE = "I'm getting a lot of questions from you right now. Please wait a minute and ask again."
+LLM_LANE_BUSY_RESPONSE = "I'm answering a lot of questions right now. Please try again in a moment."
+LLM_LANE_TIMEOUT_RESPONSE = "That's taking me longer than usual to answer. Please try again in a moment."
+_NOT_LOOKED_UP = object() # TurnPlan.cached_answer when the caches were not consulted (a rule matched)
+
+class TurnPlan:
+    """
+    The rule match (and, for a fallback, the cache lookup) of one turn, made once up front so the
+    lane decision, the turn itself and traffic capture all use the same result. It keeps the
+    compiled table it matched on, so a reload in between cannot shift the rule index.
+    """
+    __slots__ = ('compiled', 'rule_index', 'cached_answer')
+
+    def __init__(self, compiled, rule_index, cached_answer=_NOT_LOOKED_UP):
+        self.compiled = compiled
+        self.rule_index = rule_index
+        self.cached_answer = cached_answer
+
+    @property
+    def calls_llm(self):
+        """Whether the turn will go to Gemini (a matched GoTo chain without any response text is not predicted)."""
+        return self.rule_index is None and self.cached_answer is None
+
+    @property
+    def rule_id(self):
+        return self.compiled.rule(self.rule_index)['Rule_ID'] if self.rule_index is not None else None
 
 class RulesBasedChatbot:
-    def __init__(self):
-        self.rules_list = []  # Stores rules as a list of dicts, preserving order
-        self.rules_by_id = {} # Stores rules by Rule_ID for quick GoTo lookups
+    def __init__(self, rules_csv_path=None, llm_fallback=None, isolated=False):
+        self.rules_csv_path = rules_csv_path or RULES_CSV_FILE_PATH
+        self.llm_fallback = llm_fallback # Callable(prompt) -> str; None means get_gemini_response
+        # Isolated engines (offline evaluation, e.g. regression runs) neither log misses nor serve cached answers.
+        self.isolated = isolated
+        # The compiled table is the only copy of the rules kept: the parsed dicts are dropped once it is
+        # built, so a pre-fork gc.freeze() pins the flat buffers, not a second, per-rule copy of the same data.
+        self._compiled = FlatRuleTable([]) # rule(i)/get(rule_id) materialize a rule dict on demand
+        self.rule_analysis = analyze_rules([]) # Shadowed/unreachable rule findings from the last load
+        self._rules_bytes = 0 # Estimated size of the loaded rule set, see memory_bytes()
+        self._resident_bytes = 0 # _rules_bytes plus the answer caches, see resident_bytes()
+        self.rules_version = 0 # Published version of the rule set currently loaded
+        self._version_stamp = RuleVersionStamp(self.rules_csv_path)
+        self._version_signature = None # Stamp signature seen at the last load
+        self._reload_lock = threading.Lock()
+        # Fallback misses and precomputed answers live next to the rules they belong to.
+        data_dir = os.path.dirname(self.rules_csv_path)
+        self.miss_log = MissLog(os.path.join(data_dir, MISS_LOG_DIRNAME))
+        self.answer_cache = AnswerCache(os.path.join(data_dir, ANSWER_CACHE_FILENAME))
+        # Gemini answers, found by similarity. Built on first use in each process (see semantic_cache), so a
+        # preloaded master never allocates it or its lock for the workers it forks.
+        self._semantic_cache = None
+        self._semantic_cache_pid = None
+        self._semantic_cache_lock = threading.Lock()
         self._load_rules_from_csv()
-        if not self.rules_list:
+        if not self.rule_count:
             print("WARNING (RulesBasedChatbot): No rules were loaded. Chatbot will rely on Gemini.")
         else:
-            print(f"INFO (RulesBasedChatbot): Loaded {len(self.rules_list)} rules.")
+            print(f"INFO (RulesBasedChatbot): Loaded {self.rule_count} rules.")
+
+    @property
+    def rule_count(self):
+        return len(self._compiled)
+
+    @property
+    def rules_list(self):
+        """The loaded rules as dicts in CSV order, materialized from the compiled table on each call (tools and tests)."""
+        return [self._compiled.rule(rule_index) for rule_index in range(len(self._compiled))]
+
+    @property
+    def semantic_cache(self):
+        """This process's semantic answer cache (None if isolated or disabled), built on first use."""
+        if self.isolated:
+            return None
+        if self._semantic_cache_pid != os.getpid():
+            with self._semantic_cache_lock:
+                if self._semantic_cache_pid != os.getpid():
+                    self._semantic_cache = _build_semantic_cache()
+                    self._semantic_cache_pid = os.getpid()
+        return self._semantic_cache
 
     def _ensure_csv_headers(self):
         # Ensure parent directory exists
-        os.makedirs(os.path.dirname(RULES_CSV_FILE_PATH), exist_ok=True)
-        if not os.path.exists(RULES_CSV_FILE_PATH) or os.path.getsize(RULES_CSV_FILE_PATH) == 0:
-            print(f"DEBUG (RulesBasedChatbot): {RULES_CSV_FILE_PATH} not found or empty. Creating with headers.")
-            with open(RULES_CSV_FILE_PATH, 'w', newline='', encoding='utf-8') as f:
+        os.makedirs(os.path.dirname(self.rules_csv_path), exist_ok=True)
+        if not os.path.exists(self.rules_csv_path) or os.path.getsize(self.rules_csv_path) == 0:
+            print(f"DEBUG (RulesBasedChatbot): {self.rules_csv_path} not found or empty. Creating with headers.")
+            with open(self.rules_csv_path, 'w', newline='', encoding='utf-8') as f:
                 writer = csv.writer(f)
                 writer.writerow(EXPECTED_CSV_HEADERS)
             return True # File was created/headers written
         else:
             try:
-                with open(RULES_CSV_FILE_PATH, 'r', newline='', encoding='utf-8') as f:
+                with open(self.rules_csv_path, 'r', newline='', encoding='utf-8') as f:
                     reader = csv.reader(f)
                     headers = next(reader, None)
                     # Normalize headers for comparison (lower, strip)
                     normalized_headers = [h.strip().lower() for h in headers] if headers else []
                     normalized_expected_headers = [eh.strip().lower() for eh in EXPECTED_CSV_HEADERS]
                     if not headers or normalized_headers != normalized_expected_headers:
-                        print(f"WARNING (RulesBasedChatbot): CSV file {RULES_CSV_FILE_PATH} has incorrect or missing headers. Expected: {EXPECTED_CSV_HEADERS}, Found: {headers}")
+                        print(f"WARNING (RulesBasedChatbot): CSV file {self.rules_csv_path} has incorrect or missing headers. Expected: {EXPECTED_CSV_HEADERS}, Found: {headers}")
                         return False # Headers are not as expected
                     return True # Headers are fine
             except Exception as e:
@@ -47,27 +137,74 @@ class RulesBasedChatbot:
                 return False
 
     def _load_rules_from_csv(self):
-        self.rules_list = []
-        self.rules_by_id = {}
-        print(f"DEBUG (RulesBasedChatbot): Attempting to load rules from: {RULES_CSV_FILE_PATH}")
+        # Read the stamp before the CSV: if a publish lands mid-read, the next request sees a newer stamp and reloads again.
+        version_signature = self._version_stamp.signature()
+        rules_version = self._version_stamp.read()
+        rules_list, rules_by_id = self._read_rules_snapshot()
+        # Swap in the new snapshot only once it is complete, so concurrent requests never see a half-loaded rule set.
+        analysis = analyze_rules(rules_list)
+        if analysis['excluded_from_matching'] or analysis['orphaned_gotos']:
+            print(f"WARNING (RulesBasedChatbot): Rule analysis: {len(analysis['shadowed'])} shadowed, "
+                  f"{len(analysis['unreachable_contexts'])} gated on unreachable contexts, "
+                  f"{len(analysis['orphaned_gotos'])} orphaned GoTo targets. See the admin rule analysis report.")
+        compiled = self._compile(rules_list, rules_by_id, analysis['excluded_from_matching'])
+        # Measured once per load, not per request: the tenant registry reads these on every get().
+        rules_bytes = compiled.memory_bytes()
+        if isinstance(compiled, ShardedRuleMatcher):
+            rules_bytes += _estimate_rules_bytes(rules_list, rules_by_id) # It keeps the dicts to build rules from
+        if not self.isolated:
+            self.answer_cache.refresh()
+        cache_bytes = self.answer_cache.memory_bytes()
+        if self._semantic_cache_pid == os.getpid() and self._semantic_cache is not None:
+            cache_bytes += self._semantic_cache.memory_bytes()
+        elif not self.isolated:
+            cache_bytes += _semantic_cache_reserve_bytes() # Not built yet in this process; its matrix is fixed-size
+        self.rule_analysis = analysis
+        previous_compiled, self._compiled = self._compiled, compiled
+        if isinstance(previous_compiled, ShardedRuleMatcher):
+            previous_compiled.retire()
+        self._rules_bytes = rules_bytes
+        self._resident_bytes = rules_bytes + cache_bytes
+        self.rules_version = rules_version
+        self._version_signature = version_signature
+
+    def release(self):
+        """Called when this instance is dropped (e.g. an evicted tenant): retires its shard processes, if any."""
+        if isinstance(self._compiled, ShardedRuleMatcher):
+            self._compiled.retire()
+
+    def _compile(self, rules_list, rules_by_id, excluded_indices):
+        # Very large rule sets can be matched by a pool of shard processes instead (CHATBOT_MATCH_SHARDS);
+        # isolated engines are offline tools that already run in their own process pools.
+        # The shards start on the first match in each process, never in a pre-fork master.
+        config = get_config()
+        if (config.match_shards > 1 and not self.isolated and len(rules_list) >= config.match_shard_min_rules):
+            return ShardedRuleMatcher(rules_list, excluded_indices=excluded_indices, shards=config.match_shards,
+                                      channels=config.match_shard_channels, rules_by_id=rules_by_id)
+        return FlatRuleTable(rules_list, excluded_indices=excluded_indices)
+
+    def _read_rules_snapshot(self):
+        rules_list = []
+        rules_by_id = {}
+        print(f"DEBUG (RulesBasedChatbot): Attempting to load rules from: {self.rules_csv_path}")
 
         if not self._ensure_csv_headers():
             print("ERROR (RulesBasedChatbot): CSV header check failed. Rules not loaded.")
-            return
+            return rules_list, rules_by_id
 
         try:
-            with open(RULES_CSV_FILE_PATH, 'r', newline='', encoding='utf-8') as f:
+            with open(self.rules_csv_path, 'r', newline='', encoding='utf-8') as f:
                 reader = csv.DictReader(f)
                 current_fieldnames = reader.fieldnames if reader.fieldnames else []
                 normalized_fieldnames = [fn.strip().lower() for fn in current_fieldnames]
                 normalized_expected_headers = [eh.strip().lower() for eh in EXPECTED_CSV_HEADERS]
 
-                if not current_fieldnames and os.path.getsize(RULES_CSV_FILE_PATH) > 0 :
-                     print(f"ERROR (RulesBasedChatbot): CSV file {RULES_CSV_FILE_PATH} seems to be missing headers for DictReader. Fieldnames found: {current_fieldnames}")
-                     return
+                if not current_fieldnames and os.path.getsize(self.rules_csv_path) > 0 :
+                     print(f"ERROR (RulesBasedChatbot): CSV file {self.rules_csv_path} seems to be missing headers for DictReader. Fieldnames found: {current_fieldnames}")
+                     return rules_list, rules_by_id
                 elif current_fieldnames and normalized_fieldnames != normalized_expected_headers:
-                     print(f"ERROR (RulesBasedChatbot): CSV file {RULES_CSV_FILE_PATH} headers for DictReader do not match. Expected: {EXPECTED_CSV_HEADERS}, Found: {current_fieldnames}")
-                     return
+                     print(f"ERROR (RulesBasedChatbot): CSV file {self.rules_csv_path} headers for DictReader do not match. Expected: {EXPECTED_CSV_HEADERS}, Found: {current_fieldnames}")
+                     return rules_list, rules_by_id
 
                 print("DEBUG (RulesBasedChatbot): Loading rules from CSV with new structure...")
                 for i, row in enumerate(reader):
@@ -75,7 +212,7 @@ class RulesBasedChatbot:
                         rule = {}
                         rule['Rule_ID'] = row.get('Rule_ID', '').strip()
                         rule['Context_Required'] = row.get('Context_Required', '').strip().lower() or None
-                        rule['Pattern'] = row.get('Pattern', '').strip().lower()
+                        rule['Pattern'] = normalize_input(row.get('Pattern', ''))
                         rule['Response'] = row.get('Response', '').strip()
                         rule['Set_Context_On_Response'] = row.get('Set_Context_On_Response', '').strip().lower() or None
                         rule['GoTo_Rule_ID'] = row.get('GoTo_Rule_ID', '').strip() or None
@@ -88,45 +225,158 @@ class RulesBasedChatbot:
                                 print(f"WARNING (RulesBasedChatbot): Skipped row #{i+1} (Rule ID: {rule['Rule_ID']}) due to missing Pattern when no Context_Required is set.")
                                 continue
 
-                        self.rules_list.append(rule)
-                        self.rules_by_id[rule['Rule_ID']] = rule
+                        rules_list.append(rule)
+                        rules_by_id[rule['Rule_ID']] = rule
                     except Exception as e_row:
                         print(f"ERROR (RulesBasedChatbot): Failed to process row #{i+1}: {row}. Error: {e_row}")
-            print(f"DEBUG (RulesBasedChatbot): Finished loading {len(self.rules_list)} rules into rules_list and {len(self.rules_by_id)} into rules_by_id.")
+            print(f"DEBUG (RulesBasedChatbot): Finished loading {len(rules_list)} rules into rules_list and {len(rules_by_id)} into rules_by_id.")
         except FileNotFoundError:
-            print(f"ERROR (RulesBasedChatbot): Rules file not found at {RULES_CSV_FILE_PATH}. Should have been created by _ensure_csv_headers.")
+            print(f"ERROR (RulesBasedChatbot): Rules file not found at {self.rules_csv_path}. Should have been created by _ensure_csv_headers.")
         except Exception as e:
             print(f"ERROR (RulesBasedChatbot): Could not load rules from CSV: {e}")
+        return rules_list, rules_by_id
+
+    def memory_bytes(self):
+        """Approximate memory held by the loaded rule set (compiled table plus the per-rule dicts), as of the last load."""
+        return self._rules_bytes
+
+    def resident_bytes(self):
+        """
+        memory_bytes() plus the exact and semantic answer caches, as of the last load: what the tenant
+        registry bounds. The semantic cache's matrix is allocated up front, so it is counted in full.
+        """
+        return self._resident_bytes
+
+    def refresh_if_stale(self):
+        """
+        Reloads the rules if another process has published a newer rule set.
+        Costs one os.stat per call when nothing changed; returns True if a reload happened.
+        """
+        if self._version_stamp.signature() == self._version_signature:
+            return False
+        with self._reload_lock:
+            # Another thread in this worker may have reloaded while we waited for the lock.
+            if self._version_stamp.signature() == self._version_signature:
+                return False
+            print(f"INFO (RulesBasedChatbot): Rule-set version changed (loaded: {self.rules_version}). Reloading rules.")
+            self._load_rules_from_csv()
+            print(f"INFO (RulesBasedChatbot): Reloaded {self.rule_count} rules at version {self.rules_version}.")
+            return True
+
+    def publish_rules_update(self):
+        """
+        Reloads this instance and bumps the shared version stamp so every other worker
+        process picks up the new rules on its next request.
+        """
+        self._version_stamp.bump()
+        self._load_rules_from_csv()
 
-    def _find_matching_rule(self, current_input, current_context):
+    def _find_matching_rule(self, plan, current_input, current_context):
         print(f"DEBUG (RulesBasedChatbot): _find_matching_rule: input='{current_input}', context='{current_context}'")
-        for rule in self.rules_list:
-            pattern_match = rule['Pattern'] == '*' or (rule['Pattern'] and rule['Pattern'] in current_input)
-            context_match = rule['Context_Required'] == current_context
-            if context_match and pattern_match:
-                print(f"DEBUG (RulesBasedChatbot): Contextual match found: Rule ID '{rule['Rule_ID']}'")
-                return rule
-
-        for rule in self.rules_list:
-            pattern_match = rule['Pattern'] == '*' or (rule['Pattern'] and rule['Pattern'] in current_input)
-            if not rule['Context_Required'] and pattern_match:
-                print(f"DEBUG (RulesBasedChatbot): General match found: Rule ID '{rule['Rule_ID']}'")
-                return rule
-        return None
-
-    def get_response(self, user_input: str, current_session) -> str:
-        processed_input = user_input.lower().strip()
+        if plan.rule_index is None:
+            return None
+        rule = plan.compiled.rule(plan.rule_index)
+        match_kind = 'Contextual' if rule['Context_Required'] else 'General'
+        print(f"DEBUG (RulesBasedChatbot): {match_kind} match found: Rule ID '{rule['Rule_ID']}'")
+        return rule
+
+    def matched_rule_id(self, user_input, context=None):
+        """Rule_ID of the rule a turn would match first (before any GoTo), or None if it would fall back. Logs nothing."""
+        rule = self._compiled.find(normalize_input(user_input), context)
+        return rule['Rule_ID'] if rule else None
+
+    def plan_turn(self, user_input, current_session):
+        """
+        Matches the turn against the rules and, if none matches, looks it up in the answer caches.
+        Cheap (no Gemini call), so the web path can pick an execution lane from it; pass the plan to
+        get_response() so the turn does not match again.
+        """
+        compiled = self._compiled
+        rule_index = compiled.find_index(normalize_input(user_input), current_session.get('chatbot_context'))
+        if rule_index is not None:
+            return TurnPlan(compiled, rule_index)
+        return TurnPlan(compiled, None, self._cached_answer(user_input, current_session))
+
+    @staticmethod
+    def _stands_alone(context, history):
+        # Gemini's answer depends on the whole prompt, which carries the context and recent history;
+        # only the first, context-free turn of a conversation asks a question that stands on its own.
+        # Both answer caches serve and learn from those turns only, and only those are logged as misses.
+        return context is None and not history
+
+    def _cached_answer(self, user_input, current_session):
+        if self.isolated or not self._stands_alone(current_session.get('chatbot_context'),
+                                                   current_session.get(HISTORY_SESSION_KEY)):
+            return None
+        cached_answer = self.answer_cache.lookup(user_input)
+        if cached_answer is not None:
+            print(f"INFO (RulesBasedChatbot): Answered '{user_input[:50]}' from the precomputed answer cache.")
+            return cached_answer
+        semantic_cache = self.semantic_cache
+        if semantic_cache is not None:
+            cached_answer = semantic_cache.lookup(user_input)
+            if cached_answer is not None:
+                print(f"INFO (RulesBasedChatbot): Answered '{user_input[:50]}' from the semantic answer cache.")
+        return cached_answer
+
+    def _call_llm_fallback(self, user_input, current_session, llm_allowed=None, cached_answer=_NOT_LOOKED_UP):
+        stands_alone = not self.isolated and self._stands_alone(current_session.get('chatbot_context'),
+                                                                current_session.get(HISTORY_SESSION_KEY))
+        if stands_alone:
+            self.miss_log.record(user_input)
+        if cached_answer is _NOT_LOOKED_UP:
+            cached_answer = self._cached_answer(user_input, current_session)
+        if cached_answer is not None:
+            return cached_answer
+        semantic_cache = self.semantic_cache if stands_alone else None
+        # Only real Gemini calls spend from the client's LLM budget; cached answers above are free.
+        if llm_allowed is not None and not llm_allowed():
+            print(f"WARNING (RulesBasedChatbot): LLM budget exhausted for this client; not calling Gemini for '{user_input[:50]}'.")
+            return LLM_RATE_LIMITED_RESPONSE
+
+        # The prompt carries recent turns and the context active before the fallback clears it,
+        # under a fixed token budget, so the model can answer follow-ups without the user re-asking.
+        prompt = build_prompt(user_input,
+                              history=current_session.get(HISTORY_SESSION_KEY),
+                              context=current_session.get('chatbot_context'))
+        # Resolved at call time so benchmarks/tests can inject a stub (or patch get_gemini_response).
+        fallback = self.llm_fallback or get_gemini_response
+        answer = fallback(prompt)
+        if semantic_cache is not None and not is_gemini_error_response(answer):
+            semantic_cache.add(user_input, answer)
+        return answer
+
+    def _record_turn(self, current_session, user_input, response):
+        history = list(current_session.get(HISTORY_SESSION_KEY) or [])
+        history.append({'role': 'user', 'text': user_input})
+        history.append({'role': 'bot', 'text': response})
+        # Reassigned rather than mutated in place, so session stores see the change.
+        current_session[HISTORY_SESSION_KEY] = history[-MAX_HISTORY_MESSAGES:]
+
+    def get_response(self, user_input: str, current_session, llm_allowed=None, plan=None) -> str:
+        """
+        llm_allowed: optional callable() -> bool, asked right before a Gemini call (e.g. a per-client rate limit).
+        plan: this turn's plan_turn() result, if the caller already made one.
+        """
+        if plan is None:
+            plan = self.plan_turn(user_input, current_session)
+        response = self._generate_response(user_input, current_session, llm_allowed, plan)
+        self._record_turn(current_session, user_input, response)
+        return response
+
+    def _generate_response(self, user_input: str, current_session, llm_allowed, plan) -> str:
+        processed_input = normalize_input(user_input)
         current_context = current_session.get('chatbot_context')
 
         print(f"DEBUG (RulesBasedChatbot): get_response - User Input='{user_input}', Processed='{processed_input}', Context='{current_context}'")
 
         final_response_parts = []
         next_rule_id_to_process = None
-        max_goto_loops = 5
+        max_goto_loops = MAX_GOTO_LOOPS
         loops = 0
         visited_rules_in_chain = set()
 
-        matched_rule = self._find_matching_rule(processed_input, current_context)
+        matched_rule = self._find_matching_rule(plan, processed_input, current_context)
 
         if matched_rule:
             print(f"DEBUG (RulesBasedChatbot): Initial match: Rule ID '{matched_rule['Rule_ID']}' with response '{matched_rule['Response'][:50]}...' ")
@@ -147,10 +397,11 @@ class RulesBasedChatbot:
             next_rule_id_to_process = matched_rule.get('GoTo_Rule_ID')
         else:
             print(f"INFO (RulesBasedChatbot): No initial rule matched for '{processed_input}' with context '{current_context}'. Fallback to Gemini.")
+            response = self._call_llm_fallback(user_input, current_session, llm_allowed, plan.cached_answer)
             if current_session.get('chatbot_context') is not None:
-                 print(f"DEBUG (RulesBasedChatbot): Clearing context before Gemini call.")
+                 print(f"DEBUG (RulesBasedChatbot): Clearing context after building the Gemini prompt.")
             current_session.pop('chatbot_context', None)
-            return get_gemini_response(user_input)
+            return response
 
         while next_rule_id_to_process and loops < max_goto_loops:
             loops += 1
@@ -160,7 +411,7 @@ class RulesBasedChatbot:
             visited_rules_in_chain.add(next_rule_id_to_process)
 
             print(f"DEBUG (RulesBasedChatbot): Processing GoTo_Rule_ID: '{next_rule_id_to_process}', Loop: {loops}")
-            goto_rule = self.rules_by_id.get(next_rule_id_to_process)
+            goto_rule = plan.compiled.get(next_rule_id_to_process)
             if goto_rule:
                 if goto_rule['Response']:
                     final_response_parts.append(goto_rule['Response'])
@@ -188,28 +439,305 @@ class RulesBasedChatbot:
 
         if not final_response_parts:
             print(f"INFO (RulesBasedChatbot): Rule chain resulted in no response. Fallback to Gemini for input '{user_input}'.")
+            response = self._call_llm_fallback(user_input, current_session, llm_allowed)
             if current_session.get('chatbot_context') is not None:
-                 print(f"DEBUG (RulesBasedChatbot): Clearing context before Gemini call due to empty chain response.")
+                 print(f"DEBUG (RulesBasedChatbot): Clearing context after building the Gemini prompt, due to empty chain response.")
             current_session.pop('chatbot_context', None)
-            return get_gemini_response(user_input)
+            return response
 
         return "\\n".join(final_response_parts) # Join chained responses with literal newlines for HTML display
 
+    def explain(self, user_input: str, context=None, candidate_limit=200):
+        """
+        Dry run of one turn for the admin explain report: which rules were examined, which one was
+        chosen and why, each GoTo step with its context transition, and whether Gemini would be
+        called, with per-stage timings. Nothing is written: no session, miss log or LLM call.
+        The match stage is timed on the same compiled path get_response uses (FlatRuleTable.find_index).
+        """
+        timings = {}
+        started = time.perf_counter()
+        processed_input = normalize_input(user_input)
+        timings['normalize_ms'] = (time.perf_counter() - started) * 1000
+
+        compiled = self._compiled # One snapshot for the whole explanation, even if a reload lands meanwhile
+        started = time.perf_counter()
+        rule_index = compiled.find_index(processed_input, context)
+        timings['match_ms'] = (time.perf_counter() - started) * 1000
+
+        report = {
+            'input': user_input, 'processed_input': processed_input, 'context_before': context,
+            'rules_version': self.rules_version, 'matched_rule': None, 'reason': None, 'steps': [],
+            'response': None, 'context_after': context, 'calls_llm': False, 'answer_cache_hit': False,
+            'timings': timings,
+        }
+
+        started = time.perf_counter()
+        examined, total_examined = compiled.trace_candidates(processed_input, context, limit=candidate_limit)
+        report['candidates'] = [dict(entry, **_rule_summary(compiled.rule(entry['rule_index']))) for entry in examined]
+        report['candidates_examined'] = total_examined
+        report['excluded_matches'] = self._excluded_matches(compiled, processed_input, context)
+        timings['trace_ms'] = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        response_parts = []
+        current_context = context
+        if rule_index is not None:
+            matched_rule = compiled.rule(rule_index)
+            report['matched_rule'] = _rule_summary(matched_rule)
+            report['reason'] = _match_reason(matched_rule, context)
+            # Mirrors _generate_response: initial rule, then GoTo hops with loop and hop-count guards.
+            visited = set()
+            rule = matched_rule
+            while rule is not None:
+                visited.add(rule['Rule_ID'])
+                if rule['Response']:
+                    response_parts.append(rule['Response'])
+                context_before_step = current_context
+                if rule.get('Set_Context_On_Response') in ('clear', ''):
+                    current_context = None
+                elif rule.get('Set_Context_On_Response'):
+                    current_context = rule['Set_Context_On_Response']
+                step = {'Rule_ID': rule['Rule_ID'], 'response': rule['Response'],
+                        'context_before': context_before_step, 'context_after': current_context}
+                report['steps'].append(step)
+
+                next_rule_id = rule.get('GoTo_Rule_ID')
+                rule = None
+                if not next_rule_id:
+                    break
+                if len(report['steps']) > MAX_GOTO_LOOPS:
+                    step['stopped'] = f"max GoTo hops ({MAX_GOTO_LOOPS}) reached before '{next_rule_id}'"
+                elif next_rule_id in visited:
+                    step['stopped'] = f"GoTo loop: '{next_rule_id}' already ran in this chain"
+                else:
+                    rule = compiled.get(next_rule_id)
+                    if rule is None:
+                        step['stopped'] = f"GoTo target '{next_rule_id}' not found"
+        timings['goto_chain_ms'] = (time.perf_counter() - started) * 1000
+
+        if response_parts:
+            report['response'] = "\\n".join(response_parts)
+            report['context_after'] = current_context
+        else:
+            # No match, or a chain with no response text: the turn falls back (and the context is cleared).
+            started = time.perf_counter()
+            # The dry run has no history, so only the context decides whether the caches apply.
+            cached_answer = None
+            if not self.isolated and self._stands_alone(current_context, None):
+                cached_answer = self.answer_cache.lookup(user_input)
+                semantic_cache = self.semantic_cache
+                if cached_answer is None and semantic_cache is not None:
+                    cached_answer = semantic_cache.lookup(user_input, touch=False)
+            timings['answer_cache_ms'] = (time.perf_counter() - started) * 1000
+            report['answer_cache_hit'] = cached_answer is not None
+            report['calls_llm'] = cached_answer is None
+            report['response'] = cached_answer
+            report['context_after'] = None
+            if report['reason'] is None:
+                report['reason'] = 'No rule matched in the current context or the general rules.'
+        timings['total_ms'] = sum(timings.values())
+        return report
+
+    def _excluded_matches(self, compiled, processed_input, context, limit=20):
+        # Rules the loader's analysis left out of matching (shadowed / unreachable context) that would
+        # match this input: the usual answer to "why didn't my new rule fire?".
+        excluded = self.rule_analysis.get('excluded_from_matching') or ()
+        shadowed_by = {entry['Rule_ID']: entry['Shadowed_By'] for entry in self.rule_analysis.get('shadowed', ())}
+        input_tokens = tokenize(processed_input)
+        matches = []
+        for rule_index in sorted(excluded):
+            rule = compiled.rule(rule_index)
+            if rule['Context_Required'] not in (context, None):
+                continue
+            keyword_tokens = parse_keyword_pattern(rule['Pattern'])
+            if keyword_tokens is not None:
+                matched = keyword_tokens <= input_tokens
+            else:
+                matched = rule['Pattern'] == '*' or rule['Pattern'] in processed_input
+            if matched:
+                entry = _rule_summary(rule)
+                entry['Shadowed_By'] = shadowed_by.get(rule['Rule_ID'])
+                matches.append(entry)
+                if len(matches) >= limit:
+                    break
+        return matches
+
+def _rule_summary(rule):
+    return {field: rule.get(field) for field in ('Rule_ID', 'Context_Required', 'Pattern', 'Set_Context_On_Response', 'GoTo_Rule_ID')}
+
+def _match_reason(rule, context):
+    if rule['Context_Required']:
+        where = f"the first rule requiring context '{rule['Context_Required']}'"
+    elif context:
+        where = f"no rule requiring context '{context}' matched; the first general rule"
+    else:
+        where = "the first general rule"
+    if rule['Pattern'] == '*':
+        return f"{where} is a '*' wildcard."
+    if parse_keyword_pattern(rule['Pattern']) is not None:
+        return f"{where} whose keywords ({rule['Pattern']}) all appear as words in the input."
+    return f"{where} whose pattern '{rule['Pattern']}' appears in the input."
+
+def _estimate_rules_bytes(rules_list, rules_by_id):
+    # Shallow sizes of the containers, dicts and field strings; interned/shared strings are over-counted slightly.
+    total = sys.getsizeof(rules_list) + sys.getsizeof(rules_by_id)
+    for rule in rules_list:
+        total += sys.getsizeof(rule)
+        for value in rule.values():
+            if value is not None:
+                total += sys.getsizeof(value)
+    return total
+
+def _build_semantic_cache():
+    config = get_config()
+    if not config.semantic_cache_enabled:
+        return None
+    if not semantic_cache_available():
+        print("WARNING (RulesBasedChatbot): NumPy is not installed; the semantic answer cache is disabled.")
+        return None
+    return SemanticAnswerCache(capacity=config.semantic_cache_capacity, threshold=config.semantic_cache_threshold)
+
+def _semantic_cache_reserve_bytes():
+    config = get_config()
+    if not config.semantic_cache_enabled or not semantic_cache_available():
+        return 0
+    return matrix_bytes(config.semantic_cache_capacity)
+
 # --- Singleton Instance Management ---
 _chatbot_instance = None
-
-def get_chatbot_instance():
+_tenant_registry = None
+
+def get_tenant_registry():
+    """Registry of non-default tenant instances, bounded by CHATBOT_TENANT_CACHE_MAX tenants and CHATBOT_TENANT_CACHE_MB."""
+    global _tenant_registry
+    if _tenant_registry is None:
+        config = get_config()
+        _tenant_registry = TenantRegistry(
+            loader=lambda tenant_id: RulesBasedChatbot(rules_csv_path=tenant_rules_csv_path(tenant_id)),
+            max_tenants=config.tenant_cache_max,
+            max_bytes=int(config.tenant_cache_mb * 1024 * 1024),
+        )
+    return _tenant_registry
+
+def get_chatbot_instance(tenant_id=None):
+    """
+    Returns the chatbot for tenant_id. The default tenant (None or DEFAULT_TENANT_ID) is the
+    process-wide singleton built at startup (and preloaded before fork); every other tenant is
+    loaded on first use and cached in the tenant registry's LRU.
+    """
     global _chatbot_instance
+    if tenant_id and tenant_id != DEFAULT_TENANT_ID:
+        return get_tenant_registry().get(tenant_id)
     if _chatbot_instance is None:
         print("INFO (RulesBasedChatbot Module): Creating new RulesBasedChatbot singleton instance.")
         _chatbot_instance = RulesBasedChatbot()
     return _chatbot_instance
 
+def get_conversation_session(tenant_id=None):
+    """
+    Returns the server-side session mapping for the current web request.
+    Flask's signed cookie only carries the opaque session ID; it is set once, so the cookie is
+    not re-signed and re-sent on every turn however much conversation state is kept server-side.
+    Each tenant gets its own session under the same cookie, so context never leaks between brands.
+    Changes are saved by the mapping's commit(), which get_response_for_web calls once per turn.
+    """
+    sid = session.get(SESSION_ID_COOKIE_KEY)
+    store = get_session_store()
+    if not sid:
+        sid = store.new_session_id()
+        session[SESSION_ID_COOKIE_KEY] = sid
+    if tenant_id and tenant_id != DEFAULT_TENANT_ID:
+        return store.session_for(f"{sid}:{tenant_id}")
+    return store.session_for(sid)
+
+def _rules_memory_report():
+    report = {'bytes': 0, 'rules': 0}
+    if _chatbot_instance is not None:
+        report = {'bytes': _chatbot_instance.memory_bytes(), 'rules': _chatbot_instance.rule_count,
+                  'compiled_table_bytes': _chatbot_instance._compiled.memory_bytes(),
+                  'rules_version': _chatbot_instance.rules_version}
+    if _tenant_registry is not None:
+        # Rule sets only: the registry's accounted bytes also hold the answer caches, reported under 'answer_cache'.
+        report['bytes'] += sum(chatbot.memory_bytes() for chatbot in _tenant_registry.resident_instances())
+        report['tenants'] = _tenant_registry.stats()
+    return report
+
+def _answer_cache_memory_report():
+    instances = []
+    if _chatbot_instance is not None:
+        instances.append(_chatbot_instance)
+    if _tenant_registry is not None:
+        instances.extend(_tenant_registry.resident_instances())
+    # Only caches this process has built: reporting never allocates one.
+    semantic_caches = [chatbot._semantic_cache for chatbot in instances
+                       if chatbot._semantic_cache_pid == os.getpid() and chatbot._semantic_cache is not None]
+    return {'bytes': sum(chatbot.answer_cache.memory_bytes() for chatbot in instances)
+                     + sum(cache.memory_bytes() for cache in semantic_caches),
+            'answers': sum(len(chatbot.answer_cache) for chatbot in instances),
+            'semantic_answers': sum(len(cache) for cache in semantic_caches),
+            'semantic_hits': sum(cache.hits for cache in semantic_caches)}
+
+register_memory_reporter('rules', _rules_memory_report)
+register_memory_reporter('answer_cache', _answer_cache_memory_report)
+
 # This is the main function imported and used by app.py
-def get_response_for_web(user_input: str) -> str:
-    chatbot = get_chatbot_instance()
-    # 'session' is Flask's session proxy, available in request context.
-    return chatbot.get_response(user_input, session)
+def get_response_for_web(user_input: str, tenant_id=None, client_key=None) -> str:
+    chatbot = get_chatbot_instance(tenant_id)
+    chatbot.refresh_if_stale() # Picks up rules published by other worker processes
+    # A turn that would call Gemini also spends from the client's (shared, per-host) LLM budget.
+    llm_allowed = functools.partial(get_rate_limiter().allow_llm_call, client_key) if client_key else None
+    # 'session' is Flask's session proxy, available in request context; chatbot state lives server-side.
+    conversation_session = get_conversation_session(tenant_id)
+    try:
+        return _answer_turn(chatbot, user_input, tenant_id, conversation_session, llm_allowed)
+    finally:
+        conversation_session.commit() # One save per turn, whatever the turn changed
+
+def _answer_turn(chatbot, user_input, tenant_id, conversation_session, llm_allowed):
+    capture = get_traffic_capture()
+    if capture is not None:
+        conversation_id = capture.conversation_id(conversation_session.sid)
+        if capture.sampled(conversation_id):
+            context_before = conversation_session.get('chatbot_context')
+            started = time.perf_counter()
+            plan = chatbot.plan_turn(user_input, conversation_session)
+            response = _run_in_lane(chatbot, user_input, conversation_session, llm_allowed, plan)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            # The rule the turn itself matched (not a re-match, which a reload in between could change).
+            capture.record(conversation_id, tenant_id or DEFAULT_TENANT_ID, user_input, context_before,
+                           plan.rule_id, response, elapsed_ms)
+            return response
+    return _run_in_lane(chatbot, user_input, conversation_session, llm_allowed,
+                        chatbot.plan_turn(user_input, conversation_session))
+
+def _run_in_lane(chatbot, user_input, conversation_session, llm_allowed, plan):
+    # Rule-answered turns run inline; Gemini fallbacks go through the bounded LLM lane, so a burst of
+    # slow fallbacks cannot occupy every server thread ahead of a "hello".
+    lanes = get_chat_lanes()
+    if lanes is None:
+        return chatbot.get_response(user_input, conversation_session, llm_allowed, plan)
+    if not plan.calls_llm:
+        return lanes.run_fast(chatbot.get_response, user_input, conversation_session, llm_allowed, plan)
+    # The lane turn works on a copy of the session that is written back only while this request is
+    # still waiting for it: a turn that times out finishes into its copy, never over newer turns.
+    turn_session = dict(conversation_session)
+    try:
+        # follow(): a sampled request's profile also covers the Gemini turn on the lane's thread.
+        response = lanes.run_llm(get_request_profiler().follow(chatbot.get_response), user_input, turn_session,
+                                 llm_allowed, plan)
+    except LaneFull:
+        print(f"WARNING (RulesBasedChatbot): LLM lane full; turned away '{user_input[:50]}'.")
+        return LLM_LANE_BUSY_RESPONSE
+    except LaneTimeout:
+        print(f"WARNING (RulesBasedChatbot): LLM lane timed out after {lanes.llm_timeout:g}s for '{user_input[:50]}'; "
+              f"its answer will be discarded.")
+        return LLM_LANE_TIMEOUT_RESPONSE
+    for key in [key for key in conversation_session if key not in turn_session]:
+        del conversation_session[key]
+    for key, value in turn_session.items():
+        if conversation_session.get(key) != value:
+            conversation_session[key] = value
+    return response
 
 # --- Direct Test Block (for module-level testing) ---
 if __name__ == '__main__':
@@ -0,0 +1,263 @@
+import json
+import os
+import secrets
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import MutableMapping
+
+from chatbot.chatbot.core.config import get_config
+from chatbot.chatbot.core.memory_report import register_memory_reporter, deep_getsizeof
+
+DEFAULT_SESSION_TTL_SECONDS = 30 * 60
+DEFAULT_MAX_SESSIONS = 10000
+SESSION_ID_COOKIE_KEY = 'sid' # The only value kept in Flask's signed cookie session
+
+class SqliteSessionBackend:
+    """
+    Optional local persistent tier for SessionStore: one row per session in a SQLite file.
+    Sessions survive restarts, and a worker that has never seen a session can load it on a cache miss.
+    Each row carries a version, bumped on every save, so a worker can tell whether its cached copy
+    is still the latest without loading and decoding the data.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS sessions (sid TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at REAL NOT NULL, '
+                           'version INTEGER NOT NULL DEFAULT 0)')
+        columns = [row[1] for row in self._conn.execute('PRAGMA table_info(sessions)')]
+        if 'version' not in columns: # A database written before rows were versioned
+            self._conn.execute('ALTER TABLE sessions ADD COLUMN version INTEGER NOT NULL DEFAULT 0')
+
+    def load(self, sid, now):
+        """Returns (data, version) for sid, or None if unknown or expired."""
+        with self._lock:
+            row = self._conn.execute('SELECT data, expires_at, version FROM sessions WHERE sid = ?', (sid,)).fetchone()
+        if row is None or row[1] <= now:
+            return None
+        return json.loads(row[0]), row[2]
+
+    def version(self, sid, now):
+        """The stored version of sid (a primary-key lookup, no data decoded), or None if unknown or expired."""
+        with self._lock:
+            row = self._conn.execute('SELECT expires_at, version FROM sessions WHERE sid = ?', (sid,)).fetchone()
+        if row is None or row[0] <= now:
+            return None
+        return row[1]
+
+    def save(self, sid, data, expires_at):
+        """Writes data for sid and returns its new version."""
+        payload = json.dumps(data)
+        with self._lock:
+            # One transaction, so no other process's save can land between the write and the version read.
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._conn.execute('INSERT INTO sessions (sid, data, expires_at, version) VALUES (?, ?, ?, 1) '
+                                   'ON CONFLICT(sid) DO UPDATE SET data = excluded.data, expires_at = excluded.expires_at, '
+                                   'version = sessions.version + 1', (sid, payload, expires_at))
+                version = self._conn.execute('SELECT version FROM sessions WHERE sid = ?', (sid,)).fetchone()[0]
+                self._conn.execute('COMMIT')
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+        return version
+
+    def delete(self, sid):
+        with self._lock:
+            self._conn.execute('DELETE FROM sessions WHERE sid = ?', (sid,))
+
+    def purge_expired(self, now):
+        with self._lock:
+            return self._conn.execute('DELETE FROM sessions WHERE expires_at <= ?', (now,)).rowcount
+
+
+class ServerSideSession(MutableMapping):
+    """
+    Dict-like view of one session's server-side data. It supports the same get/pop/[]= calls
+    RulesBasedChatbot.get_response makes on Flask's session, so it can be passed in its place.
+    Mutations only mark the session dirty; commit() writes it to the store (and its persistent
+    backend, if any) once, so a turn that sets the context and appends history costs one save.
+    """
+
+    def __init__(self, store, sid, data, dirty=False):
+        self.store = store
+        self.sid = sid
+        self._data = data
+        self._dirty = dirty
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __setitem__(self, key, value):
+        self._data[key] = value
+        self._dirty = True
+
+    def __delitem__(self, key):
+        del self._data[key]
+        self._dirty = True
+
+    def commit(self):
+        """Saves the session if anything changed since it was loaded (or last committed)."""
+        if self._dirty:
+            self._dirty = False
+            self.store.save(self.sid, self._data)
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __repr__(self):
+        return f"ServerSideSession(sid={self.sid!r}, data={self._data!r})"
+
+
+class SessionStore:
+    """
+    Server-side chatbot session store keyed by an opaque session ID.
+
+    The in-memory tier is an OrderedDict kept in least-recently-used order, so lookups, updates,
+    LRU eviction and TTL expiry are all O(1) (amortized) regardless of how many sessions are live.
+    Entries expire ttl_seconds after their last access. An optional persistent backend is written
+    on every save and is the authority: a cached entry is served only while its version matches the
+    backend row's (one primary-key lookup), so a turn served by another worker is never answered
+    from this worker's stale copy.
+
+    The in-memory tier is per process; behind several workers without sticky routing, configure
+    the persistent backend so a session can be picked up by whichever worker serves the next turn.
+    """
+
+    def __init__(self, ttl_seconds=DEFAULT_SESSION_TTL_SECONDS, max_sessions=DEFAULT_MAX_SESSIONS, backend=None, clock=time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.backend = backend
+        # The persistent tier stores wall-clock expiry; the in-memory tier uses the (injectable) clock.
+        self._clock = clock
+        self._entries = OrderedDict() # sid -> [data, expires_at, backend version (0 = not saved yet)]
+        self._lock = threading.Lock()
+        self._writes_since_purge = 0
+
+    @staticmethod
+    def new_session_id():
+        return secrets.token_urlsafe(18)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _evict_locked(self, now):
+        # Least recently used entries sit at the front, so expired ones are always found there first.
+        while self._entries:
+            sid, entry = next(iter(self._entries.items()))
+            if entry[1] > now and len(self._entries) <= self.max_sessions:
+                break
+            self._entries.popitem(last=False)
+
+    def get(self, sid):
+        """Returns the data dict for sid (refreshing its TTL), or None if unknown or expired."""
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(sid)
+            if entry is not None:
+                if entry[1] > now:
+                    entry[1] = now + self.ttl_seconds
+                    self._entries.move_to_end(sid)
+                    data, version = entry[0], entry[2]
+                else:
+                    del self._entries[sid]
+                    entry = None
+        if self.backend is None:
+            return data if entry is not None else None
+        wall_now = time.time()
+        if entry is not None:
+            stored_version = self.backend.version(sid, wall_now)
+            if stored_version == version or (stored_version is None and version == 0):
+                return data
+        loaded = self.backend.load(sid, wall_now)
+        if loaded is None:
+            with self._lock:
+                self._entries.pop(sid, None)
+            return None
+        data, version = loaded
+        with self._lock:
+            self._entries[sid] = [data, now + self.ttl_seconds, version]
+            self._entries.move_to_end(sid)
+            self._evict_locked(now)
+        return data
+
+    def save(self, sid, data):
+        now = self._clock()
+        version = 0
+        if self.backend is not None:
+            wall_now = time.time()
+            version = self.backend.save(sid, data, wall_now + self.ttl_seconds)
+            with self._lock:
+                self._writes_since_purge += 1
+                purge = self._writes_since_purge >= 1000
+                if purge:
+                    self._writes_since_purge = 0
+            if purge:
+                self.backend.purge_expired(wall_now)
+        with self._lock:
+            self._entries[sid] = [data, now + self.ttl_seconds, version]
+            self._entries.move_to_end(sid)
+            self._evict_locked(now)
+
+    def delete(self, sid):
+        with self._lock:
+            self._entries.pop(sid, None)
+        if self.backend is not None:
+            self.backend.delete(sid)
+
+    def memory_bytes(self):
+        """Approximate memory held by the in-memory tier (all live session dicts, IDs and the index)."""
+        with self._lock:
+            index_bytes = sys.getsizeof(self._entries)
+            entries = list(self._entries.items())
+        # Walked outside the lock: with many sessions the walk is slow, and chat turns must not wait on it.
+        return index_bytes + deep_getsizeof(entries) - sys.getsizeof(entries)
+
+    def session_for(self, sid):
+        """
+        Returns a ServerSideSession mapping for sid, creating an empty session if needed.
+        The caller commits it once the turn is done; a new session is saved by that commit.
+        """
+        data = self.get(sid)
+        if data is None:
+            return ServerSideSession(self, sid, {}, dirty=True)
+        return ServerSideSession(self, sid, data)
+
+
+# --- Singleton Store Management ---
+_session_store = None
+_session_store_lock = threading.Lock()
+
+def get_session_store():
+    """
+    Process-wide store configured from AppConfig (CHATBOT_SESSION_TTL_SECONDS, CHATBOT_SESSION_MAX and,
+    for the persistent tier, CHATBOT_SESSION_DB), built on first use and kept for the process's life.
+    """
+    global _session_store
+    if _session_store is None:
+        with _session_store_lock:
+            if _session_store is None:
+                config = get_config()
+                ttl_seconds = config.session_ttl_seconds
+                max_sessions = config.session_max
+                db_path = config.session_db
+                backend = SqliteSessionBackend(db_path) if db_path else None
+                print(f"INFO (session_store): Server-side sessions: ttl={ttl_seconds}s, max={max_sessions}, persistent backend: {db_path or 'none'}.")
+                _session_store = SessionStore(ttl_seconds=ttl_seconds, max_sessions=max_sessions, backend=backend)
+    return _session_store
+
+def _session_memory_report():
+    if _session_store is None:
+        return {'bytes': 0, 'sessions': 0}
+    return {'bytes': _session_store.memory_bytes(), 'sessions': len(_session_store), 'max_sessions': _session_store.max_sessions}
+
+register_memory_reporter('sessions', _session_memory_report)
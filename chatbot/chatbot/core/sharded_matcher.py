@@ -0,0 +1,232 @@
+import marshal
+import multiprocessing
+import os
+import queue
+import threading
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait
+
+from chatbot.chatbot.core.flat_rules import FlatRuleTable
+
+SHARD_START_TIMEOUT_SECONDS = 300 # Compiling a shard of a million-rule set takes a while
+RETIRE_GRACE_SECONDS = 30 # A replaced matcher keeps serving in-flight queries this long before its shards stop
+
+class ShardedRuleMatcher:
+    """
+    Drop-in replacement for FlatRuleTable that runs the match in a pool of shard processes, for
+    rule sets too large to scan on one core. This spreads match CPU over cores; it does not shrink
+    the web worker: each worker still holds the parsed rules_list (rule()/get() read it for
+    responses and GoTo hops), and each worker starts its own shards.
+
+    The rules are split into contiguous ranges, one per shard. The match-relevant fields (Rule_ID,
+    Context_Required, Pattern) are handed to the shards through a shared memory block that is
+    unlinked once they have started; each shard compiles a private FlatRuleTable of its range, so
+    the worker itself builds no compiled table. A query goes to every shard, which answers with its
+    first match in each of find_index's two passes (context bucket, then general rules); the lowest
+    global index of the first non-empty pass is the match, which is exactly FlatRuleTable's
+    CSV-order first-match result.
+
+    Request threads check out a channel (one pipe per shard) for the duration of a query, so up to
+    `channels` queries are in flight at once while the shards work in parallel; waiting on a pipe
+    releases the GIL. The shards are started by the first query in each process, not when the
+    matcher is built: a matcher built in a pre-fork master (preload) must not hand its pipes to
+    every forked worker, where concurrent queries would read each other's replies. If a shard
+    process dies, matching falls back to a local FlatRuleTable.
+    """
+
+    def __init__(self, rules_list, excluded_indices=(), shards=None, channels=8, rules_by_id=None):
+        self.shard_count = max(1, min(shards or os.cpu_count() or 1, len(rules_list) or 1))
+        self._rules_list = rules_list
+        self._excluded_indices = excluded_indices
+        self._channel_count = channels
+        # GoTo lookups by Rule_ID reuse the loader's rules_by_id when given, instead of a third index.
+        self._rules_by_id = rules_by_id if rules_by_id is not None else {rule['Rule_ID']: rule for rule in rules_list}
+        self._local_table = None # Built only if a shard fails, or for diagnostics (trace_candidates)
+        self._local_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._owner_pid = None # Process whose shards and pipes these are; None until the first query
+        self._failed = False
+        self._processes = []
+        self._channels = queue.Queue()
+        self._matchable_count = 0
+        self._shard_bytes = 0
+
+    def _ensure_started(self):
+        """Starts this process's shards on first use; returns False if matching has to stay local."""
+        if self._owner_pid == os.getpid():
+            return not self._failed
+        with self._start_lock:
+            if self._owner_pid == os.getpid():
+                return not self._failed
+            if self._owner_pid is not None:
+                # Inherited across fork: the shards and pipes belong to the parent. Drop our copies of
+                # its pipe ends (the parent keeps its own) and start shards for this process.
+                self._drain_channels()
+                self._processes = []
+                self._matchable_count = 0
+                self._shard_bytes = 0
+            self._failed = False
+            try:
+                self._start(self._excluded_indices, self._channel_count)
+            except (OSError, RuntimeError) as e:
+                print(f"ERROR (ShardedRuleMatcher): Could not start the rule shards ({e}). Matching in-process.")
+                self._failed = True
+            self._owner_pid = os.getpid()
+            return not self._failed
+
+    def _start(self, excluded_indices, channel_count):
+        bounds = [len(self._rules_list) * k // self.shard_count for k in range(self.shard_count + 1)]
+        payloads = []
+        for start, end in zip(bounds, bounds[1:]):
+            rows = [(rule['Rule_ID'], rule.get('Context_Required'), rule.get('Pattern') or '')
+                    for rule in self._rules_list[start:end]]
+            excluded_local = [rule_index - start for rule_index in excluded_indices if start <= rule_index < end]
+            payloads.append(marshal.dumps((start, rows, excluded_local)))
+        block = shared_memory.SharedMemory(create=True, size=max(1, sum(len(payload) for payload in payloads)))
+        try:
+            spans = []
+            position = 0
+            for payload in payloads:
+                block.buf[position:position + len(payload)] = payload
+                spans.append((position, position + len(payload)))
+                position += len(payload)
+
+            # Spawned, not forked: the web worker forking this may be running request threads.
+            context = multiprocessing.get_context('spawn')
+            channel_ends = [[] for _ in range(channel_count)] # Per channel: this side's end of each shard's pipe
+            for shard_index, span in enumerate(spans):
+                shard_ends = []
+                for channel in channel_ends:
+                    ours, theirs = context.Pipe()
+                    channel.append(ours)
+                    shard_ends.append(theirs)
+                process = context.Process(target=_shard_main, args=(block.name, span, shard_ends),
+                                          name=f'rule-shard-{shard_index}', daemon=True)
+                process.start()
+                for end in shard_ends:
+                    end.close()
+                self._processes.append(process)
+
+            # Every shard reports on its first channel once compiled; only then may the block go away.
+            for ours in channel_ends[0]:
+                if not ours.poll(SHARD_START_TIMEOUT_SECONDS):
+                    raise RuntimeError("A rule shard did not start in time.")
+                matchable_count, shard_bytes = ours.recv()
+                self._matchable_count += matchable_count
+                self._shard_bytes += shard_bytes
+        except BaseException:
+            self.close()
+            raise
+        finally:
+            block.close()
+            block.unlink()
+        for channel in channel_ends:
+            self._channels.put(channel)
+        print(f"INFO (ShardedRuleMatcher): {len(self._rules_list)} rules in {self.shard_count} shard processes "
+              f"({self._shard_bytes} bytes compiled), {channel_count} query channels.")
+
+    def __len__(self):
+        return len(self._rules_list)
+
+    @property
+    def matchable_count(self):
+        if not self._ensure_started():
+            return self._local().matchable_count
+        return self._matchable_count
+
+    def find_index(self, processed_input, current_context):
+        if not self._ensure_started():
+            return self._local().find_index(processed_input, current_context)
+        channel = self._channels.get()
+        try:
+            request = (processed_input, current_context)
+            for pipe in channel:
+                pipe.send(request)
+            replies = [pipe.recv() for pipe in channel]
+        except (OSError, EOFError) as e:
+            # The channel is now out of step with the shards; drop it and match locally from here on.
+            print(f"ERROR (ShardedRuleMatcher): Rule shard unavailable ({e!r}). Falling back to in-process matching.")
+            self._failed = True
+            return self._local().find_index(processed_input, current_context)
+        self._channels.put(channel)
+        context_matches = [context_match for context_match, _ in replies if context_match is not None]
+        if context_matches:
+            return min(context_matches)
+        general_matches = [general_match for _, general_match in replies if general_match is not None]
+        return min(general_matches) if general_matches else None
+
+    def find(self, processed_input, current_context):
+        rule_index = self.find_index(processed_input, current_context)
+        return self.rule(rule_index) if rule_index is not None else None
+
+    def rule(self, rule_index):
+        return dict(self._rules_list[rule_index])
+
+    def get(self, rule_id):
+        rule = self._rules_by_id.get(rule_id)
+        return dict(rule) if rule is not None else None
+
+    def trace_candidates(self, processed_input, current_context, limit=200):
+        # Diagnostics only (the explain report): replayed on an in-process table, built on first use.
+        return self._local().trace_candidates(processed_input, current_context, limit=limit)
+
+    def memory_bytes(self):
+        """Compiled size held by the shard processes (plus the local table, if one was built)."""
+        local_table = self._local_table
+        return self._shard_bytes + (local_table.memory_bytes() if local_table is not None else 0)
+
+    def _local(self):
+        if self._local_table is None:
+            with self._local_lock:
+                if self._local_table is None:
+                    self._local_table = FlatRuleTable(self._rules_list, excluded_indices=self._excluded_indices)
+        return self._local_table
+
+    def _drain_channels(self):
+        while True:
+            try:
+                channel = self._channels.get_nowait()
+            except queue.Empty:
+                break
+            for pipe in channel:
+                pipe.close()
+
+    def close(self):
+        """Stops the shard processes (closing their pipes makes them exit)."""
+        self._drain_channels()
+        if self._owner_pid == os.getpid(): # Only the process that started the shards can join them
+            for process in self._processes:
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.terminate()
+        self._processes = []
+
+    def retire(self):
+        """Closes the matcher after RETIRE_GRACE_SECONDS, once queries already holding it have finished."""
+        timer = threading.Timer(RETIRE_GRACE_SECONDS, self.close)
+        timer.daemon = True
+        timer.start()
+
+def _shard_main(block_name, span, connections):
+    block = shared_memory.SharedMemory(name=block_name)
+    try:
+        start, rows, excluded_local = marshal.loads(bytes(block.buf[span[0]:span[1]]))
+    finally:
+        block.close()
+    rules = [{'Rule_ID': rule_id, 'Context_Required': context, 'Pattern': pattern} for rule_id, context, pattern in rows]
+    del rows
+    table = FlatRuleTable(rules, excluded_indices=frozenset(excluded_local))
+    del rules
+    connections[0].send((table.matchable_count, table.memory_bytes()))
+
+    open_connections = list(connections)
+    while open_connections:
+        for connection in wait(open_connections):
+            try:
+                processed_input, current_context = connection.recv()
+            except (EOFError, OSError):
+                open_connections.remove(connection)
+                continue
+            context_match, general_match = table.first_matches(processed_input, current_context)
+            connection.send((None if context_match is None else context_match + start,
+                             None if general_match is None else general_match + start))
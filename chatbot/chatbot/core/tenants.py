@@ -0,0 +1,143 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from chatbot.chatbot.core.config import get_config
+
+PROJECT_ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+TENANTS_DIR = os.path.join(PROJECT_ROOT_DIR, 'chatbot', 'chatbot', 'data', 'tenants')
+
+DEFAULT_TENANT_ID = 'default' # The original single-brand deployment: data/rules.csv and web/appearance_settings.json
+TENANT_PATH_PREFIX = '/t/' # Path-mode tenants are served under /t/<tenant_id>/
+TENANT_ID_RE = re.compile(r'^[a-z0-9][a-z0-9_-]{0,62}$') # Also keeps tenant IDs safe to use as directory names
+
+def tenant_mode():
+    """How requests are mapped to tenants: 'off' (single tenant), 'host' or 'path'. From CHATBOT_TENANT_MODE."""
+    return get_config().tenant_mode
+
+def is_valid_tenant_id(tenant_id):
+    return bool(tenant_id) and TENANT_ID_RE.match(tenant_id) is not None
+
+def tenant_dir(tenant_id):
+    return os.path.join(TENANTS_DIR, tenant_id)
+
+def tenant_rules_csv_path(tenant_id):
+    return os.path.join(tenant_dir(tenant_id), 'rules.csv')
+
+def tenant_appearance_settings_path(tenant_id):
+    return os.path.join(tenant_dir(tenant_id), 'appearance_settings.json')
+
+def tenant_exists(tenant_id):
+    """A tenant is provisioned by creating data/tenants/<tenant_id>/ with its rules.csv."""
+    return is_valid_tenant_id(tenant_id) and os.path.isfile(tenant_rules_csv_path(tenant_id))
+
+def tenant_id_from_host(host):
+    """
+    Host-mode resolution: the first DNS label of the request host ("acme.chat.example.com" -> "acme"),
+    if such a tenant is provisioned; anything else (localhost, bare IPs, unknown brands) is the default tenant.
+    """
+    hostname = (host or '').split(':', 1)[0].strip().lower()
+    label = hostname.split('.', 1)[0]
+    if label != DEFAULT_TENANT_ID and tenant_exists(label):
+        return label
+    return DEFAULT_TENANT_ID
+
+class TenantRegistry:
+    """
+    Lazily loaded, LRU-evicted chatbot instances for non-default tenants.
+
+    An instance (its rules parsed, analysed and compiled) is built on a tenant's first request and
+    kept while there is room; when either bound is exceeded the least recently used tenants are
+    dropped and simply reloaded from their CSV on their next request. Bounds: max_tenants resident
+    instances and max_bytes of estimated memory (RulesBasedChatbot.resident_bytes(): rule set and
+    answer caches, measured by the instance when it loads or reloads its rules, never by get()).
+    The default tenant is not managed here: it stays the preloaded module singleton.
+    """
+
+    def __init__(self, loader, max_tenants=100, max_bytes=256 * 1024 * 1024):
+        self._loader = loader # Callable(tenant_id) -> RulesBasedChatbot
+        self.max_tenants = max(1, max_tenants)
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict() # tenant_id -> [chatbot, accounted_bytes], least recently used first
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._load_locks = {} # tenant_id -> Lock, so concurrent first requests load a tenant only once
+        self.loads = 0
+        self.evictions = 0
+
+    def get(self, tenant_id):
+        """Returns the tenant's chatbot, loading it (and evicting others) if it is not resident."""
+        with self._lock:
+            entry = self._entries.get(tenant_id)
+            if entry is not None:
+                self._entries.move_to_end(tenant_id)
+                self._reaccount_locked(tenant_id, entry)
+                return entry[0]
+            load_lock = self._load_locks.setdefault(tenant_id, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                entry = self._entries.get(tenant_id)
+                if entry is not None: # Loaded by a concurrent request while we waited
+                    self._entries.move_to_end(tenant_id)
+                    return entry[0]
+            print(f"INFO (TenantRegistry): Loading rules for tenant '{tenant_id}'.")
+            chatbot = self._loader(tenant_id) # Outside the registry lock: other tenants keep being served
+            with self._lock:
+                size = chatbot.resident_bytes()
+                self._entries[tenant_id] = [chatbot, size]
+                self._total_bytes += size
+                self.loads += 1
+                self._load_locks.pop(tenant_id, None)
+                self._evict_locked(keep=tenant_id)
+            return chatbot
+
+    def _reaccount_locked(self, tenant_id, entry):
+        # A resident tenant may have reloaded a bigger or smaller rule set since it was accounted.
+        # resident_bytes() is the figure cached at that reload, so this is a comparison, not a measurement.
+        size = entry[0].resident_bytes()
+        if size != entry[1]:
+            self._total_bytes += size - entry[1]
+            entry[1] = size
+            self._evict_locked(keep=tenant_id)
+
+    def _evict_locked(self, keep):
+        while self._entries and (len(self._entries) > self.max_tenants or self._total_bytes > self.max_bytes):
+            tenant_id = next(iter(self._entries))
+            if tenant_id == keep:
+                break # Never evict the tenant being served, even if it alone exceeds the memory bound
+            chatbot, size = self._entries.pop(tenant_id)
+            self._total_bytes -= size
+            self.evictions += 1
+            chatbot.release()
+            print(f"INFO (TenantRegistry): Evicted tenant '{tenant_id}' ({size // 1024} KiB); it will be reloaded on demand.")
+
+    def evict(self, tenant_id):
+        """Drops a tenant's instance (e.g. after its directory was removed); returns True if it was resident."""
+        with self._lock:
+            entry = self._entries.pop(tenant_id, None)
+            if entry is None:
+                return False
+            self._total_bytes -= entry[1]
+            entry[0].release()
+            return True
+
+    def resident_tenants(self):
+        with self._lock:
+            return list(self._entries)
+
+    def resident_instances(self):
+        """Loaded chatbots, without touching their LRU position (for reporting)."""
+        with self._lock:
+            return [entry[0] for entry in self._entries.values()]
+
+    def stats(self):
+        with self._lock:
+            return {'resident': len(self._entries), 'max_tenants': self.max_tenants,
+                    'bytes': self._total_bytes, 'max_bytes': self.max_bytes,
+                    'loads': self.loads, 'evictions': self.evictions}
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
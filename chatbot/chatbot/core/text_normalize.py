@@ -0,0 +1,43 @@
+import re
+import unicodedata
+
+_NON_WORD_RE = re.compile(r"[^\w\s]+")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+def normalize_question(text: str) -> str:
+    """
+    Canonical key for a free-text question: Unicode NFKC, casefolded, punctuation dropped,
+    whitespace collapsed. "When are you OPEN?" and "when are you open" share one key, so
+    recurring questions can be counted and answered from a lookup table.
+    """
+    text = unicodedata.normalize('NFKC', text).casefold()
+    text = _NON_WORD_RE.sub(' ', text)
+    return _WHITESPACE_RE.sub(' ', text).strip()
+
+_TOKEN_RE = re.compile(r"\w+")
+# Keyword-set patterns list words separated by a '+' with whitespace on both sides ("refund + order"),
+# so substring patterns that merely contain a plus sign ("c++", "1+1") are unaffected.
+_KEYWORD_SEPARATOR_RE = re.compile(r"\s+\+\s+")
+
+def normalize_input(text: str) -> str:
+    """
+    Per-turn normalization shared by user input and rule patterns: Unicode NFKC, casefolded,
+    runs of whitespace collapsed to one space, trimmed. Punctuation is kept so substring
+    patterns keep matching exactly what admins wrote.
+    """
+    return _WHITESPACE_RE.sub(' ', unicodedata.normalize('NFKC', text).casefold()).strip()
+
+def tokenize(normalized_text: str) -> frozenset:
+    """Distinct word tokens of already-normalized text."""
+    return frozenset(_TOKEN_RE.findall(normalized_text))
+
+def parse_keyword_pattern(normalized_pattern: str):
+    """
+    Returns the required token set of a keyword-set pattern ("refund + order" -> {'refund', 'order'}),
+    or None if the pattern is an ordinary substring pattern.
+    """
+    parts = _KEYWORD_SEPARATOR_RE.split(normalized_pattern)
+    if len(parts) < 2:
+        return None
+    tokens = frozenset(token for part in parts for token in _TOKEN_RE.findall(part))
+    return tokens or None
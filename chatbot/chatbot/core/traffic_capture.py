@@ -0,0 +1,98 @@
+import atexit
+import hashlib
+import os
+import re
+import threading
+
+from chatbot.chatbot.core.config import get_config
+from chatbot.chatbot.core.transcript_journal import TranscriptJournal
+
+PROJECT_ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+CAPTURE_DIR = os.path.join(PROJECT_ROOT_DIR, 'chatbot', 'chatbot', 'data', 'capture')
+CAPTURE_FLUSH_SECONDS = 2.0
+
+_redaction_hooks = []
+
+def register_redaction_hook(fn):
+    """Adds fn(text) -> text to the hooks applied, in order, to every captured input before it is written."""
+    _redaction_hooks.append(fn)
+
+def redact(text):
+    for hook in _redaction_hooks:
+        text = hook(text)
+    return text
+
+_EMAIL_RE = re.compile(r'[\w.+-]+@[\w-]+(?:\.[\w-]+)+')
+_LONG_NUMBER_RE = re.compile(r'\+?\d(?:[\s().-]*\d){6,}') # Phone, card and account numbers
+
+register_redaction_hook(lambda text: _EMAIL_RE.sub('<email>', text))
+register_redaction_hook(lambda text: _LONG_NUMBER_RE.sub('<number>', text))
+
+def short_hash(text, key=None):
+    """16 hex digits of BLAKE2b over text; with key (str or bytes), a keyed hash that cannot be recomputed without it."""
+    if isinstance(key, str):
+        key = key.encode('utf-8')
+    key = hashlib.blake2b(key).digest() if key else b'' # BLAKE2b keys are at most 64 bytes
+    return hashlib.blake2b(text.encode('utf-8'), key=key, digest_size=8).hexdigest()
+
+class TrafficCapture:
+    """
+    Opt-in recorder of production chat turns for offline replay (benchmarks/replay_traffic.py).
+
+    Sampling is per conversation, not per turn: a session is either captured from its first turn
+    seen or not at all, decided by a hash of its id, so every worker makes the same choice and a
+    replay can rebuild each conversation's contexts. Each turn is one compact JSON line:
+      ts, tn (tenant), c (conversation: hash of the session key, never the id itself),
+      in (input after the redaction hooks), ctx (context before the turn), rule (initially matched
+      Rule_ID, or null when the turn fell back), out (hash of a rule-built response), ms (latency).
+    Lines go through the same write-behind journal as transcripts, so capturing adds no disk I/O
+    to the request. Redaction can mask text that rules match on; those turns may diverge in replay.
+    """
+
+    def __init__(self, directory=CAPTURE_DIR, sample_rate=1.0, flush_interval=CAPTURE_FLUSH_SECONDS):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self._threshold = int(sample_rate * 10000)
+        self.journal = TranscriptJournal(directory, flush_interval=flush_interval)
+
+    def conversation_id(self, session_key):
+        return short_hash(session_key)
+
+    def sampled(self, conversation_id):
+        return int(conversation_id[:8], 16) % 10000 < self._threshold
+
+    def record(self, conversation_id, tenant_id, user_input, context_before, rule_id, response, elapsed_ms):
+        return self.journal.record({
+            'tn': tenant_id,
+            'c': conversation_id,
+            'in': redact(user_input),
+            'ctx': context_before,
+            'rule': rule_id,
+            'out': short_hash(response) if rule_id is not None else None, # Fallback text is not reproducible
+            'ms': round(elapsed_ms, 3),
+        })
+
+    def close(self):
+        self.journal.close()
+
+_capture = None
+_capture_config = None
+_capture_lock = threading.Lock()
+
+def get_traffic_capture():
+    """Process-wide capture built from the current config, or None unless CHATBOT_CAPTURE_SAMPLE > 0."""
+    global _capture, _capture_config
+    config = get_config()
+    if _capture_config is not config:
+        with _capture_lock:
+            if _capture_config is not config:
+                if _capture is not None:
+                    _capture.close()
+                _capture = None
+                if config.capture_sample_rate > 0:
+                    directory = config.capture_dir or CAPTURE_DIR
+                    print(f"INFO (traffic_capture): Capturing {config.capture_sample_rate:.0%} of conversations to {directory}.")
+                    _capture = TrafficCapture(directory, sample_rate=config.capture_sample_rate)
+                    atexit.register(_capture.close)
+                _capture_config = config
+    return _capture
@@ -0,0 +1,226 @@
+import atexit
+import fcntl
+import glob
+import json
+import os
+import queue
+import threading
+import time
+
+from chatbot.chatbot.core.config import get_config
+from chatbot.chatbot.core.memory_report import register_memory_reporter, deep_getsizeof
+
+PROJECT_ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+TRANSCRIPTS_DIR = os.path.join(PROJECT_ROOT_DIR, 'chatbot', 'chatbot', 'data', 'transcripts')
+SEGMENT_SUFFIX = '.jsonl'
+DROP_WARNING_EVERY = 1000 # Log the first dropped turn, then every Nth, instead of every one
+
+class TranscriptJournal:
+    """
+    Write-behind, append-only journal of chat turns, one JSON line per turn.
+
+    Request threads only put the turn on a bounded in-memory queue (record() never touches the
+    disk). A background writer drains the queue every flush_interval seconds, writes the batch
+    with one os.write and fsyncs it, so a crash loses at most one interval of turns. Each worker
+    process writes its own segment files (<start time>-<pid>-<seq>.jsonl), rotated once a segment
+    exceeds segment_max_bytes. A segment is flock()ed while it is open. With max_segments set,
+    opening a new segment deletes the oldest segments in the directory beyond that many, skipping
+    any still locked: a worker never keeps writing into a file another worker has unlinked.
+
+    Backpressure: when the queue is half full the writer is woken early rather than waiting out
+    the interval; when it is full, record() drops the turn and counts it, so a slow disk degrades
+    the journal instead of the chat latency.
+    """
+
+    def __init__(self, directory=TRANSCRIPTS_DIR, flush_interval=1.0, max_queue=10000, segment_max_bytes=64 * 1024 * 1024,
+                 max_segments=None):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.segment_max_bytes = segment_max_bytes
+        self.max_segments = max_segments
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._writer = None
+        self._writer_pid = None
+        self._start_lock = threading.Lock()
+        self._flush_lock = threading.Lock() # The writer and close() may flush at the same time
+        self._dropped_lock = threading.Lock() # Request threads and the writer both count drops
+        self._segment_fd = None
+        self._segment_path = None
+        self._segment_bytes = 0
+        self._segment_seq = 0
+        self.written = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.last_flush_ms = 0.0
+
+    def record(self, entry):
+        """Queues one turn (a JSON-serializable dict) for the writer. Returns False if it was dropped."""
+        self._ensure_writer()
+        entry.setdefault('ts', round(time.time(), 3))
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            dropped = self._count_dropped(1)
+            if dropped % DROP_WARNING_EVERY == 1:
+                print(f"WARNING (TranscriptJournal): Queue full ({self.max_queue} turns); {dropped} turns dropped so far.")
+            self._wake.set()
+            return False
+        if self._queue.qsize() >= self.max_queue // 2:
+            self._wake.set()
+        return True
+
+    def _count_dropped(self, count):
+        with self._dropped_lock:
+            self.dropped += count
+            return self.dropped
+
+    def flush(self):
+        """Writes and fsyncs everything queued so far. Called by the writer thread, and by close()."""
+        with self._flush_lock:
+            return self._flush_locked()
+
+    def _flush_locked(self):
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if not batch:
+            return 0
+        started = time.perf_counter()
+        data = ''.join(json.dumps(entry, ensure_ascii=False) + '\n' for entry in batch).encode('utf-8')
+        try:
+            fd = self._segment_for(len(data))
+            os.write(fd, data)
+            os.fsync(fd)
+            self._segment_bytes += len(data)
+        except OSError as e:
+            self._count_dropped(len(batch))
+            print(f"WARNING (TranscriptJournal): Could not write {len(batch)} turns to {self._segment_path}: {e}")
+            return 0
+        self.written += len(batch)
+        self.flushes += 1
+        self.last_flush_ms = (time.perf_counter() - started) * 1000
+        return len(batch)
+
+    def close(self):
+        """Stops the writer after a final flush and closes the current segment."""
+        self._stopping.set()
+        self._wake.set()
+        if self._writer is not None and self._writer_pid == os.getpid() and self._writer is not threading.current_thread():
+            self._writer.join(timeout=max(5.0, self.flush_interval * 2))
+        with self._flush_lock:
+            self._flush_locked()
+            if self._segment_fd is not None:
+                os.close(self._segment_fd)
+                self._segment_fd = None
+
+    def stats(self):
+        return {'queued': self._queue.qsize(), 'max_queue': self.max_queue, 'written': self.written,
+                'dropped': self.dropped, 'flushes': self.flushes, 'last_flush_ms': round(self.last_flush_ms, 3),
+                'segment': self._segment_path}
+
+    def queued_bytes(self):
+        with self._queue.mutex:
+            pending = list(self._queue.queue)
+        return deep_getsizeof(pending)
+
+    def _ensure_writer(self):
+        # Started on first use in each process: a thread started before a fork does not exist in the child.
+        if self._writer_pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._writer_pid != os.getpid():
+                self._segment_fd = None # An inherited descriptor belongs to the parent's segment
+                self._writer = threading.Thread(target=self._run, name='transcript-journal', daemon=True)
+                self._writer_pid = os.getpid()
+                self._writer.start()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def _segment_for(self, incoming_bytes):
+        if self._segment_fd is not None and self._segment_bytes + incoming_bytes > self.segment_max_bytes and self._segment_bytes:
+            os.close(self._segment_fd)
+            self._segment_fd = None
+        if self._segment_fd is None:
+            os.makedirs(self.directory, exist_ok=True)
+            if self.max_segments:
+                self._prune_segments(self.max_segments - 1) # Room for the one opened below
+            while self._segment_fd is None:
+                self._segment_seq += 1
+                name = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{self._segment_seq:04d}{SEGMENT_SUFFIX}"
+                self._segment_path = os.path.join(self.directory, name)
+                fd = os.open(self._segment_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                fcntl.flock(fd, fcntl.LOCK_EX) # Held until the segment is closed: marks it live for pruning
+                if os.fstat(fd).st_nlink:
+                    self._segment_fd = fd
+                else:
+                    os.close(fd) # Pruned between its creation and the lock; open another
+            self._segment_bytes = os.fstat(self._segment_fd).st_size
+        return self._segment_fd
+
+    def _prune_segments(self, keep):
+        paths = sorted(glob.glob(os.path.join(self.directory, '*' + SEGMENT_SUFFIX)))
+        for path in paths[:max(0, len(paths) - keep)]:
+            try:
+                fd = os.open(path, os.O_RDONLY)
+            except OSError:
+                continue # Already pruned by another worker
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                os.remove(path)
+            except OSError:
+                pass # Locked: a writer still has it open
+            finally:
+                os.close(fd)
+
+def read_transcripts(directory=TRANSCRIPTS_DIR):
+    """Yields journaled turns from every segment, oldest segment first; a torn last line (crash) is skipped."""
+    for path in sorted(glob.glob(os.path.join(directory, '*' + SEGMENT_SUFFIX))):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+_journal = None
+_journal_config = None
+_journal_lock = threading.Lock()
+
+def get_transcript_journal():
+    """Process-wide journal built from the current config, or None when CHATBOT_TRANSCRIPTS=0."""
+    global _journal, _journal_config
+    config = get_config()
+    if _journal_config is not config:
+        with _journal_lock:
+            if _journal_config is not config:
+                if _journal is not None:
+                    _journal.close()
+                _journal = None
+                if config.transcripts_enabled:
+                    directory = config.transcript_dir or TRANSCRIPTS_DIR
+                    print(f"INFO (transcript_journal): Journaling chat turns to {directory}: flush every {config.transcript_flush_seconds:g}s, "
+                          f"queue {config.transcript_queue_max}, segments up to {config.transcript_segment_mb:g} MB.")
+                    _journal = TranscriptJournal(directory, flush_interval=config.transcript_flush_seconds,
+                                                 max_queue=config.transcript_queue_max,
+                                                 segment_max_bytes=int(config.transcript_segment_mb * 1024 * 1024))
+                    atexit.register(_journal.close) # Clean shutdowns lose nothing still queued
+                _journal_config = config
+    return _journal
+
+def _journal_memory_report():
+    if _journal is None:
+        return {'bytes': 0, 'queued': 0}
+    stats = _journal.stats()
+    return {'bytes': _journal.queued_bytes(), 'queued': stats['queued'], 'dropped': stats['dropped']}
+
+register_memory_reporter('transcript_journal', _journal_memory_report)
@@ -0,0 +1,76 @@
+import json
+import os
+import threading
+
+from chatbot.chatbot.core.text_normalize import normalize_question
+from chatbot.chatbot.core.memory_report import deep_getsizeof
+
+ANSWER_CACHE_FILENAME = 'answer_cache.json'
+
+class AnswerCache:
+    """
+    Fast lookup tier in front of the LLM fallback: precomputed answers for recurring questions,
+    keyed by normalize_question(). The table is produced offline by admin/warm_answer_cache.py and
+    held in memory as a dict, so a hit costs one normalization plus one dict lookup.
+    The file is re-read when its stat signature changes, so every worker picks up a new warm-up run.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._answers = {}
+        self._signature = None
+        self._lock = threading.Lock()
+
+    def _file_signature(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def refresh(self):
+        """Re-reads the file if it changed since the last load (one os.stat when it did not)."""
+        signature = self._file_signature()
+        if signature == self._signature:
+            return
+        with self._lock:
+            if signature == self._signature:
+                return
+            answers = {}
+            if signature is not None:
+                try:
+                    with open(self.path, 'r', encoding='utf-8') as f:
+                        answers = {key: entry['answer'] for key, entry in json.load(f).items() if entry.get('answer')}
+                except (OSError, ValueError, KeyError, AttributeError) as e:
+                    print(f"WARNING (AnswerCache): Could not load {self.path}: {e}. Answer cache disabled until it is rewritten.")
+            self._answers = answers
+            self._signature = signature
+            print(f"INFO (AnswerCache): Loaded {len(answers)} precomputed answers from {self.path}.")
+
+    def lookup(self, user_input: str):
+        """Returns the precomputed answer for user_input, or None."""
+        self.refresh()
+        if not self._answers:
+            return None
+        return self._answers.get(normalize_question(user_input))
+
+    def __len__(self):
+        return len(self._answers)
+
+    def memory_bytes(self):
+        return deep_getsizeof(self._answers)
+
+def load_cache_entries(path: str):
+    """Reads the raw cache file ({normalized: {'answer', 'input', 'count', 'generated_at'}}); {} if absent."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def write_cache_entries(path: str, entries):
+    """Atomically replaces the cache file, so readers never see a partial table."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(entries, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
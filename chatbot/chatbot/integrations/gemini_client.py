@@ -1,66 +1,67 @@
-import os
-import google.generativeai as genai
-from dotenv import load_dotenv # Ensure this is at the top
-
-# --- Configuration & Initial Logging ---
-# Determine project root: This file is in chatbot/chatbot/integrations/
-# Project root is three levels up.
-PROJECT_ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
-DOTENV_PATH = os.path.join(PROJECT_ROOT_DIR, '.env')
-
-print(f"DEBUG (gemini_client.py): Calculated PROJECT_ROOT_DIR: {PROJECT_ROOT_DIR}")
-print(f"DEBUG (gemini_client.py): Calculated DOTENV_PATH: {DOTENV_PATH}")
-
-if os.path.exists(DOTENV_PATH):
-    dotenv_loaded = load_dotenv(dotenv_path=DOTENV_PATH)
-    print(f"DEBUG (gemini_client.py): Attempted to load .env from {DOTENV_PATH}. Success: {dotenv_loaded}")
-else:
-    print(f"DEBUG (gemini_client.py): .env file not found at {DOTENV_PATH}. Attempting to load from CWD or other dotenv search paths.")
-    # load_dotenv() searches CWD and parent directories if path_override is not given
-    dotenv_loaded_fallback = load_dotenv()
-    print(f"DEBUG (gemini_client.py): Attempted to load .env via default search. Success: {dotenv_loaded_fallback}")
-    if not dotenv_loaded_fallback:
-        print("WARNING (gemini_client.py): .env file not found at project root or via default search.")
-
-GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
-# Per previous steps, CHOSEN_MODEL_NAME was updated to 'models/gemini-1.5-flash-latest'
-CHOSEN_MODEL_NAME = os.getenv('GEMINI_MODEL_NAME', 'models/gemini-1.5-flash-latest')
-model_instance = None
+import threading
+import time
 
-# Log values immediately after trying to get them from environment
-print(f"DEBUG (gemini_client.py): GEMINI_API_KEY loaded: {'******' + GEMINI_API_KEY[-4:] if GEMINI_API_KEY and len(GEMINI_API_KEY) > 4 else 'Not found or too short'}")
-print(f"DEBUG (gemini_client.py): CHOSEN_MODEL_NAME (from env or default): {CHOSEN_MODEL_NAME}")
+from chatbot.chatbot.core.config import get_config
 
-if not GEMINI_API_KEY:
-    print("CRITICAL (gemini_client.py): GEMINI_API_KEY is NOT FOUND in environment. Gemini features will be disabled.")
-elif not CHOSEN_MODEL_NAME:
-    print("CRITICAL (gemini_client.py): CHOSEN_MODEL_NAME is NOT SET (should have a default). Gemini features will be disabled.")
-else:
-    try:
-        genai.configure(api_key=GEMINI_API_KEY)
-        model_instance = genai.GenerativeModel(CHOSEN_MODEL_NAME)
-        print(f"INFO (gemini_client.py): Google Generative AI client configured. Model to use: '{CHOSEN_MODEL_NAME}'. Instance created: {model_instance is not None}")
-    except Exception as e:
-        print(f"ERROR (gemini_client.py): Failed to configure Google API client or initialize model '{CHOSEN_MODEL_NAME}': {e}")
-        model_instance = None
+# The SDK (google.generativeai, slow to import) and the model client are created lazily, on the first
+# fallback or by warm_up_in_background(), never at import time.
+genai = None
+model_instance = None
+_model_lock = threading.Lock()
+_warmup_thread = None
+
+def _import_sdk():
+    global genai
+    if genai is None:
+        import google.generativeai as sdk
+        genai = sdk
+    return genai
+
+def _get_model():
+    """Returns the configured model client, creating it on first use. Raises if it cannot be created."""
+    global model_instance
+    if model_instance is not None:
+        return model_instance
+    with _model_lock:
+        if model_instance is None:
+            config = get_config()
+            sdk = _import_sdk()
+            sdk.configure(api_key=config.gemini_api_key)
+            model_instance = sdk.GenerativeModel(config.gemini_model_name)
+            print(f"INFO (gemini_client.py): Google Generative AI client configured. Model to use: '{config.gemini_model_name}'.")
+    return model_instance
+
+def warm_up_in_background():
+    """Imports the SDK and builds the client on a daemon thread, so the first fallback does not pay for it. Idempotent."""
+    global _warmup_thread
+    if _warmup_thread is not None or model_instance is not None or not get_config().gemini_api_key:
+        return _warmup_thread
+
+    def warm_up():
+        started = time.perf_counter()
+        try:
+            _get_model()
+            print(f"INFO (gemini_client.py): Background warm-up finished in {(time.perf_counter() - started) * 1000:.0f} ms.")
+        except Exception as e:
+            print(f"WARNING (gemini_client.py): Background warm-up failed ({e}); the first fallback will retry.")
+
+    _warmup_thread = threading.Thread(target=warm_up, name='gemini-warmup', daemon=True)
+    _warmup_thread.start()
+    return _warmup_thread
 
 # --- Utility Function to List Models (kept for direct testing/diag) ---
 def list_available_models_for_api_key():
-    if not GEMINI_API_KEY:
+    config = get_config()
+    if not config.gemini_api_key:
         print("ERROR (list_models): Cannot list models - GEMINI_API_KEY is not set.")
         return []
 
-    # Ensure genai is configured. If initial configuration failed, model_instance would be None.
-    # Re-attempting configure here might be useful if the initial one failed for a transient reason,
-    # but generally, if it failed at startup, it will likely fail here too.
-    # A simple check if genai is configured (non-public API, use with caution or remove)
-    if hasattr(genai, '_is_configured') and not genai._is_configured:
-        print("WARNING (list_models): genai client not configured. Attempting to re-configure.")
-        try:
-            genai.configure(api_key=GEMINI_API_KEY)
-        except Exception as e:
-            print(f"ERROR (list_models): Failed to re-configure genai client: {e}")
-            return []
+    try:
+        genai = _import_sdk()
+        genai.configure(api_key=config.gemini_api_key)
+    except Exception as e:
+        print(f"ERROR (list_models): Failed to configure genai client: {e}")
+        return []
 
     print("\n--- Listing Available Generative Models (supporting 'generateContent') ---")
     valid_models_for_content = []
@@ -85,29 +86,37 @@ def list_available_models_for_api_key():
     print("--- End of Model List ---")
     return valid_models_for_content
 
+# Prefixes of the error strings get_gemini_response returns instead of raising.
+GEMINI_ERROR_PREFIXES = (
+    "Gemini client error:",
+    "Gemini API Error:",
+    "Gemini error after attempting",
+    "Gemini returned an empty or unexpected response",
+    "Response blocked by Gemini",
+    "Unexpected error with Gemini service:",
+)
+
+def is_gemini_error_response(text: str) -> bool:
+    """True if text is one of get_gemini_response's error messages (which must never be cached)."""
+    return not text or text.startswith(GEMINI_ERROR_PREFIXES)
+
 # --- Main Function to Get Gemini Response ---
 def get_gemini_response(user_input: str) -> str:
-    global model_instance # Allow re-assignment if re-initialization occurs
-
-    print(f"DEBUG (get_gemini_response): Called with user_input. Current model_instance is {'VALID' if model_instance else 'None'}. API Key available: {GEMINI_API_KEY is not None}. Chosen model: {CHOSEN_MODEL_NAME}")
+    config = get_config()
+    model_name = config.gemini_model_name
 
     if not model_instance:
-        if GEMINI_API_KEY and CHOSEN_MODEL_NAME:
-            print(f"WARNING (get_gemini_response): Model instance for '{CHOSEN_MODEL_NAME}' was not initialized or was reset. Retrying initialization now.")
+        if config.gemini_api_key and model_name:
             try:
-                # Ensure genai is configured before creating model. This might be redundant if startup config was successful
-                # but helpful if some state was lost or never achieved.
-                genai.configure(api_key=GEMINI_API_KEY)
-                model_instance = genai.GenerativeModel(CHOSEN_MODEL_NAME)
-                print(f"INFO (get_gemini_response): Successfully re-initialized model '{CHOSEN_MODEL_NAME}'.")
+                _get_model()
             except Exception as e:
-                print(f"ERROR (get_gemini_response): Failed to re-initialize model '{CHOSEN_MODEL_NAME}': {e}")
-                return "Gemini client error: Failed to re-initialize model. Check API key and model name. Details in server log."
+                print(f"ERROR (get_gemini_response): Failed to initialize model '{model_name}': {e}")
+                return "Gemini client error: Failed to initialize model. Check API key and model name. Details in server log."
         else:
             # This means either API key or model name (or both) are missing.
             missing_info = []
-            if not GEMINI_API_KEY: missing_info.append("API key missing")
-            if not CHOSEN_MODEL_NAME: missing_info.append("model name not specified")
+            if not config.gemini_api_key: missing_info.append("API key missing")
+            if not model_name: missing_info.append("model name not specified")
             return f"Gemini client error: {', '.join(missing_info)}; model not initialized."
 
     try:
@@ -146,7 +155,7 @@ def get_gemini_response(user_input: str) -> str:
 
     except Exception as e:
         error_message_str = str(e).lower()
-        current_model_name_for_error = model_instance.model_name if model_instance and hasattr(model_instance, 'model_name') else CHOSEN_MODEL_NAME
+        current_model_name_for_error = model_instance.model_name if model_instance and hasattr(model_instance, 'model_name') else model_name
         print(f"ERROR (get_gemini_response): API call failed for model '{current_model_name_for_error}': {error_message_str}")
         if "api key not valid" in error_message_str or "invalid api key" in error_message_str:
             return "Gemini API Error: API key invalid or permission issues. Check Google Cloud Console."
@@ -161,6 +170,8 @@ def get_gemini_response(user_input: str) -> str:
 # --- Direct Test / Model Lister Block ---
 if __name__ == '__main__':
     print("\n--- Gemini Client Direct Execution: Model Lister & Test ---")
+    GEMINI_API_KEY = get_config().gemini_api_key
+    CHOSEN_MODEL_NAME = get_config().gemini_model_name
     if not GEMINI_API_KEY:
         print("Run Status: FAILED - GEMINI_API_KEY is not set in environment.")
     else:
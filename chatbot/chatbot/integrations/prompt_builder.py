@@ -0,0 +1,100 @@
+import math
+
+from chatbot.chatbot.core.config import get_config
+
+# Stable instruction prefix. It is always the first thing in the prompt and never varies between
+# calls, so upstream prefix caching can reuse it; anything per-conversation comes after it.
+PROMPT_PREFIX = (
+    "You are Max, the virtual assistant for this website. Answer the user's latest message "
+    "helpfully and concisely, in plain text. Use the conversation so far for context, but do not "
+    "repeat earlier answers unless asked.\n\n"
+)
+HISTORY_HEADER = "Conversation so far:\n"
+SUMMARY_LEAD = "Earlier in this conversation the user asked about: "
+
+MAX_HISTORY_MESSAGES = 20 # Messages kept per session for prompt building (user + bot)
+MAX_TURN_TOKENS = 200 # Single history messages are clipped to this before budgeting
+SUMMARY_MAX_TOKENS = 128
+SUMMARY_WORDS_PER_MESSAGE = 8
+
+def estimate_tokens(text: str) -> int:
+    """
+    Conservative, dependency-free token estimate (~4 characters per token, rounded up).
+    Rounding up per piece means the estimates of a prompt's parts always add up to at least the
+    estimate of the whole prompt, so budgeting part by part can never overshoot.
+    """
+    return math.ceil(len(text) / 4) if text else 0
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    if max_tokens <= 0:
+        return ''
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    return text[:max(0, max_tokens * 4 - 3)] + '...'
+
+def _format_message(message):
+    speaker = 'User' if message.get('role') == 'user' else 'Assistant'
+    return f"{speaker}: {truncate_to_tokens(message.get('text', ''), MAX_TURN_TOKENS)}\n"
+
+def _summarize(messages, max_tokens):
+    """Deterministic summary of older messages: the opening words of each user message, oldest first."""
+    topics = []
+    for message in messages:
+        if message.get('role') != 'user':
+            continue
+        words = message.get('text', '').split()
+        if words:
+            topics.append(' '.join(words[:SUMMARY_WORDS_PER_MESSAGE]))
+    if not topics:
+        return ''
+    line = truncate_to_tokens(SUMMARY_LEAD + '; '.join(topics), max_tokens - 1)
+    return line + '\n' if line else ''
+
+def build_prompt(user_input: str, history=None, context=None, budget_tokens=None) -> str:
+    """
+    Builds the Gemini fallback prompt from the stable prefix, the active chatbot_context, as many
+    of the most recent history messages as fit, a deterministic summary of older ones, and the
+    latest user message. The estimated size never exceeds budget_tokens (default: the configured
+    GEMINI_PROMPT_TOKEN_BUDGET), however long the conversation has run. history is a list of {'role': 'user'|'bot', 'text': str}, oldest first.
+    """
+    budget = budget_tokens or get_config().prompt_token_budget
+    history = history or []
+
+    latest_frame_tokens = estimate_tokens("User: \nAssistant:")
+    remaining = budget - estimate_tokens(PROMPT_PREFIX) - latest_frame_tokens
+    latest_text = truncate_to_tokens(user_input, remaining)
+    remaining -= estimate_tokens(latest_text)
+
+    context_line = f"Active conversation topic: {context}\n" if context else ''
+    if estimate_tokens(context_line) > remaining:
+        context_line = ''
+    remaining -= estimate_tokens(context_line)
+
+    history_lines = []
+    summary_line = ''
+    if history and remaining > estimate_tokens(HISTORY_HEADER):
+        remaining -= estimate_tokens(HISTORY_HEADER)
+        formatted = [_format_message(message) for message in history]
+        total_cost = sum(estimate_tokens(line) for line in formatted)
+        summary_reserve = 0 if total_cost <= remaining else min(SUMMARY_MAX_TOKENS, remaining // 4)
+        turns_budget = remaining - summary_reserve
+        kept = 0
+        for line in reversed(formatted): # Newest first
+            cost = estimate_tokens(line)
+            if cost > turns_budget:
+                break
+            history_lines.append(line)
+            turns_budget -= cost
+            kept += 1
+        history_lines.reverse()
+        older = history[:len(history) - kept]
+        if older:
+            summary_line = _summarize(older, summary_reserve + turns_budget)
+
+    parts = [PROMPT_PREFIX, context_line]
+    if history_lines or summary_line:
+        parts.append(HISTORY_HEADER)
+        parts.append(summary_line)
+        parts.extend(history_lines)
+    parts.append(f"User: {latest_text}\nAssistant:")
+    return ''.join(parts)
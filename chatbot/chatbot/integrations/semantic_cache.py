@@ -0,0 +1,200 @@
+import threading
+import time
+import zlib
+
+try:
+    import numpy as np
+except ImportError: # Optional: without NumPy the semantic tier is simply off
+    np = None
+
+from chatbot.chatbot.core.text_normalize import normalize_question
+
+EMBEDDING_DIM = 512
+DEFAULT_CAPACITY = 2000 # 2000 x 512 float32 = 4 MB per worker
+DEFAULT_THRESHOLD = 0.7
+LOOKUP_CANDIDATES = 5 # Nearest rows checked against the term guard before a lookup gives up
+# Function words (and question words that do not change what is asked) are dropped before encoding.
+STOPWORDS = frozenset("""
+a an the and or but of to in on at for with from by about as is are was were be been am do does did
+i me my we our you your it its this that these those there here can could would should will shall
+may might must please hi hello hey so just some any what which how have has get tell know want like need
+don doesn didn isn aren wasn weren won wouldn couldn shouldn haven hasn
+""".split())
+# Negations are kept as one term, so "open" and "not open" never share an answer. "don't" normalizes to "don t".
+NEGATIONS = frozenset(('not', 'no', 'never', 't'))
+# Phrases and words rewritten to one term before stemming, so common rewordings encode alike.
+PHRASES = {('what', 'time'): 'when', ('how', 'much'): 'cost', ('how', 'many'): 'count'}
+SYNONYMS = {'price': 'cost', 'hour': 'when', 'cancellation': 'cancel', 'purchase': 'buy'}
+# Terms one question may have and the other lack without changing what is asked ("your store" vs "you").
+LIGHT_TERMS = frozenset(('store', 'shop', 'business', 'company', 'question', 'help', 'exactly', 'currently'))
+WORD_WEIGHT = 1.0
+BIGRAM_WEIGHT = 0.5
+TRIGRAM_WEIGHT = 0.35 # Character trigrams let near spellings share part of their weight
+
+def _stem(word):
+    for suffix, replacement in (('ies', 'y'), ('ing', ''), ('ed', ''), ('s', '')):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3 and not word.endswith('ss'):
+            word = word[:-len(suffix)] + replacement
+            if len(word) > 3 and word[-1] == word[-2] and word[-1] not in 'lsz': # "shipp" -> "ship"
+                word = word[:-1]
+            break
+    return SYNONYMS.get(word, word)
+
+def question_terms(text):
+    """Content terms of a question in order: phrases canonicalized, stopwords dropped, words stemmed."""
+    words = normalize_question(text).split()
+    terms = []
+    i = 0
+    while i < len(words):
+        phrase = PHRASES.get(tuple(words[i:i + 2]))
+        if phrase is not None:
+            terms.append(phrase)
+            i += 2
+            continue
+        word = words[i]
+        i += 1
+        if word in NEGATIONS:
+            terms.append('not')
+        elif word not in STOPWORDS:
+            terms.append(_stem(word))
+    return terms
+
+def same_question(terms, other_terms):
+    """
+    The precision guard behind the similarity search: two questions may share an answer only if
+    their term sets differ by light terms at most. A swapped term ("monday"/"sunday", "red"/"blue",
+    "canada"/"mexico") or a negation on one side only is a different question, however similar
+    the vectors are.
+    """
+    return (set(terms) ^ set(other_terms)) <= LIGHT_TERMS
+
+def _features(terms):
+    for term in terms:
+        yield 'w:' + term, WORD_WEIGHT
+        padded = f'<{term}>'
+        for i in range(len(padded) - 2):
+            yield 'c:' + padded[i:i + 3], TRIGRAM_WEIGHT
+    for first, second in zip(terms, terms[1:]):
+        yield f'b:{first} {second}', BIGRAM_WEIGHT
+
+def embed(text, dim=EMBEDDING_DIM, terms=None):
+    """
+    Local feature-hashing encoder: the question's terms, term bigrams and character trigrams hashed
+    (crc32) into `dim` buckets with a hash-derived sign, L2-normalized. No model, no network; tens of
+    microseconds. Returns None when the text has no content terms.
+    """
+    vector = np.zeros(dim, dtype=np.float32)
+    for feature, weight in _features(question_terms(text) if terms is None else terms):
+        h = zlib.crc32(feature.encode('utf-8'))
+        vector[h % dim] += weight if h & 0x80000000 else -weight
+    norm = float(np.linalg.norm(vector))
+    if norm == 0.0:
+        return None
+    vector /= norm
+    return vector
+
+class SemanticAnswerCache:
+    """
+    Near-duplicate lookup in front of the Gemini fallback: answers to earlier questions, found by
+    cosine similarity of hashed embeddings, so "when are you open" can reuse the answer given to
+    "what time do you open?". Complements AnswerCache, which only matches exact normalized keys.
+
+    Vectors live in one preallocated float32 matrix (capacity x dim, rows unit-length), so a lookup
+    is a single matrix-vector product plus an argpartition for the nearest rows. A row at or above
+    the threshold is only served if same_question() accepts it, since word overlap alone cannot
+    tell "open on monday" from "open on sunday". When the matrix is full, the entry used least
+    recently is overwritten. Each worker process keeps its own cache.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, threshold=DEFAULT_THRESHOLD, dim=EMBEDDING_DIM, clock=time.monotonic):
+        self.capacity = capacity
+        self.threshold = threshold
+        self.dim = dim
+        self.clock = clock
+        self._vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self._last_used = np.zeros(capacity, dtype=np.float64)
+        self._questions = [None] * capacity
+        self._terms = [None] * capacity
+        self._answers = [None] * capacity
+        self._row_by_question = {}
+        self._count = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return self._count
+
+    def search(self, text, k=5):
+        """Top-k [(similarity, question, answer)] for text, most similar first (no threshold applied)."""
+        query = embed(text, self.dim)
+        if query is None:
+            return []
+        with self._lock:
+            return [(score, self._questions[row], self._answers[row]) for score, row in self._top_k(query, k)]
+
+    def lookup(self, text, touch=True):
+        """
+        Answer of the most similar earlier question if its similarity reaches the threshold, else None.
+        touch=False (diagnostics) leaves the hit counters and the LRU order alone.
+        """
+        terms = question_terms(text)
+        query = embed(text, self.dim, terms)
+        if query is None:
+            return None
+        with self._lock:
+            for score, row in self._top_k(query, LOOKUP_CANDIDATES):
+                if score < self.threshold:
+                    break
+                if same_question(terms, self._terms[row]):
+                    if touch:
+                        self._last_used[row] = self.clock()
+                        self.hits += 1
+                    return self._answers[row]
+        if touch:
+            self.misses += 1
+        return None
+
+    def add(self, text, answer):
+        """Stores answer for text, replacing the least recently used entry once the cache is full."""
+        terms = question_terms(text)
+        vector = embed(text, self.dim, terms)
+        if vector is None or not answer:
+            return False
+        question = normalize_question(text)
+        with self._lock:
+            row = self._row_by_question.get(question)
+            if row is None:
+                if self._count < self.capacity:
+                    row = self._count
+                    self._count += 1
+                else:
+                    row = int(np.argmin(self._last_used))
+                    del self._row_by_question[self._questions[row]]
+                self._row_by_question[question] = row
+            self._vectors[row] = vector
+            self._questions[row] = question
+            self._terms[row] = terms
+            self._answers[row] = answer
+            self._last_used[row] = self.clock()
+        return True
+
+    def memory_bytes(self):
+        return self._vectors.nbytes + self._last_used.nbytes + sum(
+            len(answer) for answer in self._answers[:self._count] if answer)
+
+    def _top_k(self, query, k):
+        if self._count == 0:
+            return []
+        scores = self._vectors[:self._count] @ query
+        k = min(k, self._count)
+        rows = np.argpartition(-scores, k - 1)[:k]
+        rows = rows[np.argsort(-scores[rows])]
+        return [(float(scores[row]), int(row)) for row in rows]
+
+def matrix_bytes(capacity, dim=EMBEDDING_DIM):
+    """Bytes a cache of this size allocates up front (vectors and LRU stamps), before any answer is stored."""
+    return capacity * (dim * 4 + 8)
+
+def semantic_cache_available():
+    return np is not None
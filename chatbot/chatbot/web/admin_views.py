@@ -2,38 +2,35 @@ import os
 import functools
 import csv
 import json
-from dotenv import load_dotenv # ENSURED IMPORT IS HERE
-from flask import Blueprint, render_template, request, redirect, url_for, session, flash
+import time
+from flask import Blueprint, render_template, request, redirect, url_for, session, flash, jsonify, Response
 from werkzeug.utils import secure_filename
 
 PROJECT_ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
-DOTENV_PATH = os.path.join(PROJECT_ROOT_DIR, '.env')
 RULES_CSV_FILE_PATH = os.path.join(PROJECT_ROOT_DIR, 'chatbot', 'chatbot', 'data', 'rules.csv')
 APPEARANCE_SETTINGS_JSON_PATH = os.path.join(PROJECT_ROOT_DIR, 'chatbot', 'chatbot', 'web', 'appearance_settings.json')
 UPLOAD_FOLDER = os.path.join(PROJECT_ROOT_DIR, 'chatbot', 'chatbot', 'data', 'uploads')
 ALLOWED_EXTENSIONS = {'csv'}
 EXPECTED_CSV_HEADERS = ['Rule_ID', 'Context_Required', 'Pattern', 'Response', 'Set_Context_On_Response', 'GoTo_Rule_ID']
+RULE_ANALYSIS_MAX_LISTED = 500 # Per-section cap on rows rendered in the rule analysis report
+MEMORY_REPORT_TOP_SITES = 25 # Allocation sites listed in the memory report (top and diff)
+REGRESSION_MAX_FLASHED = 10 # Failing regression cases spelled out when a rule change is blocked
+REGRESSION_MAX_WORKERS = 4 # Cap on the gate's process pool: a web request never starts one process per CPU
 
-# Load .env file - This should be done once, ideally when the module is first loaded.
-if os.path.exists(DOTENV_PATH):
-    print(f"INFO (admin_views): Loading .env file from {DOTENV_PATH}")
-    load_dotenv(dotenv_path=DOTENV_PATH) # Call the imported function
-else:
-    if load_dotenv(): # Try loading from CWD or other default dotenv search paths
-        print("INFO (admin_views): .env file loaded via default dotenv search behavior.")
-    else:
-        print("WARNING (admin_views): .env file not found at project root or via default search. Admin auth and other .env dependent features may fail.")
-
-ADMIN_USERNAME = os.getenv('ADMIN_USERNAME')
-ADMIN_PASSWORD = os.getenv('ADMIN_PASSWORD')
-# FLASK_SECRET_KEY is used by app.py directly
-
+# Admin credentials come from the shared config (see core/config.py), read when a login is attempted.
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin', template_folder='../templates/admin')
 
 # Import chatbot instance and core class for reloading rules
 from chatbot.chatbot.core.rules_based_chatbot import get_chatbot_instance
+from chatbot.chatbot.core import memory_report
+from chatbot.chatbot.core.config import get_config
+from chatbot.chatbot.core.request_profiler import get_request_profiler, MAX_PROFILING_WINDOW_SECONDS
+from chatbot.chatbot.core.tenants import DEFAULT_TENANT_ID, tenant_exists, tenant_appearance_settings_path
+from chatbot.chatbot.admin.rules_regression import run_regression, load_cases, DATA_DIR, REGRESSION_CASES_FILENAME
+
+REGRESSION_CASES_PATH = os.path.join(DATA_DIR, REGRESSION_CASES_FILENAME)
 
 def login_required(view):
     @functools.wraps(view)
@@ -116,14 +113,18 @@ def _read_rules_from_csv():
 def _write_rules_to_csv(rules_list_of_dicts):
     try:
         _ensure_csv_file_and_headers()
-        with open(RULES_CSV_FILE_PATH, 'w', newline='', encoding='utf-8') as f:
+        # Write to a temp file and swap it in, so other workers reloading concurrently never read a partial CSV.
+        tmp_path = f"{RULES_CSV_FILE_PATH}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
             writer = csv.DictWriter(f, fieldnames=EXPECTED_CSV_HEADERS, quoting=csv.QUOTE_ALL)
             writer.writeheader()
             writer.writerows(rules_list_of_dicts)
+        os.replace(tmp_path, RULES_CSV_FILE_PATH)
 
         chatbot_instance = get_chatbot_instance()
         if chatbot_instance:
-            chatbot_instance._load_rules_from_csv()
+            # Reloads this worker and bumps the shared version stamp for all other workers.
+            chatbot_instance.publish_rules_update()
             flash('Rules saved and chatbot reloaded successfully.', 'success')
         else:
             flash('Rules saved, but chatbot instance not found for reloading.', 'warning')
@@ -132,13 +133,53 @@ def _write_rules_to_csv(rules_list_of_dicts):
         flash(f'Error writing rules to rules.csv: {e}', 'danger')
         return False
 
-def _load_appearance_settings():
-    if not os.path.exists(APPEARANCE_SETTINGS_JSON_PATH):
-        print(f"INFO: {APPEARANCE_SETTINGS_JSON_PATH} not found. Creating with default settings.")
-        _save_appearance_settings(DEFAULT_APPEARANCE_SETTINGS.copy())
+def _passes_regression_gate(candidate_rules):
+    """
+    Replays the recorded regression cases (if any) against the candidate rules and the live ones.
+    Returns False, with the failing cases flashed, when the candidate breaks a case the live rules pass.
+    Every route that rewrites rules.csv (add, edit, delete, upload) goes through this first.
+    """
+    if not os.path.exists(REGRESSION_CASES_PATH):
+        return True
+    candidate_path = os.path.join(UPLOAD_FOLDER, f"candidate-{os.getpid()}-{int(time.time() * 1000)}.csv")
+    try:
+        with open(candidate_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=EXPECTED_CSV_HEADERS, quoting=csv.QUOTE_ALL)
+            writer.writeheader()
+            writer.writerows(candidate_rules)
+        workers = max(1, min(get_config().regression_workers, REGRESSION_MAX_WORKERS))
+        report = run_regression(candidate_path, load_cases(REGRESSION_CASES_PATH),
+                                live_csv_path=RULES_CSV_FILE_PATH, workers=workers)
+    except (OSError, ValueError) as e:
+        flash(f'Regression cases could not be run ({e}). Rules not published.', 'danger')
+        return False
+    finally:
+        if os.path.exists(candidate_path):
+            os.remove(candidate_path)
+
+    if report['regressions']:
+        flash(f"Rules not published: {len(report['regressions'])} of {report['cases']} regression cases "
+              f"pass on the live rules but fail with this change.", 'danger')
+        for entry in report['regressions'][:REGRESSION_MAX_FLASHED]:
+            flash(f"{entry['name']}, turn {entry['turn'] + 1} ('{entry['input']}'): expected '{entry['expected']}', "
+                  f"got '{entry['candidate']}'.", 'danger')
+        return False
+    flash(f"Regression check passed: {report['candidate_passed']} of {report['cases']} cases pass "
+          f"({len(report['fixed'])} fixed) in {report['elapsed_s']} s.", 'info')
+    return True
+
+def _appearance_settings_path(tenant_id):
+    if tenant_id == DEFAULT_TENANT_ID:
+        return APPEARANCE_SETTINGS_JSON_PATH
+    return tenant_appearance_settings_path(tenant_id)
+
+def _load_appearance_settings(settings_path=APPEARANCE_SETTINGS_JSON_PATH):
+    if not os.path.exists(settings_path):
+        print(f"INFO: {settings_path} not found. Creating with default settings.")
+        _save_appearance_settings(DEFAULT_APPEARANCE_SETTINGS.copy(), settings_path)
         return DEFAULT_APPEARANCE_SETTINGS.copy()
     try:
-        with open(APPEARANCE_SETTINGS_JSON_PATH, 'r', encoding='utf-8') as f:
+        with open(settings_path, 'r', encoding='utf-8') as f:
             settings = json.load(f)
             updated = False
             for key, value in DEFAULT_APPEARANCE_SETTINGS.items():
@@ -146,17 +187,17 @@ def _load_appearance_settings():
                     settings[key] = value
                     updated = True
             if updated: # If new default keys were added
-                _save_appearance_settings(settings)
+                _save_appearance_settings(settings, settings_path)
             return settings
     except Exception as e:
         flash(f'Error loading appearance_settings.json: {e}. Using defaults and attempting to recreate.', 'warning')
-        _save_appearance_settings(DEFAULT_APPEARANCE_SETTINGS.copy())
+        _save_appearance_settings(DEFAULT_APPEARANCE_SETTINGS.copy(), settings_path)
         return DEFAULT_APPEARANCE_SETTINGS.copy()
 
-def _save_appearance_settings(settings_dict):
+def _save_appearance_settings(settings_dict, settings_path=APPEARANCE_SETTINGS_JSON_PATH):
     try:
-        os.makedirs(os.path.dirname(APPEARANCE_SETTINGS_JSON_PATH), exist_ok=True)
-        with open(APPEARANCE_SETTINGS_JSON_PATH, 'w', encoding='utf-8') as f:
+        os.makedirs(os.path.dirname(settings_path), exist_ok=True)
+        with open(settings_path, 'w', encoding='utf-8') as f:
             json.dump(settings_dict, f, indent=4)
         # Flash moved to the route to give context
         return True
@@ -169,9 +210,10 @@ def login():
     if request.method == 'POST':
         username = request.form.get('username')
         password = request.form.get('password')
-        if not ADMIN_USERNAME or not ADMIN_PASSWORD:
+        config = get_config()
+        if not config.admin_username or not config.admin_password:
             flash('Admin credentials are not configured on the server. Please set ADMIN_USERNAME and ADMIN_PASSWORD in .env.', 'danger')
-        elif username == ADMIN_USERNAME and password == ADMIN_PASSWORD:
+        elif username == config.admin_username and password == config.admin_password:
             session['admin_logged_in'] = True
             session.permanent = True
             flash('Login successful!', 'success')
@@ -237,7 +279,7 @@ def manage_rules():
             if not rule_found_for_update:
                 all_rules.append(new_rule_data)
 
-            if _write_rules_to_csv(all_rules):
+            if _passes_regression_gate(all_rules) and _write_rules_to_csv(all_rules):
                 return redirect(url_for('admin.manage_rules'))
 
     current_rules = _read_rules_from_csv()
@@ -262,11 +304,99 @@ def delete_rule(rule_id):
     all_rules = _read_rules_from_csv()
     rules_to_keep = [r for r in all_rules if r.get('Rule_ID') != rule_id]
     if len(rules_to_keep) < len(all_rules):
-        _write_rules_to_csv(rules_to_keep)
+        if _passes_regression_gate(rules_to_keep):
+            _write_rules_to_csv(rules_to_keep)
     else:
         flash(f'Rule ID "{rule_id}" not found for deletion.', 'warning')
     return redirect(url_for('admin.manage_rules'))
 
+@admin_bp.route('/rules/analysis')
+@login_required
+def rule_analysis():
+    chatbot_instance = get_chatbot_instance()
+    analysis = chatbot_instance.rule_analysis
+    return render_template('admin/admin_rule_analysis.html',
+                           title='Rule Analysis',
+                           analysis=analysis,
+                           matchable_count=chatbot_instance._compiled.matchable_count,
+                           rules_version=chatbot_instance.rules_version,
+                           max_listed=RULE_ANALYSIS_MAX_LISTED)
+
+@admin_bp.route('/rules/explain')
+@login_required
+def explain_rule_match():
+    # Read-only: evaluates the input against the live rule set without touching any session.
+    user_input = request.args.get('input', '')
+    context = request.args.get('context', '').strip().lower() or None
+    report = get_chatbot_instance().explain(user_input, context) if user_input else None
+    if request.args.get('format') == 'json':
+        return jsonify(report)
+    return render_template('admin/admin_rule_explain.html', title='Explain a Match',
+                           report=report, user_input=user_input, context=context or '')
+
+@admin_bp.route('/memory', methods=['GET', 'POST'])
+@login_required
+def memory():
+    # Per-worker figures: each gunicorn worker answers for itself, so refresh to sample others.
+    if request.method == 'POST':
+        action = request.form.get('action')
+        if action == 'start':
+            memory_report.start_tracing(frames=max(1, min(request.form.get('frames', 1, type=int), 25)))
+            flash('Allocation tracing started. It slows allocations down until you stop it.', 'info')
+        elif action == 'stop':
+            memory_report.stop_tracing()
+            flash('Allocation tracing stopped.', 'success')
+        elif action == 'baseline':
+            if memory_report.mark_baseline():
+                flash('Baseline snapshot taken; the report now shows growth since this point.', 'success')
+            else:
+                flash('Start tracing before taking a baseline snapshot.', 'warning')
+        return redirect(url_for('admin.memory'))
+
+    report = {
+        'pid': os.getpid(),
+        'process': memory_report.process_memory(),
+        'subsystems': memory_report.subsystem_report(),
+        'tracing': memory_report.tracing_status(),
+        'top_allocations': memory_report.top_allocations(MEMORY_REPORT_TOP_SITES),
+        'diff_from_baseline': memory_report.diff_from_baseline(MEMORY_REPORT_TOP_SITES),
+    }
+    if request.args.get('format') == 'json':
+        return jsonify(report)
+    return render_template('admin/admin_memory.html', title='Memory', report=report)
+
+@admin_bp.route('/profiling', methods=['GET', 'POST'])
+@login_required
+def profiling():
+    profiler = get_request_profiler()
+    if request.method == 'POST':
+        if request.form.get('action') == 'start':
+            duration = request.form.get('duration_seconds', 60, type=int)
+            sample_percent = request.form.get('sample_percent', 5.0, type=float)
+            max_requests = request.form.get('max_requests', 200, type=int)
+            window = profiler.start(duration, sample_percent / 100.0, max_requests)
+            flash(f"Profiling {window['sample_rate']:.1%} of chat requests until {time.strftime('%H:%M:%S', time.localtime(window['until']))}. "
+                  "It switches off by itself.", 'success')
+        elif request.form.get('action') == 'stop':
+            profiler.stop()
+            flash('Profiling stopped. Collected profiles are still available for download.', 'success')
+        return redirect(url_for('admin.profiling'))
+    return render_template('admin/admin_profiling.html', title='Request Profiling',
+                           status=profiler.status(), summary=profiler.collect_summary(),
+                           max_window_seconds=MAX_PROFILING_WINDOW_SECONDS)
+
+@admin_bp.route('/profiling/download')
+@login_required
+def download_profile():
+    profiler = get_request_profiler()
+    dump = profiler.collect_dump()
+    if dump is None:
+        flash('No profiles collected yet.', 'warning')
+        return redirect(url_for('admin.profiling'))
+    window_id = profiler.status()['window']['window_id']
+    return Response(dump, mimetype='application/octet-stream',
+                    headers={'Content-Disposition': f'attachment; filename=chat-requests-{window_id}.pstats'})
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
@@ -320,7 +450,7 @@ def upload_rules_file():
                  flash('No valid rules (e.g. missing Rule_ID or other validation failed) found in the uploaded file, though rows were present.', 'danger')
             elif not uploaded_rules:
                  flash('Uploaded file was empty or contained no data rows.', 'warning')
-            else:
+            elif _passes_regression_gate(uploaded_rules):
                 if _write_rules_to_csv(uploaded_rules):
                     flash(f'Successfully uploaded and replaced rules from {secure_filename(file.filename)}. {len(uploaded_rules)} rules loaded.', 'success')
         except Exception as e:
@@ -332,7 +462,13 @@ def upload_rules_file():
 @admin_bp.route('/appearance', methods=['GET', 'POST'])
 @login_required
 def manage_appearance():
-    current_settings = _load_appearance_settings()
+    # ?tenant=<id> edits a hosted brand's look; without it, the default deployment's settings.
+    tenant_id = request.args.get('tenant') or DEFAULT_TENANT_ID
+    if tenant_id != DEFAULT_TENANT_ID and not tenant_exists(tenant_id):
+        flash(f"Unknown tenant '{tenant_id}'. Showing the default appearance settings.", 'warning')
+        return redirect(url_for('admin.manage_appearance'))
+    settings_path = _appearance_settings_path(tenant_id)
+    current_settings = _load_appearance_settings(settings_path)
     if request.method == 'POST':
         new_settings = {}
         for key in DEFAULT_APPEARANCE_SETTINGS.keys():
@@ -354,9 +490,15 @@ def manage_appearance():
             else:
                 new_settings[key] = current_settings.get(key, DEFAULT_APPEARANCE_SETTINGS[key])
 
-        if _save_appearance_settings(new_settings):
+        if _save_appearance_settings(new_settings, settings_path):
             flash('Appearance settings saved successfully!', 'success') # Flash moved from _save to here
-            return redirect(url_for('admin.manage_appearance'))
+            return redirect(_appearance_url(tenant_id))
         # If save failed, current_settings are re-passed to template
 
-    return render_template('admin/admin_manage_appearance.html', title='Manage Appearance', current_settings=current_settings)
+    return render_template('admin/admin_manage_appearance.html', title='Manage Appearance', current_settings=current_settings,
+                           tenant_id=tenant_id, form_action=_appearance_url(tenant_id))
+
+def _appearance_url(tenant_id):
+    if tenant_id == DEFAULT_TENANT_ID:
+        return url_for('admin.manage_appearance')
+    return url_for('admin.manage_appearance', tenant=tenant_id)
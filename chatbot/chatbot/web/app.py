@@ -1,14 +1,17 @@
+import time
+_MODULE_IMPORT_STARTED = time.perf_counter() # Start of the boot timing reported by create_app()
 import os
 import sys
 import json # For loading appearance settings
-from flask import Flask, render_template, request, session, url_for # session and url_for might be needed if chat evolves
-from dotenv import load_dotenv
+import collections
+import threading
+from flask import Flask, render_template, request, session, url_for, abort, current_app # session and url_for might be needed if chat evolves
+from werkzeug.middleware.proxy_fix import ProxyFix
 
 # --- Configuration & Path Setup ---
 # This file: /app/chatbot/chatbot/web/app.py
 # Project Root: /app
 PROJECT_ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
-DOTENV_PATH = os.path.join(PROJECT_ROOT_DIR, '.env')
 APPEARANCE_SETTINGS_JSON_PATH = os.path.join(PROJECT_ROOT_DIR, 'chatbot', 'chatbot', 'web', 'appearance_settings.json')
 
 DEFAULT_APPEARANCE_SETTINGS = {
@@ -27,17 +30,6 @@ DEFAULT_APPEARANCE_SETTINGS = {
     "send_button_font_color": "#ffffff"
 }
 
-# Load .env file from project root
-if os.path.exists(DOTENV_PATH):
-    print(f"INFO (app.py): Loading .env file from {DOTENV_PATH}")
-    load_dotenv(dotenv_path=DOTENV_PATH)
-else:
-    # Fallback to default search (e.g., CWD) if .env not found at determined project root
-    if load_dotenv():
-        print("INFO (app.py): .env file loaded via default search (e.g., CWD).")
-    else:
-        print("WARNING (app.py): .env file not found. Required environment variables may be missing.")
-
 # Ensure project root is in sys.path for consistent imports when run with `python -m chatbot.chatbot.web.app`
 # The project root here is /app, which contains the first `chatbot` directory (the package)
 if PROJECT_ROOT_DIR not in sys.path:
@@ -45,6 +37,18 @@ if PROJECT_ROOT_DIR not in sys.path:
     # print(f"INFO (app.py): Added project root {PROJECT_ROOT_DIR} to sys.path for module resolution.")
 
 # --- Module Imports (after sys.path modification if any) ---
+# Nothing imported here loads .env, imports the Gemini SDK or builds the rule engine: create_app() loads the
+# config once, the SDK is imported on the first fallback (or by warm-up) and the rules on the first chat turn.
+from chatbot.chatbot.core.config import AppConfig, StartupTimer, get_config, set_config
+from chatbot.chatbot.core.tenants import (DEFAULT_TENANT_ID, tenant_mode, tenant_exists, tenant_id_from_host,
+                                          tenant_appearance_settings_path)
+from chatbot.chatbot.core.memory_report import register_memory_reporter, deep_getsizeof
+from chatbot.chatbot.core.request_profiler import get_request_profiler
+from chatbot.chatbot.core.rate_limit import get_rate_limiter
+from chatbot.chatbot.core.transcript_journal import get_transcript_journal
+from chatbot.chatbot.core.traffic_capture import redact, short_hash
+from chatbot.chatbot.core.session_store import SESSION_ID_COOKIE_KEY
+
 try:
     from chatbot.chatbot.core.rules_based_chatbot import get_response_for_web as get_response
     from chatbot.chatbot.web.admin_views import admin_bp
@@ -53,35 +57,48 @@ except ImportError as e:
     print(f"ERROR (app.py): Failed to import critical modules (rules_based_chatbot or admin_views): {e}")
     print("         Ensure the project structure is correct and all dependencies are installed.")
     # Define fallback get_response if core logic is missing
-    def get_response(user_message): return f"ERROR: Chatbot core logic failed to load: {e}. Please check server logs."
+    def get_response(user_message, tenant_id=None, client_key=None): return f"ERROR: Chatbot core logic failed to load: {e}. Please check server logs."
     admin_bp = None # Ensure admin_bp is None if import fails
     modules_loaded_successfully = False
 
-# --- Flask App Initialization ---
-app = Flask(__name__) # Looks for /templates relative to this file's directory (web/templates)
-
-# Configure Secret Key for session management (used by admin panel)
-FLASK_SECRET_KEY = os.getenv('FLASK_SECRET_KEY')
-if not FLASK_SECRET_KEY:
-    print("CRITICAL (app.py): FLASK_SECRET_KEY not set in .env. Using a temporary, insecure key. Sessions will NOT persist across restarts.")
-    app.secret_key = os.urandom(32) # Highly recommended to set a persistent key in .env
-else:
-    app.secret_key = FLASK_SECRET_KEY
-    print("INFO (app.py): Flask secret key loaded from .env.")
-
-# Register Admin Blueprint
-if admin_bp and modules_loaded_successfully: # Only register if import was successful
-    app.register_blueprint(admin_bp)
-    print("INFO (app.py): Admin blueprint registered successfully.")
-else:
-    print("ERROR (app.py): Admin blueprint not registered, likely due to import failure or it being None.")
+_MODULE_IMPORT_MS = (time.perf_counter() - _MODULE_IMPORT_STARTED) * 1000
+_module_imports_reported = False
+
+TURN_RATE_LIMITED_RESPONSE = "You're sending messages faster than I can keep up with. Please wait a moment and try again."
 
 # --- In-memory Conversation History (for demonstration) ---
 # In a production app, consider using server-side sessions or a database for history.
 conversation_history = []
+# Other tenants get their own (bounded) transcript, so one brand's page never shows another brand's chat.
+TENANT_CONVERSATION_HISTORY_MAX = 100
+tenant_conversation_histories = {}
+
+def _conversation_history_for(tenant_id):
+    if tenant_id == DEFAULT_TENANT_ID:
+        return conversation_history
+    return tenant_conversation_histories.setdefault(tenant_id, collections.deque(maxlen=TENANT_CONVERSATION_HISTORY_MAX))
+
+def _conversation_history_memory_report():
+    # list() copies first: the transcript may be appended to by another request thread meanwhile.
+    histories = [list(conversation_history)] + [list(h) for h in list(tenant_conversation_histories.values())]
+    return {'bytes': sum(deep_getsizeof(h) for h in histories), 'messages': sum(len(h) for h in histories)}
+
+register_memory_reporter('conversation_history', _conversation_history_memory_report)
 
 # --- Helper for Appearance Settings ---
-def _load_appearance_settings_for_chat():
+def _load_appearance_settings_for_chat(tenant_id=DEFAULT_TENANT_ID):
+    # A tenant without its own appearance_settings.json inherits the default deployment's look.
+    if tenant_id != DEFAULT_TENANT_ID:
+        tenant_settings_path = tenant_appearance_settings_path(tenant_id)
+        if os.path.exists(tenant_settings_path):
+            try:
+                with open(tenant_settings_path, 'r', encoding='utf-8') as f:
+                    settings = json.load(f)
+                for key, value in DEFAULT_APPEARANCE_SETTINGS.items():
+                    settings.setdefault(key, value)
+                return settings
+            except (OSError, ValueError) as e:
+                print(f"WARNING (app.py): Error loading {tenant_settings_path}: {e}. Using the default tenant's appearance settings.")
     if os.path.exists(APPEARANCE_SETTINGS_JSON_PATH):
         try:
             with open(APPEARANCE_SETTINGS_JSON_PATH, 'r', encoding='utf-8') as f:
@@ -109,29 +126,133 @@ def _load_appearance_settings_for_chat():
 
 
 # --- Main Chat Route ---
-@app.route('/', methods=['GET', 'POST'])
 def chat_interface():
+    # In host mode the brand comes from the subdomain; otherwise '/' is the default tenant.
+    tenant_id = tenant_id_from_host(request.host) if tenant_mode() == 'host' else DEFAULT_TENANT_ID
+    # Sampled profiling is controlled from the admin panel; while no window is open this is a clock check.
+    with get_request_profiler().profile_if_sampled():
+        return _chat_page(tenant_id)
+
+def tenant_chat_interface(tenant_id):
+    if tenant_mode() != 'path' or not tenant_exists(tenant_id):
+        abort(404)
+    with get_request_profiler().profile_if_sampled():
+        return _chat_page(tenant_id)
+
+def _rate_limit_client_key():
+    # 'session' keys on the server-side session id (clients behind one NAT get separate budgets),
+    # falling back to the address for a first request that has no session yet.
+    if get_config().rate_limit_key == 'session' and session.get(SESSION_ID_COOKIE_KEY):
+        return 'sid:' + session[SESSION_ID_COOKIE_KEY]
+    return 'ip:' + (request.remote_addr or 'unknown')
+
+def _chat_page(tenant_id):
+    history = _conversation_history_for(tenant_id)
     if request.method == 'POST':
         user_message = request.form.get('message', '').strip()
         if user_message:
             # print(f"DEBUG (app.py): User message received: '{user_message}'") # Verbose
+            client_key = _rate_limit_client_key()
+            if not get_rate_limiter().allow_turn(client_key):
+                # Not recorded in the transcript and no rule or LLM work done: just tell this client to slow down.
+                rate_limited_turn = [{'sender': 'User', 'text': user_message}, {'sender': 'Bot', 'text': TURN_RATE_LIMITED_RESPONSE}]
+                return render_template('index.html',
+                                       conversation=list(history) + rate_limited_turn,
+                                       appearance_settings=_load_appearance_settings_for_chat(tenant_id)), 429
             if not modules_loaded_successfully: # Check if core logic is available
                  bot_response_text = "Chatbot core components failed to load. Please contact support."
             else:
-                 bot_response_text = get_response(user_message) # Aliased to get_response_for_web
+                 bot_response_text = get_response(user_message, tenant_id, client_key) # Aliased to get_response_for_web
             # print(f"DEBUG (app.py): Bot response generated: '{bot_response_text[:60]}...'") # Verbose
 
-            # Append to global history list
-            conversation_history.append({'sender': 'User', 'text': user_message})
-            conversation_history.append({'sender': 'Bot', 'text': bot_response_text})
+            # Append to the tenant's history list
+            history.append({'sender': 'User', 'text': user_message})
+            history.append({'sender': 'Bot', 'text': bot_response_text})
+            # Durable copy (opt-in, redacted): queued here, written and fsynced by the journal's background thread.
+            # Turns are grouped by a hash of the session id keyed with the app's secret, never the lookup key itself.
+            journal = get_transcript_journal()
+            if journal is not None:
+                sid = session.get(SESSION_ID_COOKIE_KEY)
+                journal.record({'tenant': tenant_id, 'conversation': short_hash(sid, key=current_app.secret_key) if sid else None,
+                                'user': redact(user_message), 'bot': redact(bot_response_text)})
             # Note: For multiple users, conversation_history should be session-based or user-specific.
 
-    current_appearance = _load_appearance_settings_for_chat()
+    current_appearance = _load_appearance_settings_for_chat(tenant_id)
     # Pass a copy of the history to avoid issues if modifying it while rendering
     return render_template('index.html',
-                           conversation=list(conversation_history),
+                           conversation=list(history),
                            appearance_settings=current_appearance)
 
+# --- Application Factory ---
+def create_app(config=None):
+    """
+    Builds the Flask app. config defaults to AppConfig.from_env(), which loads .env (once per process).
+    Startup does no LLM or rule-engine work; a timing breakdown is printed when CHATBOT_STARTUP_REPORT=1.
+    """
+    global _module_imports_reported
+    if _module_imports_reported:
+        timer = StartupTimer()
+    else:
+        # The first app of the process also accounts for importing this module and its dependencies.
+        timer = StartupTimer(started_at=_MODULE_IMPORT_STARTED)
+        timer.record('module imports', _MODULE_IMPORT_MS)
+        _module_imports_reported = True
+    with timer.phase('config'):
+        config = config or AppConfig.from_env()
+        set_config(config)
+
+    with timer.phase('flask app'):
+        app = Flask(__name__) # Looks for /templates relative to this file's directory (web/templates)
+        # Configure Secret Key for session management (used by admin panel)
+        if not config.flask_secret_key:
+            print("CRITICAL (app.py): FLASK_SECRET_KEY not set in .env. Using a temporary, insecure key. Sessions will NOT persist across restarts.")
+            app.secret_key = os.urandom(32) # Highly recommended to set a persistent key in .env
+        else:
+            app.secret_key = config.flask_secret_key
+        if config.trusted_proxies > 0:
+            # request.remote_addr (the rate-limit key) and request.host (host-mode tenants) then come from
+            # the X-Forwarded-* headers set by those proxies, not from the proxy's own connection.
+            hops = config.trusted_proxies
+            app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops, x_host=hops)
+        app.add_url_rule('/', 'chat_interface', chat_interface, methods=['GET', 'POST'])
+        app.add_url_rule('/t/<tenant_id>/', 'tenant_chat_interface', tenant_chat_interface, methods=['GET', 'POST'])
+
+    with timer.phase('admin blueprint'):
+        if admin_bp and modules_loaded_successfully: # Only register if import was successful
+            app.register_blueprint(admin_bp)
+        else:
+            print("ERROR (app.py): Admin blueprint not registered, likely due to import failure or it being None.")
+
+    app.config['STARTUP_TIMINGS'] = list(timer.phases)
+    if config.startup_report:
+        print(f"INFO (app.py): Startup {timer.report()}; rules load on the first chat turn, the Gemini SDK on the first fallback"
+              f"{' (background warm-up enabled)' if config.gemini_warmup else ''}.")
+    return app
+
+def start_background_warmup():
+    """Called once a serving process is up (dev server, or each gunicorn worker): warms the Gemini client if GEMINI_WARMUP=1."""
+    if get_config().gemini_warmup:
+        from chatbot.chatbot.integrations.gemini_client import warm_up_in_background
+        warm_up_in_background()
+
+_app = None
+_app_lock = threading.Lock()
+
+def get_app():
+    """The module's default app, created on first access (``chatbot.chatbot.web.app:app`` for gunicorn)."""
+    global _app
+    if _app is None:
+        with _app_lock:
+            if _app is None:
+                _app = create_app()
+    return _app
+
+def __getattr__(name):
+    # Module-level `app` is built lazily, so importing this module (tests, tools) stays cheap.
+    if name == 'app':
+        return get_app()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 # --- Run Application ---
 if __name__ == '__main__':
     print("INFO (app.py): Starting Flask development server...")
@@ -141,4 +262,6 @@ if __name__ == '__main__':
         print(f"CRITICAL (app.py): Main chat template 'index.html' not found at expected path: {main_template_path}")
         print("                 The application may not run correctly without this template.")
 
+    app = get_app()
+    start_background_warmup()
     app.run(debug=True, host='0.0.0.0', port=5000)
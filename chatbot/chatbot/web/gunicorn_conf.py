@@ -0,0 +1,32 @@
+# Gunicorn settings for multi-worker deployments.
+# Usage (from the project root): gunicorn -c chatbot/chatbot/web/gunicorn_conf.py chatbot.chatbot.web.app:app
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('GUNICORN_WORKERS', '2'))
+# Threaded workers: a rule-answered turn must not wait behind a Gemini turn in the same worker. The
+# LLM lane (core/chat_lanes.py) bounds how many of these threads may be waiting on Gemini at once;
+# with sync workers (one request at a time) the lanes could not isolate anything. Keep the lane's
+# capacity (CHATBOT_LLM_LANE_WORKERS + CHATBOT_LLM_LANE_QUEUE, default 8) below `threads`.
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '16'))
+
+# With preload, the app (and the rule engine, see when_ready) is built once in the master and
+# shared copy-on-write by every forked worker. Set CHATBOT_PRELOAD_RULES=0 to build per worker.
+preload_app = os.getenv('CHATBOT_PRELOAD_RULES', '1') == '1'
+
+def when_ready(server):
+    # Runs in the master after the app is imported and before any worker is forked.
+    if preload_app:
+        from chatbot.chatbot.core.preload import preload_rules_engine
+        preload_rules_engine()
+
+def post_worker_init(worker):
+    from chatbot.chatbot.core.preload import read_memory_usage
+    usage = read_memory_usage()
+    if usage:
+        worker.log.info("Worker %s memory: rss=%.1f MiB shared=%.1f MiB unique=%.1f MiB",
+                        worker.pid, usage['rss'] / 2**20, usage['shared'] / 2**20, usage['uss'] / 2**20)
+    # The Gemini client is created per worker (after fork, so no SDK threads or sockets are inherited).
+    from chatbot.chatbot.web.app import start_background_warmup
+    start_background_warmup()
@@ -0,0 +1,118 @@
+# chatbot/tests/test_answer_cache.py
+import unittest
+import csv
+import os
+import sys
+import tempfile
+
+# __file__ is /app/chatbot/tests/test_answer_cache.py -> REPO_ROOT is /app
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from chatbot.chatbot.core.rules_based_chatbot import RulesBasedChatbot, EXPECTED_CSV_HEADERS
+from chatbot.chatbot.core.miss_log import MissLog, top_misses
+from chatbot.chatbot.core.transcript_journal import TranscriptJournal
+from chatbot.chatbot.admin.warm_answer_cache import warm_answer_cache
+from chatbot.chatbot.integrations.answer_cache import write_cache_entries
+
+
+class TestMissLogAndAnswerCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.rules_csv_path = os.path.join(self.tmp_dir.name, 'rules.csv')
+        with open(self.rules_csv_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(EXPECTED_CSV_HEADERS)
+            writer.writerow(['1', '', 'hello', 'Hi!', '', ''])
+        self.llm_calls = []
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def fake_llm(self, prompt):
+        self.llm_calls.append(prompt)
+        return "We open at 9am."
+
+    def test_misses_are_aggregated_by_normalized_input(self):
+        miss_log = MissLog(os.path.join(self.tmp_dir.name, 'misses'))
+        for text in ["When are you OPEN?", "when are you open", "  When  are you open!! ", "refund please"]:
+            miss_log.record(text)
+        miss_log.flush()
+        top = top_misses(miss_log.directory, 10)
+        self.assertEqual(top[0]['q'], 'when are you open')
+        self.assertEqual(top[0]['count'], 3)
+        self.assertEqual(top_misses(miss_log.directory, 10, min_count=2), top[:1])
+
+    def test_misses_are_redacted_before_they_are_stored(self):
+        miss_log = MissLog(os.path.join(self.tmp_dir.name, 'misses'))
+        miss_log.record("refund order for jane@example.com, card 4111 1111 1111 1111")
+        miss_log.flush()
+        [miss] = top_misses(miss_log.directory, 10)
+        self.assertEqual(miss['input'], "refund order for <email>, card <number>")
+        self.assertNotIn('jane', miss['q'])
+
+    def test_old_segments_are_deleted_beyond_the_limit(self):
+        directory = os.path.join(self.tmp_dir.name, 'misses')
+        journal = TranscriptJournal(directory, flush_interval=3600, segment_max_bytes=100, max_segments=2)
+        for i in range(5):
+            journal.record({'q': f'question {i}', 'input': 'x' * 80})
+            journal.flush()
+        journal.close()
+        self.assertEqual(len(os.listdir(directory)), 2)
+        self.assertEqual([miss['q'] for miss in top_misses(directory, 10)], ['question 3', 'question 4'])
+
+    def test_single_file_logs_are_still_read(self):
+        path = os.path.join(self.tmp_dir.name, 'fallback_misses.jsonl')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('{"q": "when are you open", "input": "When are you open?"}\n{"q": "when are')
+        self.assertEqual(top_misses(path, 10), [{'q': 'when are you open', 'count': 1, 'input': 'When are you open?'}])
+
+    def test_warmed_answers_are_served_without_llm_call(self):
+        chatbot = RulesBasedChatbot(rules_csv_path=self.rules_csv_path, llm_fallback=self.fake_llm)
+        for _ in range(3):
+            chatbot.get_response("When are you open?", {})
+        # Every turn is logged as a miss; the repeats are answered by the semantic cache, not Gemini.
+        self.assertEqual(len(self.llm_calls), 1)
+
+        chatbot.miss_log.flush()
+        added, skipped = warm_answer_cache(chatbot.miss_log.directory, chatbot.answer_cache.path,
+                                           top_n=10, min_count=2, delay_seconds=0, answer_fn=self.fake_llm)
+        self.assertEqual((added, skipped), (1, 0))
+
+        self.assertEqual(chatbot.get_response("when are you OPEN", {}), "We open at 9am.")
+        self.assertEqual(len(self.llm_calls), 2) # Only the warm-up call; the turn itself was a cache hit
+
+    def test_warmed_answers_only_serve_questions_that_stand_alone(self):
+        chatbot = RulesBasedChatbot(rules_csv_path=self.rules_csv_path, llm_fallback=self.fake_llm)
+        write_cache_entries(chatbot.answer_cache.path, {'how much is it': {'answer': "It is $5.", 'input': "How much is it?"}})
+        self.assertEqual(chatbot.get_response("How much is it?", {}), "It is $5.")
+        after_hello = {}
+        chatbot.get_response("hello", after_hello)
+        self.assertEqual(chatbot.get_response("how much is it?", after_hello), "We open at 9am.")
+        self.assertEqual(chatbot.get_response("how much is it?", {'chatbot_context': 'ordering'}), "We open at 9am.")
+        self.assertEqual(len(self.llm_calls), 2)
+        self.assertIsNone(chatbot.explain("how much is it?", 'ordering')['response'])
+        # Follow-ups are not logged either, so a warm-up run never answers them out of context.
+        chatbot.miss_log.flush()
+        self.assertEqual([miss['count'] for miss in top_misses(chatbot.miss_log.directory, 10)], [1])
+
+    def test_misses_logged_inside_a_context_are_not_warmed(self):
+        path = os.path.join(self.tmp_dir.name, 'fallback_misses.jsonl')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('{"q": "how much is it", "input": "How much is it?", "ctx": "ordering"}\n')
+        self.assertEqual(top_misses(path, 10), [])
+
+    def test_gemini_errors_are_not_cached(self):
+        miss_log = MissLog(os.path.join(self.tmp_dir.name, 'misses'))
+        miss_log.record("what is the meaning of life")
+        miss_log.flush()
+        cache_path = os.path.join(self.tmp_dir.name, 'cache.json')
+        added, skipped = warm_answer_cache(miss_log.directory, cache_path, top_n=10, min_count=1, delay_seconds=0,
+                                           answer_fn=lambda prompt: "Gemini API Error: Project quota exceeded.")
+        self.assertEqual((added, skipped), (0, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
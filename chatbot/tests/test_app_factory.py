@@ -0,0 +1,45 @@
+# chatbot/tests/test_app_factory.py
+import unittest
+import os
+import sys
+
+# __file__ is /app/chatbot/tests/test_app_factory.py -> REPO_ROOT is /app
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from chatbot.chatbot.core.config import AppConfig, get_config
+from chatbot.chatbot.integrations import gemini_client
+from chatbot.chatbot.web.app import create_app
+
+
+class TestAppFactory(unittest.TestCase):
+
+    def setUp(self):
+        self.config = AppConfig(environ={'FLASK_SECRET_KEY': 'test-secret', 'ADMIN_USERNAME': 'admin',
+                                         'ADMIN_PASSWORD': 'pw', 'CHATBOT_STARTUP_REPORT': '0'})
+
+    def test_factory_installs_single_config_and_reports_startup_phases(self):
+        app = create_app(self.config)
+        self.assertIs(get_config(), self.config)
+        self.assertEqual(app.secret_key, 'test-secret')
+        phases = [name for name, _ in app.config['STARTUP_TIMINGS']]
+        self.assertIn('config', phases)
+        self.assertIn('admin blueprint', phases)
+
+    def test_admin_login_uses_config_credentials(self):
+        client = create_app(self.config).test_client()
+        client.post('/admin/login', data={'username': 'admin', 'password': 'pw'})
+        self.assertEqual(client.get('/admin/memory').status_code, 200)
+
+    def test_llm_sdk_is_not_imported_or_configured_at_startup(self):
+        create_app(self.config)
+        self.assertIsNone(gemini_client.genai)
+        self.assertIsNone(gemini_client.model_instance)
+        # Without an API key the fallback reports the problem instead of importing the SDK.
+        self.assertTrue(gemini_client.get_gemini_response("hi").startswith("Gemini client error:"))
+        self.assertIsNone(gemini_client.warm_up_in_background())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+# chatbot/tests/test_chat_lanes.py
+import unittest
+import csv
+import os
+import sys
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+
+# __file__ is /app/chatbot/tests/test_chat_lanes.py -> REPO_ROOT is /app
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from chatbot.chatbot.core import rules_based_chatbot as core_chatbot
+from chatbot.chatbot.core.chat_lanes import ChatLanes, LaneFull, LaneTimeout, get_chat_lanes
+from chatbot.chatbot.core import config as config_module
+from chatbot.chatbot.core.config import AppConfig
+from chatbot.chatbot.core.flat_rules import FlatRuleTable
+from chatbot.chatbot.core.memory_report import subsystem_report
+from chatbot.chatbot.core.rules_based_chatbot import (RulesBasedChatbot, EXPECTED_CSV_HEADERS, HISTORY_SESSION_KEY,
+                                                      LLM_LANE_BUSY_RESPONSE)
+from chatbot.chatbot.core.session_store import get_session_store, SESSION_ID_COOKIE_KEY
+from chatbot.chatbot.web.app import create_app
+
+
+class TestChatLanes(unittest.TestCase):
+
+    def test_llm_lane_admits_workers_plus_queue_then_turns_away(self):
+        lanes = ChatLanes(llm_workers=1, llm_queue_max=1, llm_timeout=5)
+        release = threading.Event()
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(lanes.run_llm(release.wait))) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        while lanes.stats()['llm_running'] + lanes.stats()['llm_queued'] < 2:
+            time.sleep(0.001)
+        self.assertEqual((lanes.stats()['llm_running'], lanes.stats()['llm_queued']), (1, 1))
+        with self.assertRaises(LaneFull):
+            lanes.run_llm(release.wait)
+        self.assertEqual(lanes.run_fast(lambda: 'fast'), 'fast') # The fast lane is unaffected
+        release.set()
+        for thread in threads:
+            thread.join()
+        stats = lanes.stats()
+        self.assertEqual(results, [True, True])
+        self.assertEqual((stats['llm_turns'], stats['llm_rejected'], stats['fast_turns']), (2, 1, 1))
+        self.assertEqual((stats['llm_running'], stats['llm_queued']), (0, 0))
+        lanes.close()
+
+    def test_slow_turn_times_out_but_keeps_its_slot_until_done(self):
+        lanes = ChatLanes(llm_workers=1, llm_queue_max=0, llm_timeout=0.05)
+        release = threading.Event()
+        with self.assertRaises(LaneTimeout):
+            lanes.run_llm(release.wait)
+        with self.assertRaises(LaneFull):
+            lanes.run_llm(lambda: None)
+        release.set()
+        lanes.close()
+        self.assertEqual(lanes.stats()['llm_timed_out'], 1)
+
+
+class TestChatLanesInWebApp(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        rules_csv_path = os.path.join(self.tmp_dir.name, 'rules.csv')
+        with open(rules_csv_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(EXPECTED_CSV_HEADERS)
+            writer.writerow(['1', '', 'hello', 'Hi there!', 'greeted', ''])
+            writer.writerow(['2', 'greeted', 'status', 'Still greeted.', 'greeted', ''])
+        self.release = threading.Event()
+        self.previous_config = config_module._config
+        core_chatbot._chatbot_instance = RulesBasedChatbot(rules_csv_path=rules_csv_path, llm_fallback=self.slow_llm)
+        self.app = create_app(AppConfig(environ={
+            'FLASK_SECRET_KEY': 'test-secret', 'CHATBOT_STARTUP_REPORT': '0', 'CHATBOT_RATE_LIMIT_TURNS': '0',
+            'CHATBOT_RATE_LIMIT_LLM_CALLS': '0', 'CHATBOT_TRANSCRIPTS': '0', 'CHATBOT_SEMANTIC_CACHE': '0',
+            'CHATBOT_LLM_LANE_WORKERS': '1', 'CHATBOT_LLM_LANE_QUEUE': '1', 'CHATBOT_LLM_LANE_TIMEOUT': '5'}))
+
+    def tearDown(self):
+        self.release.set()
+        get_chat_lanes().close()
+        core_chatbot._chatbot_instance = None
+        config_module.set_config(self.previous_config)
+        self.tmp_dir.cleanup()
+
+    def slow_llm(self, prompt):
+        self.release.wait(5)
+        return "A slow answer."
+
+    def post(self, message, responses):
+        response = self.app.test_client().post('/', data={'message': message})
+        responses.append(response.get_data(as_text=True))
+
+    def test_rule_turns_stay_fast_while_the_llm_lane_is_saturated(self):
+        responses = []
+        fallbacks = [threading.Thread(target=self.post, args=(f'question {i}', responses)) for i in range(2)]
+        for thread in fallbacks:
+            thread.start()
+        lanes = get_chat_lanes()
+        while lanes.stats()['llm_running'] + lanes.stats()['llm_queued'] < 2:
+            time.sleep(0.001)
+
+        started = time.perf_counter()
+        hello = self.app.test_client().post('/', data={'message': 'hello'})
+        self.assertLess(time.perf_counter() - started, 1.0)
+        self.assertIn('Hi there!', hello.get_data(as_text=True))
+        busy = self.app.test_client().post('/', data={'message': 'one question too many'})
+        self.assertIn(LLM_LANE_BUSY_RESPONSE.replace("'", '&#39;'), busy.get_data(as_text=True))
+
+        self.release.set()
+        for thread in fallbacks:
+            thread.join()
+        self.assertTrue(all('A slow answer.' in text for text in responses))
+        report = subsystem_report()['chat_lanes']
+        self.assertEqual((report['fast_turns'], report['llm_turns'], report['llm_rejected']), (1, 2, 1))
+
+    def test_each_turn_is_matched_once(self):
+        with patch.object(FlatRuleTable, 'find_index', autospec=True, side_effect=FlatRuleTable.find_index) as find_index:
+            self.app.test_client().post('/', data={'message': 'hello'})
+        self.assertEqual(find_index.call_count, 1) # The lane decision's match is the turn's match
+
+    def test_a_timed_out_turn_never_writes_over_later_turns(self):
+        lanes = get_chat_lanes()
+        lanes.llm_timeout = 0.05
+        client = self.app.test_client()
+        client.post('/', data={'message': 'a slow question'}) # Times out; Gemini is still "thinking"
+        client.post('/', data={'message': 'hello'}) # Sets the context 'greeted'
+        self.release.set()
+        while lanes.stats()['llm_running']:
+            time.sleep(0.001)
+        self.assertIn('Still greeted.', client.post('/', data={'message': 'status'}).get_data(as_text=True))
+        with client.session_transaction() as flask_session:
+            sid = flask_session[SESSION_ID_COOKIE_KEY]
+        history = get_session_store().session_for(sid)[HISTORY_SESSION_KEY]
+        self.assertEqual([message['text'] for message in history], ['hello', 'Hi there!', 'status', 'Still greeted.'])
+
+
+if __name__ == '__main__':
+    unittest.main()
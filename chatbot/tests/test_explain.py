@@ -0,0 +1,75 @@
+# chatbot/tests/test_explain.py
+import unittest
+import csv
+import os
+import sys
+import tempfile
+
+# __file__ is /app/chatbot/tests/test_explain.py -> REPO_ROOT is /app
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from chatbot.chatbot.core.rules_based_chatbot import RulesBasedChatbot, EXPECTED_CSV_HEADERS
+
+
+class TestExplain(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        rules_csv_path = os.path.join(self.tmp_dir.name, 'rules.csv')
+        with open(rules_csv_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(EXPECTED_CSV_HEADERS)
+            writer.writerow(['1', '', 'hello', 'Hi there!', 'greeted', ''])
+            writer.writerow(['2', 'greeted', 'joke', 'Why did the scarecrow win an award?', '', 'PUNCH'])
+            writer.writerow(['PUNCH', 'joke_pending', '', 'Because he was outstanding in his field!', 'joke_told', ''])
+            writer.writerow(['3', '', 'hello there', 'Never chosen: shadowed by rule 1.', '', ''])
+            writer.writerow(['LOOP_A', '', 'loop', 'A', 'loop_active', 'LOOP_B'])
+            writer.writerow(['LOOP_B', 'loop_active', '', 'B', '', 'LOOP_A'])
+            writer.writerow(['4', '', 'refund + order', 'Refunds take 5 days.', 'clear', ''])
+        self.llm_calls = []
+        self.chatbot = RulesBasedChatbot(rules_csv_path=rules_csv_path, llm_fallback=self.llm_calls.append)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_explain_agrees_with_get_response_and_writes_nothing(self):
+        cases = [('hello there', None), ('tell me a joke', 'greeted'), ('loop', None),
+                 ('my order needs a refund', 'greeted'), ('anything else', None)]
+        for text, context in cases:
+            with self.subTest(text=text, context=context):
+                report = self.chatbot.explain(text, context)
+                session = {'chatbot_context': context} if context else {}
+                response = self.chatbot.get_response(text, session)
+                self.assertEqual(report['context_after'], session.get('chatbot_context'))
+                if report['calls_llm']:
+                    self.assertIsNone(report['response'])
+                else:
+                    self.assertEqual(report['response'], response)
+        self.assertEqual(len(self.llm_calls), 1) # Only the real get_response turn for 'anything else'
+
+    def test_report_explains_choice_chain_and_shadowed_rules(self):
+        report = self.chatbot.explain('hello there', None)
+        self.assertEqual(report['matched_rule']['Rule_ID'], '1')
+        self.assertIn("'hello'", report['reason'])
+        self.assertEqual([entry['Rule_ID'] for entry in report['excluded_matches']], ['3'])
+        self.assertEqual(report['excluded_matches'][0]['Shadowed_By'], '1')
+        self.assertTrue(report['candidates'][-1]['matched'])
+        self.assertIn('match_ms', report['timings'])
+
+        report = self.chatbot.explain('loop', None)
+        self.assertEqual([step['Rule_ID'] for step in report['steps']], ['LOOP_A', 'LOOP_B'])
+        self.assertIn('loop', report['steps'][-1]['stopped'])
+        self.assertEqual(report['steps'][0]['context_after'], 'loop_active')
+
+    def test_no_match_reports_llm_call(self):
+        report = self.chatbot.explain('what are your opening hours', 'greeted')
+        self.assertIsNone(report['matched_rule'])
+        self.assertTrue(report['calls_llm'])
+        self.assertIsNone(report['context_after'])
+        self.assertEqual(self.llm_calls, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
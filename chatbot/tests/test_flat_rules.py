@@ -0,0 +1,96 @@
+# chatbot/tests/test_flat_rules.py
+import unittest
+import os
+import sys
+
+# __file__ is /app/chatbot/tests/test_flat_rules.py -> REPO_ROOT is /app
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from chatbot.chatbot.core.flat_rules import FlatRuleTable
+from chatbot.chatbot.core.text_normalize import normalize_input, parse_keyword_pattern
+
+
+def make_rule(rule_id, context, pattern, response='', set_context=None, goto=None):
+    return {'Rule_ID': rule_id, 'Context_Required': context, 'Pattern': pattern, 'Response': response,
+            'Set_Context_On_Response': set_context, 'GoTo_Rule_ID': goto}
+
+
+def linear_scan(rules_list, current_input, current_context):
+    """Reference implementation: the original two-pass first-match scan."""
+    for rule in rules_list:
+        pattern_match = rule['Pattern'] == '*' or (rule['Pattern'] and rule['Pattern'] in current_input)
+        if rule['Context_Required'] == current_context and pattern_match:
+            return rule
+    for rule in rules_list:
+        pattern_match = rule['Pattern'] == '*' or (rule['Pattern'] and rule['Pattern'] in current_input)
+        if not rule['Context_Required'] and pattern_match:
+            return rule
+    return None
+
+
+class TestFlatRuleTable(unittest.TestCase):
+
+    def setUp(self):
+        self.rules = [
+            make_rule('1', None, 'hello', 'Hi there!', 'greeted'),
+            make_rule('2', 'greeted', 'joke', 'Why did the scarecrow win an award?', None, 'PUNCH'),
+            make_rule('PUNCH', None, '', 'Because he was outstanding in his field!', 'joke_told'),
+            make_rule('3', 'greeted', '*', 'Anything else?'),
+            make_rule('4', None, 'café', 'Coffee time.', 'clear'),
+            make_rule('5', None, 'bye', 'Goodbye!', 'clear'),
+        ]
+        self.table = FlatRuleTable(self.rules)
+
+    def test_matches_agree_with_linear_scan(self):
+        inputs = ['hello', 'tell me a joke', 'bye now', 'a café please', 'nothing here', '']
+        for context in [None, 'greeted', 'joke_told', 'unknown']:
+            for text in inputs:
+                with self.subTest(text=text, context=context):
+                    self.assertEqual(self.table.find(text, context), linear_scan(self.rules, text, context))
+
+    def test_rule_round_trips_loader_format(self):
+        self.assertEqual(self.table.get('PUNCH'), self.rules[2])
+        self.assertEqual(self.table.get('4'), self.rules[4])
+        self.assertIsNone(self.table.get('missing'))
+
+    def test_pattern_less_rules_only_reachable_by_id(self):
+        # 'PUNCH' has an empty pattern: it must never be matched from input, even for empty input.
+        self.assertIsNone(self.table.find('', None))
+        self.assertEqual(len(self.table), len(self.rules))
+        self.assertGreater(self.table.memory_bytes(), 0)
+
+
+class TestKeywordSetRules(unittest.TestCase):
+
+    def setUp(self):
+        self.rules = [
+            make_rule('1', None, 'order + refund', 'Refunds take 5 days.'),
+            make_rule('2', None, 'refund', 'Ask about refunds.'),
+            make_rule('3', None, 'shipping + cost + international', 'International shipping is $20.'),
+            make_rule('4', None, 'shipping', 'We ship worldwide.'),
+            make_rule('5', None, 'c++', 'We do not sell compilers.'),
+        ]
+        self.table = FlatRuleTable(self.rules)
+
+    def find_id(self, text, context=None):
+        rule = self.table.find(normalize_input(text), context)
+        return rule['Rule_ID'] if rule else None
+
+    def test_keywords_match_in_any_order_as_whole_words(self):
+        self.assertEqual(self.find_id("I want a refund for my ORDER"), '1')
+        self.assertEqual(self.find_id("cost of international   shipping?"), '3')
+        self.assertEqual(self.find_id("reorder refund"), '2') # 'reorder' is not the word 'order'
+
+    def test_first_match_order_is_kept_across_pattern_types(self):
+        self.assertEqual(self.find_id("shipping cost"), '4') # Keyword rule 3 needs all three words
+        self.assertEqual(self.find_id("refund"), '2')
+
+    def test_plus_without_spaces_stays_a_substring_pattern(self):
+        self.assertIsNone(parse_keyword_pattern('c++'))
+        self.assertEqual(self.find_id("do you have C++ books"), '5')
+
+
+if __name__ == '__main__':
+    unittest.main()
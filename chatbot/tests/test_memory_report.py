@@ -0,0 +1,72 @@
+# chatbot/tests/test_memory_report.py
+import unittest
+import os
+import sys
+import tracemalloc
+from unittest.mock import patch
+
+# __file__ is /app/chatbot/tests/test_memory_report.py -> REPO_ROOT is /app
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from chatbot.chatbot.core import memory_report
+from chatbot.chatbot.core.session_store import SessionStore
+
+
+class TestMemoryReport(unittest.TestCase):
+
+    def tearDown(self):
+        memory_report.stop_tracing()
+
+    def test_deep_size_counts_nested_and_shared_objects_once(self):
+        payload = 'x' * 10000
+        self.assertGreater(memory_report.deep_getsizeof({'a': [payload]}), 10000)
+        self.assertLess(memory_report.deep_getsizeof([payload, payload]), 2 * 10000)
+
+    def test_failing_reporter_does_not_break_the_report(self):
+        memory_report.register_memory_reporter('broken_for_test', lambda: 1 / 0)
+        try:
+            report = memory_report.subsystem_report()
+        finally:
+            memory_report._reporters.pop('broken_for_test')
+        self.assertIn('error', report['broken_for_test'])
+        self.assertIn('sessions', report)
+
+    def test_session_store_memory_grows_with_sessions(self):
+        store = SessionStore()
+        empty = store.memory_bytes()
+        for i in range(50):
+            store.save(f'sid-{i}', {'chatbot_history': [{'role': 'user', 'text': 'hello ' * 20}]})
+        self.assertGreater(store.memory_bytes(), empty)
+
+    def test_session_store_is_measured_outside_its_lock(self):
+        store = SessionStore()
+        store.save('sid-1', {'chatbot_history': [{'role': 'user', 'text': 'hello'}]})
+        lock_held = []
+        def measure(obj):
+            lock_held.append(store._lock.locked())
+            return memory_report.deep_getsizeof(obj)
+        with patch('chatbot.chatbot.core.session_store.deep_getsizeof', side_effect=measure):
+            self.assertGreater(store.memory_bytes(), 0)
+        self.assertEqual(lock_held, [False])
+
+    def test_tracing_is_off_until_started_and_diffs_against_baseline(self):
+        self.assertFalse(tracemalloc.is_tracing())
+        self.assertEqual(memory_report.top_allocations(), [])
+        self.assertFalse(memory_report.mark_baseline())
+
+        memory_report.start_tracing()
+        self.assertTrue(memory_report.mark_baseline())
+        retained = [bytearray(1024) for _ in range(200)]
+        sites = memory_report.diff_from_baseline(limit=5)
+        self.assertTrue(any(__file__ in entry['site'] and entry['bytes_diff'] >= 200 * 1024 for entry in sites))
+        del retained
+
+        memory_report.stop_tracing()
+        self.assertFalse(tracemalloc.is_tracing())
+        self.assertIsNone(memory_report.tracing_status()['baseline_taken_at'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+# chatbot/tests/test_prompt_builder.py
+import unittest
+import os
+import sys
+
+# __file__ is /app/chatbot/tests/test_prompt_builder.py -> REPO_ROOT is /app
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from chatbot.chatbot.core import config as config_module
+from chatbot.chatbot.core.config import AppConfig, set_config
+from chatbot.chatbot.integrations.prompt_builder import build_prompt, estimate_tokens, PROMPT_PREFIX, SUMMARY_LEAD
+
+
+def make_history(turn_count):
+    history = []
+    for i in range(turn_count):
+        history.append({'role': 'user', 'text': f"question number {i} about shipping times and returns"})
+        history.append({'role': 'bot', 'text': f"answer number {i} " + "with plenty of detail " * 5})
+    return history
+
+
+class TestPromptBuilder(unittest.TestCase):
+
+    def test_prompt_starts_with_stable_prefix_and_ends_with_latest_message(self):
+        prompt = build_prompt("where is my order?", history=make_history(2), context='orders')
+        self.assertTrue(prompt.startswith(PROMPT_PREFIX))
+        self.assertIn("Active conversation topic: orders", prompt)
+        self.assertTrue(prompt.endswith("User: where is my order?\nAssistant:"))
+
+    def test_prompt_size_is_bounded_however_long_the_conversation(self):
+        for turn_count in [0, 1, 10, 100, 1000]:
+            with self.subTest(turn_count=turn_count):
+                prompt = build_prompt("and what about refunds?", history=make_history(turn_count), context='returns', budget_tokens=300)
+                self.assertLessEqual(estimate_tokens(prompt), 300)
+
+    def test_older_turns_are_summarized_deterministically(self):
+        history = make_history(50)
+        prompt = build_prompt("thanks", history=history, budget_tokens=400)
+        self.assertIn(SUMMARY_LEAD + "question number 0 about", prompt)
+        self.assertIn("User: question number 49 about shipping times and returns", prompt) # Newest turn kept verbatim
+        self.assertEqual(prompt, build_prompt("thanks", history=history, budget_tokens=400))
+
+    def test_oversized_latest_message_is_truncated_to_budget(self):
+        prompt = build_prompt("x" * 10000, budget_tokens=200)
+        self.assertLessEqual(estimate_tokens(prompt), 200)
+        self.assertTrue(prompt.endswith("...\nAssistant:"))
+
+    def test_default_budget_comes_from_the_config(self):
+        previous_config = config_module._config
+        set_config(AppConfig(environ={'GEMINI_PROMPT_TOKEN_BUDGET': '150'}))
+        try:
+            prompt = build_prompt("and what about refunds?", history=make_history(100))
+        finally:
+            set_config(previous_config)
+        self.assertLessEqual(estimate_tokens(prompt), 150)
+        self.assertGreater(estimate_tokens(build_prompt("and what about refunds?", history=make_history(100),
+                                                        budget_tokens=1024)), 150)
+
+
+if __name__ == '__main__':
+    unittest.main()
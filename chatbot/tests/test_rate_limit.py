@@ -0,0 +1,132 @@
+# chatbot/tests/test_rate_limit.py
+import unittest
+import csv
+import os
+import sys
+import tempfile
+
+# __file__ is /app/chatbot/tests/test_rate_limit.py -> REPO_ROOT is /app
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from chatbot.chatbot.core import config as config_module
+from chatbot.chatbot.core import rules_based_chatbot as core_chatbot
+from chatbot.chatbot.core.config import AppConfig
+from chatbot.chatbot.core.rate_limit import SharedTokenBucket, ChatRateLimiter
+from chatbot.chatbot.core.rules_based_chatbot import RulesBasedChatbot, EXPECTED_CSV_HEADERS, LLM_RATE_LIMITED_RESPONSE
+from chatbot.chatbot.web.app import create_app
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestSharedTokenBucket(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'turns.buckets')
+        self.clock = FakeClock()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_budget_is_shared_between_independent_mappings(self):
+        # Two instances over one file stand in for two worker processes.
+        worker_a = SharedTokenBucket(self.path, rate_per_second=1.0, burst=3, sets=64, clock=self.clock)
+        worker_b = SharedTokenBucket(self.path, rate_per_second=1.0, burst=3, sets=64, clock=self.clock)
+        self.assertEqual([worker_a.allow('ip:1'), worker_b.allow('ip:1'), worker_a.allow('ip:1')], [True, True, True])
+        self.assertFalse(worker_b.allow('ip:1'))
+        self.assertTrue(worker_b.allow('ip:2')) # Other clients keep their own budget
+
+        self.clock.now += 2
+        self.assertEqual([worker_b.allow('ip:1'), worker_a.allow('ip:1'), worker_a.allow('ip:1')], [True, True, False])
+        worker_a.close()
+        worker_b.close()
+
+    def test_full_set_reuses_the_longest_idle_bucket(self):
+        bucket = SharedTokenBucket(self.path, rate_per_second=0.001, burst=1, sets=1, clock=self.clock)
+        for client in range(4): # One set of 4 ways: every client lands in it
+            self.clock.now += 1
+            self.assertTrue(bucket.allow(f'ip:{client}'))
+        self.assertFalse(bucket.allow('ip:3'))
+        self.assertTrue(bucket.allow('ip:new')) # Takes over ip:0's slot
+        self.assertFalse(bucket.allow('ip:1'))
+        bucket.close()
+
+    def test_turn_and_llm_budgets_are_separate(self):
+        limiter = ChatRateLimiter(self.tmp_dir.name, turns_per_minute=60, turn_burst=5,
+                                  llm_calls_per_minute=60, llm_burst=1, sets=64, clock=self.clock)
+        self.assertTrue(limiter.allow_llm_call('ip:1'))
+        self.assertFalse(limiter.allow_llm_call('ip:1'))
+        self.assertTrue(all(limiter.allow_turn('ip:1') for _ in range(5)))
+        self.assertFalse(limiter.allow_turn('ip:1'))
+
+        unlimited = ChatRateLimiter(self.tmp_dir.name, turns_per_minute=0, llm_calls_per_minute=0)
+        self.assertTrue(all(unlimited.allow_turn('ip:1') for _ in range(100)))
+
+
+class TestChatRateLimiting(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.rules_csv_path = os.path.join(self.tmp_dir.name, 'rules.csv')
+        with open(self.rules_csv_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(EXPECTED_CSV_HEADERS)
+            writer.writerow(['1', '', 'hello', 'Hi there!', '', ''])
+        self.previous_config = config_module._config
+        # The web tests chat with an engine over the temporary rules, never the project's data directory.
+        core_chatbot._chatbot_instance = RulesBasedChatbot(rules_csv_path=self.rules_csv_path, llm_fallback=lambda prompt: 'LLM')
+
+    def tearDown(self):
+        core_chatbot._chatbot_instance = None
+        config_module.set_config(self.previous_config)
+        self.tmp_dir.cleanup()
+
+    def make_client(self, **settings):
+        environ = {'FLASK_SECRET_KEY': 'test-secret', 'CHATBOT_STARTUP_REPORT': '0', 'CHATBOT_RATE_LIMIT_TURNS': '1',
+                   'CHATBOT_RATE_LIMIT_TURN_BURST': '2', 'CHATBOT_RATE_LIMIT_DIR': self.tmp_dir.name,
+                   'CHATBOT_TRANSCRIPTS': '0'}
+        environ.update(settings)
+        return create_app(AppConfig(environ=environ)).test_client()
+
+    def test_llm_gate_is_asked_only_before_a_gemini_call(self):
+        llm_calls = []
+        chatbot = RulesBasedChatbot(rules_csv_path=self.rules_csv_path, llm_fallback=llm_calls.append)
+        gate_checks = []
+        def llm_allowed():
+            gate_checks.append(1)
+            return False
+        self.assertEqual(chatbot.get_response('hello', {}, llm_allowed), 'Hi there!')
+        self.assertEqual(gate_checks, [])
+        self.assertEqual(chatbot.get_response('something unknown', {}, llm_allowed), LLM_RATE_LIMITED_RESPONSE)
+        self.assertEqual(gate_checks, [1])
+        self.assertEqual(llm_calls, [])
+
+    def test_chat_endpoint_returns_429_once_the_turn_budget_is_spent(self):
+        client = self.make_client()
+        statuses = [client.post('/', data={'message': 'hello'}, environ_base={'REMOTE_ADDR': '10.0.0.1'}).status_code
+                    for _ in range(3)]
+        self.assertEqual(statuses, [200, 200, 429])
+        other_client = client.post('/', data={'message': 'hello'}, environ_base={'REMOTE_ADDR': '10.0.0.2'})
+        self.assertEqual(other_client.status_code, 200)
+        self.assertEqual(client.get('/', environ_base={'REMOTE_ADDR': '10.0.0.1'}).status_code, 200) # Page views are free
+
+    def test_clients_behind_a_trusted_proxy_keep_separate_budgets(self):
+        client = self.make_client(CHATBOT_TRUSTED_PROXIES='1')
+        proxy = {'REMOTE_ADDR': '10.0.0.254'}
+        def post(forwarded_for):
+            return client.post('/', data={'message': 'hello'}, environ_base=proxy,
+                               headers={'X-Forwarded-For': forwarded_for}).status_code
+        self.assertEqual([post('203.0.113.1') for _ in range(3)], [200, 200, 429])
+        self.assertEqual(post('203.0.113.2'), 200) # Same proxy address, different client
+
+
+if __name__ == '__main__':
+    unittest.main()
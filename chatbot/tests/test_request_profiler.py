@@ -0,0 +1,98 @@
+# chatbot/tests/test_request_profiler.py
+import unittest
+import os
+import pstats
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+# __file__ is /app/chatbot/tests/test_request_profiler.py -> REPO_ROOT is /app
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from chatbot.chatbot.core.request_profiler import RequestProfiler
+
+
+def handle_chat_request():
+    return sum(i * i for i in range(2000))
+
+def lane_turn():
+    return sum(i * i for i in range(2000))
+
+
+class TestRequestProfiler(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.profiler = RequestProfiler(data_dir=self.tmp_dir.name, check_interval=0)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def run_requests(self, count):
+        for _ in range(count):
+            with self.profiler.profile_if_sampled():
+                handle_chat_request()
+
+    def test_inactive_profiler_collects_nothing(self):
+        self.run_requests(5)
+        self.assertIsNone(self.profiler.collect_dump())
+        self.assertFalse(self.profiler.status()['active'])
+
+    def test_sampled_requests_are_merged_into_a_pstats_dump(self):
+        self.profiler.start(duration_seconds=60, sample_rate=1.0, max_requests=3)
+        self.run_requests(5)
+        status = self.profiler.status()
+        self.assertTrue(status['active'])
+        self.assertEqual(status['profiled_requests'], 3) # Capped per worker
+
+        dump_path = os.path.join(self.tmp_dir.name, 'out.pstats')
+        with open(dump_path, 'wb') as f:
+            f.write(self.profiler.collect_dump())
+        profiled_functions = {name for _, _, name in pstats.Stats(dump_path).stats}
+        self.assertIn('handle_chat_request', profiled_functions)
+        self.assertIn('handle_chat_request', self.profiler.collect_summary())
+
+    def test_dumps_are_written_off_the_request_thread(self):
+        self.profiler.start(duration_seconds=60, sample_rate=1.0, max_requests=3)
+        written_on = []
+        flushed = threading.Event()
+        def flush():
+            written_on.append(threading.current_thread())
+            flushed.set()
+        with patch.object(self.profiler, 'flush', side_effect=flush):
+            self.run_requests(1)
+            self.assertTrue(flushed.wait(5))
+        self.assertNotIn(threading.current_thread(), written_on)
+        self.assertEqual(self.profiler.status()['profiled_requests'], 1) # status() writes what is still pending
+
+    def test_work_handed_to_another_thread_is_followed(self):
+        self.profiler.start(duration_seconds=60, sample_rate=1.0, max_requests=3)
+        self.assertIs(self.profiler.follow(lane_turn), lane_turn) # Not inside a sampled request
+        with self.profiler.profile_if_sampled():
+            with ThreadPoolExecutor(max_workers=1) as lane:
+                lane.submit(self.profiler.follow(lane_turn)).result()
+        profiled_functions = {name for _, _, name in self.profiler.collect().stats}
+        if sys.version_info < (3, 12): # Later interpreters allow one active profiler; the lane part is skipped
+            self.assertIn('lane_turn', profiled_functions)
+        self.assertEqual(self.profiler.status()['profiled_requests'], 1)
+
+    def test_window_switches_off_by_itself_and_on_stop(self):
+        window = self.profiler.start(duration_seconds=60, sample_rate=1.0, max_requests=100)
+        self.profiler.stop()
+        self.run_requests(2)
+        self.assertIsNone(self.profiler.collect_dump())
+
+        window = self.profiler.start(duration_seconds=1, sample_rate=1.0, max_requests=100)
+        time.sleep(max(0, window['until'] - time.time()) + 0.01)
+        self.run_requests(2)
+        self.assertFalse(self.profiler.status()['active'])
+        self.assertIsNone(self.profiler.collect_dump())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+# chatbot/tests/test_rule_analysis.py
+import unittest
+import os
+import sys
+import time
+
+# __file__ is /app/chatbot/tests/test_rule_analysis.py -> REPO_ROOT is /app
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from chatbot.chatbot.core.rule_analysis import analyze_rules, find_shadowed_rules
+from chatbot.chatbot.core.flat_rules import FlatRuleTable
+
+
+def make_rule(rule_id, context, pattern, response='', set_context=None, goto=None):
+    return {'Rule_ID': rule_id, 'Context_Required': context, 'Pattern': pattern, 'Response': response,
+            'Set_Context_On_Response': set_context, 'GoTo_Rule_ID': goto}
+
+
+class TestRuleAnalysis(unittest.TestCase):
+
+    def test_substring_and_wildcard_shadowing_is_per_context(self):
+        rules = [
+            make_rule('help', None, 'help', 'General help.'),
+            make_rule('billing', None, 'help with billing', 'Billing help.'),
+            make_rule('ctx_billing', 'support', 'help with billing', 'Contextual billing help.'),
+            make_rule('any', 'support', '*', 'Anything in support.'),
+            make_rule('after_any', 'support', 'refund', 'Never chosen.'),
+        ]
+        self.assertEqual(find_shadowed_rules(rules), {1: 0, 4: 3})
+
+    def test_keyword_set_shadowing(self):
+        rules = [
+            make_rule('refund_order', None, 'order + refund', 'Refunds take 5 days.'),
+            make_rule('refund_order_late', None, 'late + refund + order', 'Never chosen.'),
+            make_rule('ship', None, 'ship', 'We ship worldwide.'),
+            make_rule('shipping_cost', None, 'cost + shipping', 'Never chosen: every "shipping" contains "ship".'),
+            make_rule('refund', None, 'refund', 'Still reachable: "refund" alone lacks "order".'),
+        ]
+        self.assertEqual(find_shadowed_rules(rules), {1: 0, 3: 2})
+
+    def test_unreachable_contexts_orphans_and_dead_rules(self):
+        rules = [
+            make_rule('1', None, 'hello', 'Hi!', 'greeted', 'CHAIN'),
+            make_rule('CHAIN', 'nowhere', '', 'Chained reply.', 'chained'),
+            make_rule('2', 'chained', 'more', 'Reachable via a context set in a GoTo chain.'),
+            make_rule('3', 'nowhere', 'lost', 'Gated on a context nothing sets.'),
+            make_rule('4', None, 'jump', 'Jumps nowhere.', None, 'MISSING'),
+            make_rule('5', 'greeted', '', 'GoTo-only rule nobody targets.'),
+        ]
+        analysis = analyze_rules(rules)
+        self.assertEqual([e['Rule_ID'] for e in analysis['unreachable_contexts']], ['3'])
+        self.assertEqual(analysis['orphaned_gotos'], [{'Rule_ID': '4', 'GoTo_Rule_ID': 'MISSING'}])
+        self.assertEqual(analysis['dead_rule_ids'], ['3', '5'])
+        self.assertEqual(analysis['excluded_from_matching'], {3})
+        self.assertEqual(analysis['reachable_contexts'], ['chained', 'greeted'])
+
+    def test_excluded_rules_leave_match_path_but_stay_addressable(self):
+        rules = [
+            make_rule('help', None, 'help', 'General help.'),
+            make_rule('billing', None, 'help with billing', 'Billing help.'),
+        ]
+        analysis = analyze_rules(rules)
+        table = FlatRuleTable(rules, excluded_indices=analysis['excluded_from_matching'])
+        self.assertEqual(table.matchable_count, 1)
+        self.assertEqual(table.find('help with billing', None)['Rule_ID'], 'help')
+        self.assertEqual(table.get('billing')['Response'], 'Billing help.')
+
+    def test_large_rule_set_analysis_is_fast(self):
+        rules = [make_rule(str(i), None, f"topic{i} question{i % 97}", 'x') for i in range(100000)]
+        start = time.perf_counter()
+        analysis = analyze_rules(rules)
+        self.assertLess(time.perf_counter() - start, 30.0)
+        self.assertEqual(analysis['shadowed'], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+# chatbot/tests/test_rule_version.py
+import unittest
+import csv
+import os
+import sys
+import tempfile
+
+# The app imports modules as chatbot.chatbot.*, so the repository root must be on sys.path.
+# __file__ is /app/chatbot/tests/test_rule_version.py -> REPO_ROOT is /app
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from chatbot.chatbot.core.rules_based_chatbot import RulesBasedChatbot, EXPECTED_CSV_HEADERS
+from chatbot.chatbot.core.rule_version import RuleVersionStamp
+
+
+def write_rules_csv(path, rows):
+    """Writes rows of (Rule_ID, Context_Required, Pattern, Response, Set_Context_On_Response, GoTo_Rule_ID)."""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(EXPECTED_CSV_HEADERS)
+        writer.writerows(rows)
+
+
+class TestRuleVersionPropagation(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.rules_path = os.path.join(self.tmp_dir.name, 'rules.csv')
+        write_rules_csv(self.rules_path, [['1', '', 'hello', 'Hi!', '', '']])
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_stamp_starts_unpublished(self):
+        stamp = RuleVersionStamp(self.rules_path)
+        self.assertIsNone(stamp.signature())
+        self.assertEqual(stamp.read(), 0)
+
+    def test_bump_increments_and_changes_signature(self):
+        stamp = RuleVersionStamp(self.rules_path)
+        self.assertEqual(stamp.bump(), 1)
+        first_signature = stamp.signature()
+        self.assertEqual(stamp.bump(), 2)
+        self.assertNotEqual(stamp.signature(), first_signature)
+
+    def test_refresh_is_noop_without_publish(self):
+        bot = RulesBasedChatbot(rules_csv_path=self.rules_path)
+        self.assertFalse(bot.refresh_if_stale())
+
+    def test_other_worker_picks_up_published_rules(self):
+        # Two instances stand in for two worker processes sharing the same rules file.
+        publishing_worker = RulesBasedChatbot(rules_csv_path=self.rules_path)
+        other_worker = RulesBasedChatbot(rules_csv_path=self.rules_path)
+
+        write_rules_csv(self.rules_path, [['1', '', 'hello', 'Hi!', '', ''], ['2', '', 'bye', 'Bye!', '', '']])
+        publishing_worker.publish_rules_update()
+
+        self.assertEqual(len(publishing_worker.rules_list), 2)
+        self.assertEqual(len(other_worker.rules_list), 1) # Stale until its next request
+        self.assertTrue(other_worker.refresh_if_stale())
+        self.assertEqual(len(other_worker.rules_list), 2)
+        self.assertEqual(other_worker.rules_version, 1)
+        self.assertFalse(other_worker.refresh_if_stale())
+        self.assertFalse(publishing_worker.refresh_if_stale())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+# chatbot/tests/test_rules_regression.py
+import unittest
+import csv
+import json
+import os
+import sys
+import tempfile
+from unittest.mock import patch
+
+# __file__ is /app/chatbot/tests/test_rules_regression.py -> REPO_ROOT is /app
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from chatbot.chatbot.core import rules_based_chatbot as core_chatbot
+from chatbot.chatbot.core import config as config_module
+from chatbot.chatbot.core.config import AppConfig
+from chatbot.chatbot.core.rules_based_chatbot import RulesBasedChatbot, EXPECTED_CSV_HEADERS
+from chatbot.chatbot.admin.rules_regression import run_regression, load_cases, publish_candidate, LLM_FALLBACK_MARKER
+from chatbot.chatbot.web import admin_views
+from chatbot.chatbot.web.app import create_app
+
+LIVE_RULES = [
+    ['1', '', 'hello', 'Hi there!', 'greeted', ''],
+    ['2', 'greeted', 'joke', 'Why did the scarecrow win an award?', '', ''],
+    ['3', '', 'hours', 'We open at 9.', '', ''],
+]
+CANDIDATE_RULES = [
+    ['1', '', 'hello', 'Hello!', 'greeted', ''],          # Breaks the greeting case
+    ['2', 'greeted', 'joke', 'Why did the scarecrow win an award?', '', ''],
+    ['3', '', 'hours', 'We open at 9.', '', ''],
+    ['4', '', 'refund', 'Refunds take 5 days.', '', ''],  # Fixes the refund case
+]
+CASES = [
+    {'name': 'greeting', 'turns': [{'input': 'hello', 'expect': 'Hi there!'}]},
+    {'name': 'joke', 'turns': [{'input': 'hello'}, {'input': 'tell me a joke', 'expect': 'Why did the scarecrow win an award?'}]},
+    {'name': 'refund', 'turns': [{'input': 'I want a refund', 'expect': 'Refunds take 5 days.'}]},
+    {'name': 'unknown', 'turns': [{'input': 'what is the weather', 'expect': LLM_FALLBACK_MARKER}]},
+    {'name': 'started in context', 'context': 'greeted', 'turns': [{'input': 'joke', 'expect': 'Why did the scarecrow win an award?'}]},
+]
+
+
+class TestRulesRegression(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.live_path = self.write_rules('rules.csv', LIVE_RULES)
+        self.candidate_path = self.write_rules('candidate.csv', CANDIDATE_RULES)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write_rules(self, name, rows):
+        path = os.path.join(self.tmp_dir.name, name)
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(EXPECTED_CSV_HEADERS)
+            writer.writerows(rows)
+        return path
+
+    def test_cases_are_classified_against_the_live_rules(self):
+        report = run_regression(self.candidate_path, CASES, live_csv_path=self.live_path, workers=1)
+        self.assertEqual([entry['name'] for entry in report['regressions']], ['greeting'])
+        self.assertEqual(report['regressions'][0]['candidate'], 'Hello!')
+        self.assertEqual(report['regressions'][0]['live'], 'Hi there!')
+        self.assertEqual([entry['name'] for entry in report['fixed']], ['refund'])
+        self.assertEqual(report['candidate_passed'], 4)
+        self.assertEqual(report['live_passed'], 4)
+        # 'joke' passes on both, but its unchecked first turn answers differently.
+        self.assertEqual([entry['name'] for entry in report['changed']], ['joke'])
+
+    def test_process_pool_gives_the_same_report(self):
+        serial = run_regression(self.candidate_path, CASES, live_csv_path=self.live_path, workers=1)
+        parallel = run_regression(self.candidate_path, CASES, live_csv_path=self.live_path, workers=2)
+        self.assertEqual(parallel['workers'], 2)
+        for section in ('regressions', 'fixed', 'still_failing', 'changed'):
+            self.assertEqual(parallel[section], serial[section])
+
+    def test_load_cases_and_publish(self):
+        cases_path = os.path.join(self.tmp_dir.name, 'cases.jsonl')
+        with open(cases_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(json.dumps(case) for case in CASES) + '\n\n')
+        self.assertEqual(load_cases(cases_path), CASES)
+        with open(cases_path, 'a', encoding='utf-8') as f:
+            f.write('{"name": "broken", "turns": []}\n')
+        with self.assertRaises(ValueError):
+            load_cases(cases_path)
+
+        self.assertEqual(publish_candidate(self.candidate_path, self.live_path), 1)
+        report = run_regression(self.candidate_path, CASES, live_csv_path=self.live_path, workers=1)
+        self.assertEqual(report['regressions'], [])
+
+
+
+class TestRegressionGateInAdmin(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.rules_path = os.path.join(self.tmp_dir.name, 'rules.csv')
+        with open(self.rules_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(EXPECTED_CSV_HEADERS)
+            writer.writerows(LIVE_RULES)
+        cases_path = os.path.join(self.tmp_dir.name, 'cases.jsonl')
+        with open(cases_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'name': 'greeting', 'turns': [{'input': 'hello', 'expect': 'Hi there!'}]}) + '\n')
+        self.patches = [patch.object(admin_views, 'RULES_CSV_FILE_PATH', self.rules_path),
+                        patch.object(admin_views, 'REGRESSION_CASES_PATH', cases_path),
+                        patch.object(admin_views, 'UPLOAD_FOLDER', self.tmp_dir.name)]
+        for active_patch in self.patches:
+            active_patch.start()
+        self.previous_config = config_module._config
+        core_chatbot._chatbot_instance = RulesBasedChatbot(rules_csv_path=self.rules_path, llm_fallback=_llm_marker)
+        self.client = create_app(AppConfig(environ={'FLASK_SECRET_KEY': 'test-secret', 'ADMIN_USERNAME': 'admin',
+                                                    'ADMIN_PASSWORD': 'pw', 'CHATBOT_STARTUP_REPORT': '0'})).test_client()
+        self.client.post('/admin/login', data={'username': 'admin', 'password': 'pw'})
+
+    def tearDown(self):
+        for active_patch in self.patches:
+            active_patch.stop()
+        core_chatbot._chatbot_instance = None
+        config_module.set_config(self.previous_config)
+        self.tmp_dir.cleanup()
+
+    def live_rule_ids(self):
+        with open(self.rules_path, 'r', newline='', encoding='utf-8') as f:
+            return [row['Rule_ID'] for row in csv.DictReader(f)]
+
+    def test_edits_and_deletes_are_gated(self):
+        with patch('chatbot.chatbot.admin.rules_regression.ProcessPoolExecutor') as pool:
+            self.client.post('/admin/rules/delete/1') # The greeting case needs rule 1
+            self.assertEqual(self.live_rule_ids(), ['1', '2', '3'])
+            self.client.post('/admin/rules', data={'rule_id': '1', 'pattern': 'hello', 'response': 'Hello!'})
+            self.assertEqual(core_chatbot._chatbot_instance.get_response('hello', {}), 'Hi there!')
+
+            self.client.post('/admin/rules/delete/3') # No case depends on rule 3
+            self.client.post('/admin/rules', data={'rule_id': '4', 'pattern': 'refund', 'response': 'Refunds take 5 days.'})
+            self.assertEqual(self.live_rule_ids(), ['1', '2', '4'])
+        pool.assert_not_called() # The gate replays in the web worker's own process
+
+def _llm_marker(prompt):
+    return LLM_FALLBACK_MARKER
+
+
+if __name__ == '__main__':
+    unittest.main()
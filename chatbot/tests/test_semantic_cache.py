@@ -0,0 +1,155 @@
+# chatbot/tests/test_semantic_cache.py
+import unittest
+import csv
+import os
+import sys
+import tempfile
+import time
+
+# __file__ is /app/chatbot/tests/test_semantic_cache.py -> REPO_ROOT is /app
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from chatbot.chatbot.integrations.semantic_cache import (SemanticAnswerCache, embed, question_terms, same_question,
+                                                          semantic_cache_available, matrix_bytes)
+from chatbot.chatbot.core import config as config_module
+from chatbot.chatbot.core.config import AppConfig, set_config
+from chatbot.chatbot.core.rules_based_chatbot import RulesBasedChatbot, EXPECTED_CSV_HEADERS
+
+QUESTIONS = {
+    "What time do you open?": "We open at 9am.",
+    "How much is shipping?": "Shipping is $5.",
+    "Where is your store located?": "We are at 1 Main Street.",
+    "Can I return an item?": "Returns are accepted within 30 days.",
+    "What payment methods do you accept?": "Cards and PayPal.",
+}
+
+
+@unittest.skipUnless(semantic_cache_available(), "NumPy is not installed")
+class TestSemanticAnswerCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = SemanticAnswerCache(capacity=100, threshold=0.7)
+        for question, answer in QUESTIONS.items():
+            self.cache.add(question, answer)
+
+    def test_paraphrases_hit_and_unrelated_questions_miss(self):
+        self.assertEqual(self.cache.lookup("when are you open"), "We open at 9am.")
+        self.assertEqual(self.cache.lookup("What are your opening hours?"), "We open at 9am.")
+        self.assertEqual(self.cache.lookup("how much does shipping cost"), "Shipping is $5.")
+        self.assertEqual(self.cache.lookup("Where are you located?"), "We are at 1 Main Street.")
+        self.assertEqual(self.cache.lookup("can I return items"), "Returns are accepted within 30 days.")
+        self.assertEqual(self.cache.lookup("which payment methods are accepted"), "Cards and PayPal.")
+        self.assertIsNone(self.cache.lookup("What is the weather today?"))
+        self.assertIsNone(self.cache.lookup("is it?")) # Only stopwords: no embedding, never a hit
+        self.assertEqual((self.cache.hits, self.cache.misses), (6, 1))
+
+    def test_similar_but_different_questions_miss(self):
+        cache = SemanticAnswerCache(capacity=100, threshold=0.5)
+        for question in ("are you open on monday", "is the store open", "do you ship to canada", "red shirt price",
+                         "do you ship"):
+            cache.add(question, "answer to " + question)
+        for question in ("are you open on sunday", "is the store not open", "do you ship to mexico",
+                         "blue shirt price", "I don't want it shipped"):
+            with self.subTest(question=question):
+                self.assertIsNone(cache.lookup(question))
+        # The vectors alone are close enough to pass the threshold; the term guard is what refuses them.
+        for first, second in (("are you open on monday", "are you open on sunday"),
+                              ("is the store open", "is the store not open")):
+            self.assertGreater(float(embed(first) @ embed(second)), 0.5)
+            self.assertFalse(same_question(question_terms(first), question_terms(second)))
+
+    def test_search_ranks_by_similarity(self):
+        results = self.cache.search("which payment methods are accepted", k=2)
+        self.assertEqual(results[0][1], "what payment methods do you accept")
+        self.assertGreater(results[0][0], results[1][0])
+        self.assertAlmostEqual(float(embed("anything at all") @ embed("anything at all")), 1.0, places=5)
+
+    def test_full_cache_evicts_least_recently_used(self):
+        clock = iter(range(100)).__next__
+        cache = SemanticAnswerCache(capacity=2, threshold=0.9, clock=clock)
+        cache.add("opening hours", "9 to 5")
+        cache.add("shipping cost", "$5")
+        cache.lookup("opening hours") # Now more recent than "shipping cost"
+        cache.add("return policy", "30 days")
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.lookup("opening hours"), "9 to 5")
+        self.assertEqual(cache.lookup("return policy"), "30 days")
+        self.assertIsNone(cache.lookup("shipping cost"))
+
+    def test_lookup_stays_under_a_millisecond_when_full(self):
+        cache = SemanticAnswerCache(capacity=2000)
+        for i in range(2000):
+            cache.add(f"question {i} about product {i * 7} and order {i * 13}", f"answer {i}")
+        cache.lookup("question 1500 about product 10500 and order 19500") # Warm-up
+        started = time.perf_counter()
+        for _ in range(50):
+            cache.lookup("question 1500 about product 10500 and order 19500")
+        self.assertLess((time.perf_counter() - started) / 50, 0.001)
+
+
+@unittest.skipUnless(semantic_cache_available(), "NumPy is not installed")
+class TestSemanticCacheInChatbot(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.rules_csv_path = os.path.join(self.tmp_dir.name, 'rules.csv')
+        with open(self.rules_csv_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(EXPECTED_CSV_HEADERS)
+            writer.writerow(['1', '', 'hello', 'Hi!', 'greeted', ''])
+        self.llm_calls = []
+        self.previous_config = config_module._config
+        set_config(AppConfig(environ={})) # Default settings: the semantic cache is on
+
+    def tearDown(self):
+        set_config(self.previous_config)
+        self.tmp_dir.cleanup()
+
+    def fake_llm(self, prompt):
+        self.llm_calls.append(prompt)
+        return "Shipping is $5." if len(self.llm_calls) == 1 else "Gemini API Error: Project quota exceeded."
+
+    def test_paraphrased_fallback_reuses_the_gemini_answer(self):
+        chatbot = RulesBasedChatbot(rules_csv_path=self.rules_csv_path, llm_fallback=self.fake_llm)
+        self.assertEqual(chatbot.get_response("How much is shipping?", {}), "Shipping is $5.")
+        self.assertEqual(chatbot.get_response("how much does shipping cost", {}), "Shipping is $5.")
+        self.assertEqual(len(self.llm_calls), 1)
+        self.assertFalse(chatbot.explain("how much does shipping cost", None)['calls_llm'])
+
+        # Turns inside a context neither read nor feed the cache; Gemini errors are never stored.
+        session = {}
+        chatbot.get_response("hello", session)
+        self.assertEqual(chatbot.get_response("how much is shipping", session),
+                         "Gemini API Error: Project quota exceeded.")
+        chatbot.get_response("what is the weather today", {})
+        self.assertEqual(len(chatbot.semantic_cache), 1)
+
+    def test_turns_with_history_neither_read_nor_feed_the_cache(self):
+        chatbot = RulesBasedChatbot(rules_csv_path=self.rules_csv_path, llm_fallback=lambda prompt: "About that order...")
+        session = {}
+        chatbot.get_response("hello", session)
+        chatbot.get_response("tell me more about it", session) # Answered from this conversation's history
+        self.assertEqual(len(chatbot.semantic_cache), 0)
+        chatbot.semantic_cache.add("tell me more", "Another user's answer.")
+        self.assertEqual(chatbot.get_response("tell me more", session), "About that order...")
+
+    def test_cache_is_built_on_first_use_in_each_process(self):
+        chatbot = RulesBasedChatbot(rules_csv_path=self.rules_csv_path, llm_fallback=self.fake_llm)
+        self.assertIsNone(chatbot._semantic_cache) # Not built by the constructor (or a pre-fork preload)
+        self.assertGreaterEqual(chatbot.resident_bytes() - chatbot.memory_bytes(), matrix_bytes(2000))
+        chatbot.get_response("How much is shipping?", {})
+        built = chatbot._semantic_cache
+        self.assertEqual(len(built), 1)
+        chatbot._semantic_cache_pid = -1 # As in a worker forked after it was built
+        self.assertIsNot(chatbot.semantic_cache, built)
+        self.assertEqual(len(chatbot.semantic_cache), 0)
+
+    def test_isolated_engines_have_no_semantic_cache(self):
+        chatbot = RulesBasedChatbot(rules_csv_path=self.rules_csv_path, llm_fallback=self.fake_llm, isolated=True)
+        self.assertIsNone(chatbot.semantic_cache)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+# chatbot/tests/test_session_store.py
+import unittest
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+# __file__ is /app/chatbot/tests/test_session_store.py -> REPO_ROOT is /app
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from chatbot.chatbot.core.session_store import SessionStore, SqliteSessionBackend
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestSessionStore(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def test_mapping_supports_chatbot_session_calls(self):
+        store = SessionStore(clock=self.clock)
+        conversation = store.session_for('abc')
+        self.assertIsNone(conversation.get('chatbot_context'))
+        conversation['chatbot_context'] = 'greeted'
+        conversation.commit()
+        self.assertEqual(store.session_for('abc').get('chatbot_context'), 'greeted')
+        self.assertEqual(conversation.pop('chatbot_context', None), 'greeted')
+        self.assertIsNone(conversation.pop('chatbot_context', None))
+
+    def test_entries_expire_after_ttl_from_last_access(self):
+        store = SessionStore(ttl_seconds=10, clock=self.clock)
+        store.save('abc', {'chatbot_context': 'greeted'})
+        self.clock.now += 8
+        self.assertIsNotNone(store.get('abc')) # Access refreshes the TTL
+        self.clock.now += 8
+        self.assertIsNotNone(store.get('abc'))
+        self.clock.now += 11
+        self.assertIsNone(store.get('abc'))
+
+    def test_least_recently_used_session_is_evicted(self):
+        store = SessionStore(max_sessions=2, clock=self.clock)
+        store.save('a', {})
+        store.save('b', {})
+        store.get('a')
+        store.save('c', {})
+        self.assertEqual(len(store), 2)
+        self.assertIsNone(store.get('b'))
+        self.assertIsNotNone(store.get('a'))
+
+    def test_persistent_backend_survives_new_store(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_path = os.path.join(tmp_dir, 'sessions.db')
+            store = SessionStore(backend=SqliteSessionBackend(db_path), clock=self.clock)
+            conversation = store.session_for('abc')
+            conversation['chatbot_context'] = 'greeted'
+            conversation.commit()
+
+            restarted_store = SessionStore(backend=SqliteSessionBackend(db_path), clock=self.clock)
+            self.assertEqual(restarted_store.get('abc'), {'chatbot_context': 'greeted'})
+            restarted_store.delete('abc')
+            self.assertIsNone(SessionStore(backend=SqliteSessionBackend(db_path)).get('abc'))
+
+    def test_a_turn_is_saved_once(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            backend = SqliteSessionBackend(os.path.join(tmp_dir, 'sessions.db'))
+            store = SessionStore(backend=backend, clock=self.clock)
+            conversation = store.session_for('abc')
+            conversation['chatbot_context'] = 'greeted'
+            conversation['chatbot_history'] = [{'role': 'user', 'text': 'hello'}]
+            conversation.pop('chatbot_context')
+            self.assertIsNone(backend.version('abc', time.time())) # Nothing written mid-turn
+            conversation.commit()
+            conversation.commit() # Nothing changed since: no second write
+            self.assertEqual(backend.version('abc', time.time()), 1)
+
+    def test_cached_copy_is_not_served_once_another_worker_saved(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_path = os.path.join(tmp_dir, 'sessions.db')
+            worker_a = SessionStore(backend=SqliteSessionBackend(db_path), clock=self.clock)
+            worker_b = SessionStore(backend=SqliteSessionBackend(db_path), clock=self.clock)
+            worker_a.save('abc', {'chatbot_context': 'greeted'})
+            self.assertEqual(worker_b.get('abc'), {'chatbot_context': 'greeted'})
+            worker_a.save('abc', {'chatbot_context': 'ordering'}) # The next turn went to the other worker
+            self.assertEqual(worker_b.get('abc'), {'chatbot_context': 'ordering'})
+            cached = worker_b.get('abc')
+            self.assertIs(worker_b.get('abc'), cached) # Unchanged version: the cached dict, no reload
+            worker_a.delete('abc')
+            self.assertIsNone(worker_b.get('abc'))
+
+    def test_database_without_versions_is_upgraded(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_path = os.path.join(tmp_dir, 'sessions.db')
+            conn = sqlite3.connect(db_path)
+            conn.execute('CREATE TABLE sessions (sid TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at REAL NOT NULL)')
+            conn.execute('INSERT INTO sessions VALUES (?, ?, ?)', ('abc', '{"chatbot_context": "greeted"}', time.time() + 60))
+            conn.commit()
+            conn.close()
+            store = SessionStore(backend=SqliteSessionBackend(db_path), clock=self.clock)
+            self.assertEqual(store.get('abc'), {'chatbot_context': 'greeted'})
+            store.save('abc', {})
+            self.assertEqual(store.backend.version('abc', time.time()), 1)
+
+if __name__ == '__main__':
+    unittest.main()
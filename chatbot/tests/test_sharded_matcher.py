@@ -0,0 +1,131 @@
+# chatbot/tests/test_sharded_matcher.py
+import unittest
+import csv
+import multiprocessing
+import os
+import sys
+import tempfile
+
+# __file__ is /app/chatbot/tests/test_sharded_matcher.py -> REPO_ROOT is /app
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from chatbot.chatbot.core import config as config_module
+from chatbot.chatbot.core.config import AppConfig, set_config
+from chatbot.chatbot.core.flat_rules import FlatRuleTable
+from chatbot.chatbot.core.sharded_matcher import ShardedRuleMatcher
+from chatbot.chatbot.core.rules_based_chatbot import RulesBasedChatbot, EXPECTED_CSV_HEADERS
+
+
+def make_rule(rule_id, context, pattern):
+    return {'Rule_ID': rule_id, 'Context_Required': context, 'Pattern': pattern, 'Response': f'R{rule_id}',
+            'Set_Context_On_Response': None, 'GoTo_Rule_ID': None}
+
+RULES = [
+    make_rule('1', None, 'hello'),
+    make_rule('2', 'greeted', 'joke'),
+    make_rule('3', None, 'refund + order'),
+    make_rule('4', None, 'order'),
+    make_rule('5', 'greeted', 'order'),
+    make_rule('6', None, 'hello there'), # Excluded below, as the loader's analysis would
+    make_rule('7', 'greeted', '*'),
+    make_rule('8', None, 'joke'),
+    make_rule('9', 'billing', 'refund'),
+    make_rule('10', None, 'bye'),
+]
+EXCLUDED = frozenset([5])
+QUERIES = [('hello there', None), ('tell me a joke', 'greeted'), ('tell me a joke', None), ('my order refund', None),
+           ('my order', 'greeted'), ('anything', 'greeted'), ('refund', 'billing'), ('refund', None), ('bye', 'billing'),
+           ('nothing here', None)]
+
+
+class TestShardedRuleMatcher(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.matcher = ShardedRuleMatcher(RULES, excluded_indices=EXCLUDED, shards=3, channels=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.matcher.close()
+
+    def test_merged_shard_results_keep_global_first_match_priority(self):
+        flat = FlatRuleTable(RULES, excluded_indices=EXCLUDED)
+        for text, context in QUERIES:
+            with self.subTest(text=text, context=context):
+                self.assertEqual(self.matcher.find_index(text, context), flat.find_index(text, context))
+        self.assertEqual(self.matcher.matchable_count, flat.matchable_count)
+        self.assertEqual(self.matcher.get('8')['Response'], 'R8')
+        # The context pass wins even though the general rule '4' (another shard) comes first in the CSV.
+        self.assertEqual(self.matcher.find('my order', 'greeted')['Rule_ID'], '5')
+
+    def test_dead_shard_falls_back_to_in_process_matching(self):
+        matcher = ShardedRuleMatcher(RULES, excluded_indices=EXCLUDED, shards=2, channels=1)
+        self.assertEqual(matcher._processes, []) # Nothing starts until the first query
+        matcher.find_index('hello', None)
+        matcher._processes[1].terminate()
+        matcher._processes[1].join()
+        flat = FlatRuleTable(RULES, excluded_indices=EXCLUDED)
+        for text, context in QUERIES:
+            self.assertEqual(matcher.find_index(text, context), flat.find_index(text, context))
+        matcher.close()
+
+    def test_forked_processes_start_their_own_shards(self):
+        # As with gunicorn preload: the matcher is built (and here even used) before the fork.
+        matcher = ShardedRuleMatcher(RULES, excluded_indices=EXCLUDED, shards=2, channels=2)
+        matcher.find_index('hello', None)
+        parent_processes = list(matcher._processes)
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        children = [context.Process(target=_query_in_child, args=(matcher, results)) for _ in range(2)]
+        for child in children:
+            child.start()
+        outcomes = [results.get(timeout=120) for _ in children]
+        for child in children:
+            child.join()
+        self.assertEqual(outcomes, [(0, False)] * 2)
+        self.assertEqual(matcher._processes, parent_processes)
+        self.assertEqual(matcher.find_index('bye', None), 9)
+        matcher.close()
+
+def _query_in_child(matcher, results):
+    flat = FlatRuleTable(RULES, excluded_indices=EXCLUDED)
+    mismatches = sum(1 for _ in range(50) for text, context in QUERIES
+                     if matcher.find_index(text, context) != flat.find_index(text, context))
+    results.put((mismatches, matcher._failed))
+    matcher.close()
+
+
+class TestShardedChatbot(unittest.TestCase):
+
+    def setUp(self):
+        self.previous_config = config_module._config
+        set_config(AppConfig(environ={'CHATBOT_MATCH_SHARDS': '2', 'CHATBOT_MATCH_SHARD_MIN_RULES': '1',
+                                      'CHATBOT_MATCH_SHARD_CHANNELS': '1'}))
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.rules_csv_path = os.path.join(self.tmp_dir.name, 'rules.csv')
+        with open(self.rules_csv_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(EXPECTED_CSV_HEADERS)
+            writer.writerow(['1', '', 'hello', 'Hi there!', 'greeted', ''])
+            writer.writerow(['2', 'greeted', 'joke', 'Why did the scarecrow win an award?', '', 'PUNCH'])
+            writer.writerow(['PUNCH', 'joke_pending', '', 'Because he was outstanding in his field!', '', ''])
+
+    def tearDown(self):
+        self.chatbot._compiled.close()
+        set_config(self.previous_config)
+        self.tmp_dir.cleanup()
+
+    def test_chatbot_uses_the_sharded_backend_as_a_drop_in(self):
+        self.chatbot = RulesBasedChatbot(rules_csv_path=self.rules_csv_path, llm_fallback=lambda prompt: 'LLM')
+        self.assertIsInstance(self.chatbot._compiled, ShardedRuleMatcher)
+        session = {}
+        self.assertEqual(self.chatbot.get_response('hello', session), 'Hi there!')
+        self.assertEqual(self.chatbot.get_response('tell me a joke', session),
+                         "Why did the scarecrow win an award?\\nBecause he was outstanding in his field!")
+        self.assertEqual(self.chatbot.explain('hello', None)['matched_rule']['Rule_ID'], '1')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+# chatbot/tests/test_tenants.py
+import unittest
+import csv
+import json
+import os
+import sys
+import tempfile
+from unittest.mock import patch
+
+# __file__ is /app/chatbot/tests/test_tenants.py -> REPO_ROOT is /app
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from chatbot.chatbot.core import tenants
+from chatbot.chatbot.core.flat_rules import FlatRuleTable
+from chatbot.chatbot.core.tenants import TenantRegistry, tenant_id_from_host, is_valid_tenant_id
+from chatbot.chatbot.core.rules_based_chatbot import RulesBasedChatbot, EXPECTED_CSV_HEADERS
+
+
+class TestTenantRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.tenants_dir_patch = patch.object(tenants, 'TENANTS_DIR', self.tmp_dir.name)
+        self.tenants_dir_patch.start()
+        for tenant_id, greeting in [('acme', 'Welcome to Acme!'), ('globex', 'Globex here.'), ('initech', 'Initech, hi.')]:
+            os.makedirs(tenants.tenant_dir(tenant_id))
+            with open(tenants.tenant_rules_csv_path(tenant_id), 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(EXPECTED_CSV_HEADERS)
+                writer.writerow(['1', '', 'hello', greeting, '', ''])
+        self.loaded = []
+
+    def tearDown(self):
+        self.tenants_dir_patch.stop()
+        self.tmp_dir.cleanup()
+
+    def load(self, tenant_id):
+        self.loaded.append(tenant_id)
+        return RulesBasedChatbot(rules_csv_path=tenants.tenant_rules_csv_path(tenant_id), llm_fallback=lambda prompt: "LLM")
+
+    def test_tenants_are_loaded_lazily_and_isolated(self):
+        registry = TenantRegistry(self.load, max_tenants=10)
+        self.assertEqual(self.loaded, [])
+        self.assertEqual(registry.get('acme').get_response('hello', {}), 'Welcome to Acme!')
+        self.assertEqual(registry.get('globex').get_response('hello', {}), 'Globex here.')
+        self.assertIs(registry.get('acme'), registry.get('acme'))
+        self.assertEqual(self.loaded, ['acme', 'globex'])
+
+    def test_least_recently_used_tenant_is_evicted_and_reloaded_on_demand(self):
+        registry = TenantRegistry(self.load, max_tenants=2)
+        registry.get('acme')
+        registry.get('globex')
+        registry.get('acme') # globex is now least recently used
+        globex = registry.resident_instances()[0]
+        with patch.object(RulesBasedChatbot, 'release', autospec=True) as release:
+            registry.get('initech')
+        release.assert_called_once_with(globex) # Its shard processes (if any) are retired
+        self.assertEqual(registry.resident_tenants(), ['acme', 'initech'])
+        self.assertEqual(registry.get('globex').get_response('hello', {}), 'Globex here.')
+        self.assertEqual(self.loaded, ['acme', 'globex', 'initech', 'globex'])
+        self.assertEqual(registry.stats()['evictions'], 2)
+
+    def test_memory_bound_keeps_at_least_the_tenant_being_served(self):
+        registry = TenantRegistry(self.load, max_tenants=10, max_bytes=1)
+        registry.get('acme')
+        registry.get('globex')
+        self.assertEqual(registry.resident_tenants(), ['globex'])
+        self.assertGreater(registry.stats()['bytes'], 1)
+
+    def test_size_is_measured_per_load_and_includes_the_answer_caches(self):
+        with open(os.path.join(tenants.tenant_dir('acme'), 'answer_cache.json'), 'w', encoding='utf-8') as f:
+            json.dump({'what are your hours': {'answer': 'Nine to five. ' * 20}}, f)
+        registry = TenantRegistry(self.load, max_tenants=10)
+        acme = registry.get('acme')
+        self.assertGreater(len(acme.answer_cache), 0)
+        self.assertEqual(registry.stats()['bytes'], acme.resident_bytes())
+        self.assertGreaterEqual(acme.resident_bytes(), acme.memory_bytes() + acme.answer_cache.memory_bytes()
+                                + (acme.semantic_cache.memory_bytes() if acme.semantic_cache is not None else 0))
+        with patch.object(FlatRuleTable, 'memory_bytes', autospec=True) as measure:
+            for _ in range(3):
+                registry.get('acme')
+        measure.assert_not_called() # Serving a resident tenant never re-measures it
+
+    def test_host_resolution_falls_back_to_default_tenant(self):
+        self.assertEqual(tenant_id_from_host('acme.chat.example.com:8000'), 'acme')
+        self.assertEqual(tenant_id_from_host('unknown.chat.example.com'), tenants.DEFAULT_TENANT_ID)
+        self.assertEqual(tenant_id_from_host('localhost:5000'), tenants.DEFAULT_TENANT_ID)
+        self.assertFalse(is_valid_tenant_id('../etc'))
+
+
+if __name__ == '__main__':
+    unittest.main()
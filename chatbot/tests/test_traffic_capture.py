@@ -0,0 +1,89 @@
+# chatbot/tests/test_traffic_capture.py
+import unittest
+import csv
+import os
+import sys
+import tempfile
+
+# __file__ is /app/chatbot/tests/test_traffic_capture.py -> REPO_ROOT is /app
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from chatbot.chatbot.core import rules_based_chatbot as core_chatbot
+from chatbot.chatbot.core.config import AppConfig
+from chatbot.chatbot.core.rules_based_chatbot import RulesBasedChatbot, EXPECTED_CSV_HEADERS
+from chatbot.chatbot.core.traffic_capture import TrafficCapture, get_traffic_capture, redact
+from chatbot.benchmarks.replay_traffic import load_capture, replay
+from chatbot.chatbot.web.app import create_app
+
+LIVE_RULES = [
+    ['1', '', 'hello', 'Hi there!', 'greeted', ''],
+    ['2', 'greeted', 'joke', 'Why did the scarecrow win an award?', '', ''],
+]
+
+
+class TestTrafficCapture(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.capture_dir = os.path.join(self.tmp_dir.name, 'capture')
+        self.live_rules_path = self.write_rules('rules.csv', LIVE_RULES)
+
+    def tearDown(self):
+        core_chatbot._chatbot_instance = None
+        self.tmp_dir.cleanup()
+
+    def write_rules(self, name, rows):
+        path = os.path.join(self.tmp_dir.name, name)
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(EXPECTED_CSV_HEADERS)
+            writer.writerows(rows)
+        return path
+
+    def test_default_redaction_masks_emails_and_long_numbers(self):
+        self.assertEqual(redact('mail me at jane.doe@example.com or call +1 (555) 123-4567 about order 1234'),
+                         'mail me at <email> or call <number> about order 1234')
+
+    def test_sampling_is_per_conversation(self):
+        capture = TrafficCapture(self.capture_dir, sample_rate=0.5)
+        decisions = {capture.sampled(capture.conversation_id(f'sid-{i}')) for i in range(200)}
+        self.assertEqual(decisions, {True, False})
+        conversation_id = capture.conversation_id('sid-1')
+        self.assertEqual(len({capture.sampled(conversation_id) for _ in range(10)}), 1)
+        capture.close()
+
+    def test_captured_web_traffic_replays_and_reports_divergences(self):
+        core_chatbot._chatbot_instance = RulesBasedChatbot(rules_csv_path=self.live_rules_path, llm_fallback=lambda prompt: 'LLM')
+        config = AppConfig(environ={'FLASK_SECRET_KEY': 'test-secret', 'CHATBOT_STARTUP_REPORT': '0',
+                                    'CHATBOT_RATE_LIMIT_TURNS': '0', 'CHATBOT_RATE_LIMIT_LLM_CALLS': '0',
+                                    'CHATBOT_TRANSCRIPTS': '0', 'CHATBOT_CAPTURE_SAMPLE': '1',
+                                    'CHATBOT_CAPTURE_DIR': self.capture_dir})
+        app = create_app(config)
+        for messages in (['hello', 'tell me a joke'], ['my email is a@b.co', 'hello']):
+            client = app.test_client() # A new cookie jar: a separate conversation
+            for message in messages:
+                client.post('/', data={'message': message})
+        get_traffic_capture().close()
+
+        turns = load_capture(self.capture_dir)
+        self.assertEqual([turn['in'] for turn in turns], ['hello', 'tell me a joke', 'my email is <email>', 'hello'])
+        self.assertEqual([turn['rule'] for turn in turns], ['1', '2', None, '1'])
+        self.assertEqual(turns[1]['ctx'], 'greeted')
+        self.assertEqual(len({turn['c'] for turn in turns}), 2)
+
+        same = replay(turns, self.live_rules_path)
+        self.assertEqual((same['turns'], same['conversations'], same['diverged_turns']), (4, 2, 0))
+
+        candidate_path = self.write_rules('candidate.csv', [['1', '', 'hello', 'Hello!', 'greeted', ''],
+                                                            ['2', '', 'joke', 'A joke.', '', '']])
+        changed = replay(turns, candidate_path, speed=1000.0)
+        # Same rules chosen (rule 2 no longer needs a context, but still matches), three new answers.
+        self.assertEqual(changed['divergence_counts'], {'context': 0, 'rule': 0, 'response': 3})
+        self.assertEqual([d['input'] for d in changed['divergences']], ['hello', 'tell me a joke', 'hello'])
+        self.assertGreater(changed['replay_latency_ms']['max'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
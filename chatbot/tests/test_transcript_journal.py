@@ -0,0 +1,133 @@
+# chatbot/tests/test_transcript_journal.py
+import unittest
+import csv
+import glob
+import json
+import os
+import sys
+import tempfile
+
+# __file__ is /app/chatbot/tests/test_transcript_journal.py -> REPO_ROOT is /app
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from chatbot.chatbot.core import rules_based_chatbot as core_chatbot
+from chatbot.chatbot.core import config as config_module
+from chatbot.chatbot.core.config import AppConfig
+from chatbot.chatbot.core.rules_based_chatbot import RulesBasedChatbot, EXPECTED_CSV_HEADERS
+from chatbot.chatbot.core.session_store import SESSION_ID_COOKIE_KEY
+from chatbot.chatbot.core.traffic_capture import short_hash
+from chatbot.chatbot.core.transcript_journal import TranscriptJournal, read_transcripts, get_transcript_journal
+from chatbot.chatbot.web.app import create_app
+
+
+class TestTranscriptJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_turns_are_written_by_the_background_writer(self):
+        journal = TranscriptJournal(self.tmp_dir.name, flush_interval=0.05)
+        for i in range(3):
+            self.assertTrue(journal.record({'user': f'question {i}', 'bot': f'answer {i}'}))
+        self.assertEqual(list(read_transcripts(self.tmp_dir.name)), []) # Nothing written on the request thread
+        journal._wake.set()
+        for _ in range(100):
+            if journal.written == 3:
+                break
+            journal._stopping.wait(0.01)
+        self.assertEqual([entry['user'] for entry in read_transcripts(self.tmp_dir.name)],
+                         ['question 0', 'question 1', 'question 2'])
+        journal.close()
+
+    def test_full_queue_drops_instead_of_blocking_and_close_flushes(self):
+        journal = TranscriptJournal(self.tmp_dir.name, flush_interval=3600, max_queue=2)
+        journal._stopping.set() # Keep the writer from draining the queue during the test
+        results = [journal.record({'user': str(i)}) for i in range(3)]
+        self.assertEqual(results, [True, True, False])
+        self.assertEqual(journal.stats()['dropped'], 1)
+        journal.close()
+        self.assertEqual([entry['user'] for entry in read_transcripts(self.tmp_dir.name)], ['0', '1'])
+
+    def test_segments_rotate_and_torn_lines_are_skipped(self):
+        journal = TranscriptJournal(self.tmp_dir.name, flush_interval=3600, segment_max_bytes=100)
+        journal._stopping.set()
+        for i in range(3):
+            journal.record({'user': 'x' * 40, 'n': i})
+            journal.flush()
+        journal.close()
+        segments = sorted(glob.glob(os.path.join(self.tmp_dir.name, '*.jsonl')))
+        self.assertEqual(len(segments), 3)
+        with open(segments[-1], 'a', encoding='utf-8') as f:
+            f.write('{"user": "torn')
+        self.assertEqual([entry['n'] for entry in read_transcripts(self.tmp_dir.name)], [0, 1, 2])
+
+    def test_pruning_skips_segments_another_writer_has_open(self):
+        other_worker = TranscriptJournal(self.tmp_dir.name, flush_interval=3600)
+        other_worker.record({'n': 0})
+        other_worker.flush()
+        journal = TranscriptJournal(self.tmp_dir.name, flush_interval=3600, segment_max_bytes=50, max_segments=1)
+        for i in range(1, 4):
+            journal.record({'n': i, 'pad': 'x' * 60})
+            journal.flush()
+        other_worker.record({'n': 9})
+        other_worker.flush()
+        self.assertEqual(sorted(entry['n'] for entry in read_transcripts(self.tmp_dir.name)), [0, 3, 9])
+        other_worker.close()
+        journal.close()
+        journal = TranscriptJournal(self.tmp_dir.name, flush_interval=3600, max_segments=1)
+        journal.record({'n': 10})
+        journal.flush() # Both closed segments go now
+        self.assertEqual([entry['n'] for entry in read_transcripts(self.tmp_dir.name)], [10])
+        journal.close()
+
+
+class TestTranscriptJournalInWebApp(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        rules_csv_path = os.path.join(self.tmp_dir.name, 'rules.csv')
+        with open(rules_csv_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(EXPECTED_CSV_HEADERS)
+            writer.writerow(['1', '', 'hello', 'Hi there!', '', ''])
+        self.transcript_dir = os.path.join(self.tmp_dir.name, 'transcripts')
+        self.previous_config = config_module._config
+        core_chatbot._chatbot_instance = RulesBasedChatbot(rules_csv_path=rules_csv_path,
+                                                           llm_fallback=lambda prompt: "Gemini's answer.")
+        self.settings = {'FLASK_SECRET_KEY': 'test-secret', 'CHATBOT_STARTUP_REPORT': '0',
+                         'CHATBOT_RATE_LIMIT_TURNS': '0', 'CHATBOT_RATE_LIMIT_LLM_CALLS': '0',
+                         'CHATBOT_SEMANTIC_CACHE': '0', 'CHATBOT_TRANSCRIPT_DIR': self.transcript_dir}
+
+    def tearDown(self):
+        core_chatbot._chatbot_instance = None
+        config_module.set_config(self.previous_config)
+        self.tmp_dir.cleanup()
+
+    def test_transcripts_are_off_by_default(self):
+        client = create_app(AppConfig(environ=self.settings)).test_client()
+        client.post('/', data={'message': 'hello'})
+        self.assertIsNone(get_transcript_journal())
+        self.assertFalse(os.path.exists(self.transcript_dir))
+
+    def test_chat_turns_are_journaled_redacted(self):
+        client = create_app(AppConfig(environ=dict(self.settings, CHATBOT_TRANSCRIPTS='1'))).test_client()
+        client.post('/', data={'message': 'hello'})
+        client.post('/', data={'message': 'mail me at jane@example.com or call 555 123 4567'})
+        get_transcript_journal().flush() # This test's journal; it is closed once the config is replaced
+        entries = list(read_transcripts(self.transcript_dir))
+        self.assertEqual([(entry['tenant'], entry['user'], entry['bot']) for entry in entries],
+                         [('default', 'hello', 'Hi there!'),
+                          ('default', 'mail me at <email> or call <number>', "Gemini's answer.")])
+        with client.session_transaction() as flask_session:
+            sid = flask_session[SESSION_ID_COOKIE_KEY]
+        self.assertEqual({entry['conversation'] for entry in entries}, {short_hash(sid, key='test-secret')})
+        self.assertNotEqual(entries[0]['conversation'], short_hash(sid))
+        self.assertNotIn(sid, json.dumps(entries))
+
+if __name__ == '__main__':
+    unittest.main()